@@ -1,91 +1,42 @@
+import time
+
 import streamlit as st
-import pandas as pd
-import json
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
-import os
+
+from picflick.sentiment import (
+    DEFAULT_MODE, MODES, AnalysisError, ConversationStore, iter_analysis, model_metrics,
+)
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Gemini model
-def get_sentiment_model():
-    return ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        temperature=0.3,
-        google_api_key=os.getenv("GOOGLE_API_KEY")  # From .env file
-    )
-
-# Process conversation history with error handling
-def analyze_conversation(chat_history):
-    llm = get_sentiment_model()
-    
-    user_messages = [msg["user"] for msg in chat_history]
-    bot_responses = [msg["chatbot"] for msg in chat_history]
-    
-    prompt = f"""Analyze this customer support conversation. Return JSON with:
-- overall_score: float between -1 (negative) and 1 (positive)
-- dominant_emotion: string from [frustrated, satisfied, confused, neutral, angry]
-- top_positive: most positive user message text
-- top_negative: most negative user message text
-- sentiment_trend: list of floats representing score for each message pair
-
-Example valid response:
-{{
-    "overall_score": 0.45,
-    "dominant_emotion": "frustrated",
-    "top_positive": "Thanks for the quick resolution!",
-    "top_negative": "This service is terrible!",
-    "sentiment_trend": [0.2, -0.5, 0.8]
-}}
+MODE_LABELS = {"hybrid": "Hybrid", "fast": "Fast (offline)", "llm": "LLM"}
 
-Conversation History:
-User Messages: {user_messages}
-Agent Responses: {bot_responses}
+# Minimum time between two redraws of the report while results stream in, in seconds
+REDRAW_INTERVAL = 0.25
 
-Return only plain JSON without any formatting or comments:"""
-    
+# Analyze the conversation, yielding partial results and reporting any failure on the page
+def run_analysis(chat_history, mode, stream):
     try:
-        response = llm.invoke(prompt)
-        # Clean response from markdown artifacts
-        json_str = response.content.replace('```json', '').replace('```', '').strip()
-        
-        analysis = json.loads(json_str)
-        
-        # Validate response structure
-        required_keys = ["overall_score", "dominant_emotion", 
-                        "top_positive", "top_negative", "sentiment_trend"]
-        if not all(key in analysis for key in required_keys):
-            raise ValueError("Missing required keys in analysis response")
-            
-        # Convert to pandas series
-        analysis["sentiment_trend"] = pd.Series(analysis["sentiment_trend"])
-        
-        return analysis
-        
-    except json.JSONDecodeError as e:
-        st.error(f"JSON Parsing Error: {str(e)}")
-        st.text("Raw Model Response:")
-        st.code(response.content)
-        return None
+        analyses = iter_analysis(chat_history, mode=mode)
+        if stream:
+            yield from analyses
+        else:
+            *_, analysis = analyses
+            yield analysis
+    except AnalysisError as e:
+        st.error(f"Analysis Error: {str(e)}")
+        if e.raw:
+            st.text("Raw Model Response:")
+            st.code(e.raw)
     except Exception as e:
         st.error(f"Analysis Error: {str(e)}")
-        return None
 
-# Main UI Components
-def main():
-    st.title("📈 Conversation Insights")
-    
-    if "chat_history" not in st.session_state or len(st.session_state.chat_history) < 1:
-        st.warning("No conversation history found! Start chatting on the Home page.")
-        return
-    
-    with st.spinner("Analyzing conversation patterns..."):
-        analysis = analyze_conversation(st.session_state.chat_history)
-    
-    if not analysis:
-        return
-    
+def render_report(analysis, chat_history):
+    scored_turns = int(analysis["sentiment_trend"].count())
+    if scored_turns < len(chat_history):
+        st.progress(scored_turns / len(chat_history), text=f"Scored {scored_turns} of {len(chat_history)} turns...")
+
     # Metrics Row
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -100,12 +51,12 @@ def main():
     
     with col3:
         st.metric("Conversation Turns", 
-                len(st.session_state.chat_history))
+                len(chat_history))
     
     # Sentiment Timeline
     st.subheader("Sentiment Progression")
     st.line_chart(analysis["sentiment_trend"], 
-                use_container_width=True,
+                width="stretch",
                 color="#4B77BE")
     
     # Key Messages Section
@@ -114,34 +65,70 @@ def main():
     col_left, col_right = st.columns(2)
     with col_left:
         with st.expander("🌟 Most Positive Interaction", expanded=True):
-            if analysis["top_positive"]:
-                st.markdown(f"**User:** {analysis['top_positive']}")
-                corresponding_response = next(
-                    msg["chatbot"] for msg in st.session_state.chat_history
-                    if msg["user"] == analysis["top_positive"]
-                )
-                st.markdown(f"**Agent:** {corresponding_response}")
+            if analysis["top_positive_turn"] is not None:
+                turn = chat_history[analysis["top_positive_turn"]]
+                st.markdown(f"**User:** {turn['user']}")
+                st.markdown(f"**Agent:** {turn['chatbot']}")
             else:
                 st.info("No positive interactions detected")
     
     with col_right:
         with st.expander("⚠️ Most Negative Interaction", expanded=True):
-            if analysis["top_negative"]:
-                st.markdown(f"**User:** {analysis['top_negative']}")
-                corresponding_response = next(
-                    msg["chatbot"] for msg in st.session_state.chat_history
-                    if msg["user"] == analysis["top_negative"]
-                )
-                st.markdown(f"**Agent:** {corresponding_response}")
+            if analysis["top_negative_turn"] is not None:
+                turn = chat_history[analysis["top_negative_turn"]]
+                st.markdown(f"**User:** {turn['user']}")
+                st.markdown(f"**Agent:** {turn['chatbot']}")
             else:
                 st.info("No negative interactions detected")
+
+# Main UI Components
+def main():
+    st.title("📈 Conversation Insights")
+    
+    if "chat_history" not in st.session_state or len(st.session_state.chat_history) < 1:
+        st.warning("No conversation history found! Start chatting on the Home page.")
+        return
+    
+    mode = st.sidebar.radio(
+        "Analysis Mode", MODES, index=MODES.index(DEFAULT_MODE), format_func=MODE_LABELS.get,
+        help="Fast scores every message offline. Hybrid adds one Gemini call for the emotion "
+             "and notable interactions. LLM has Gemini score every message.",
+    )
+    stream = st.sidebar.toggle(
+        "Stream Results", value=True,
+        help="Fill in the report turn by turn as scores arrive instead of waiting for all of them.",
+    )
+
+    # The Home page owns the list; the columnar store kept next to it takes in
+    # only the turns added since the last run
+    if "conversation_store" not in st.session_state:
+        st.session_state.conversation_store = ConversationStore()
+    chat_history = st.session_state.conversation_store.sync(st.session_state.chat_history)
+    report = st.empty()
+    analysis = None
+    last_drawn = 0.0
+    with st.spinner("Analyzing conversation patterns..."):
+        for analysis in run_analysis(chat_history, mode, stream):
+            # Redraws are throttled; the final analysis is always drawn below
+            if time.monotonic() - last_drawn >= REDRAW_INTERVAL:
+                with report.container():
+                    render_report(analysis, chat_history)
+                last_drawn = time.monotonic()
+    
+    if not analysis:
+        return
+
+    with report.container():
+        render_report(analysis, chat_history)
     
     # Debug Section
     with st.expander("Technical Details"):
         st.write("### Raw Analysis Data")
         st.json(analysis)
         st.write("### Conversation History")
-        st.write(st.session_state.chat_history)
+        st.dataframe(chat_history.to_frame(), width="stretch")
+        st.write("### Model Client Metrics")
+        st.json(model_metrics())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1 @@
+"""Shared code for the PicFlick Streamlit pages."""
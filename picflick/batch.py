@@ -0,0 +1,244 @@
+"""Apply catalog filters to folders of images::
+
+    python -m picflick.batch photos/ --filter "Snow Effect" --output out/
+    python -m picflick.batch "shoots/**/*.jpg" --filter 4 --filter 10 --workers 8
+
+Inputs are directories (searched recursively) or glob patterns; filters are
+catalog ids or names, several making one chain. Images are decoded, filtered
+and encoded in a pool of processes, handed out in chunks with only a few
+chunks in flight, so memory stays flat however many files there are. Outputs
+keep their path relative to their input; with several inputs, each input's
+outputs go into a folder of their own named after it, so the same relative
+path in two inputs cannot overwrite one another. Each result is written to a
+temporary file and renamed into place, and images whose output already exists
+are skipped, so a run that was interrupted carries on where it stopped.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from picflick.effects.bench import parse_option
+from picflick.effects.chain import make_effect
+
+IMAGE_FORMATS = {
+    ".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP", ".bmp": "BMP", ".tif": "TIFF", ".tiff": "TIFF",
+}
+SAVE_OPTIONS = {"JPEG": {"quality": 92}, "WEBP": {"quality": 90}}
+
+# Images per task, and tasks in flight per worker
+CHUNK_SIZE = 8
+CHUNKS_PER_WORKER = 2
+
+_effect = None
+
+
+def _walk(directory):
+    for current, directories, names in os.walk(directory):
+        directories.sort()
+        for name in sorted(names):
+            yield os.path.join(current, name)
+
+
+def input_root(pattern):
+    """The directory outputs of ``pattern`` are placed relative to: the directory
+    itself, the one a single file is in, or the part of a glob before its first
+    wildcard."""
+    if os.path.isfile(pattern):
+        return os.path.dirname(pattern) or "."
+    root = pattern
+    if not os.path.isdir(pattern):
+        while glob.has_magic(root):
+            root = os.path.dirname(root)
+    return root or "."
+
+
+def input_folders(patterns):
+    """Output subfolder for each of ``patterns``: none for a single input, else
+    the name of the input's root, numbered when two inputs share a name."""
+    if len(patterns) == 1:
+        return [""]
+    names = []
+    for pattern in patterns:
+        name = os.path.basename(os.path.normpath(os.path.abspath(input_root(pattern))))
+        names.append(name or "input")
+    counts = Counter(names)
+    return [f"{name}-{number}" if counts[name] > 1 else name for number, name in enumerate(names, 1)]
+
+
+def find_images(pattern, exclude=None):
+    """Yield ``(path, root)`` for every image ``pattern`` names, lazily.
+
+    ``root`` is the directory outputs are placed relative to (see
+    ``input_root``). Anything under ``exclude`` is left out.
+    """
+    exclude = os.path.abspath(exclude) + os.sep if exclude else None
+    root = input_root(pattern)
+    if os.path.isdir(pattern):
+        paths = _walk(pattern)
+    else:
+        paths = glob.iglob(pattern, recursive=True)
+
+    for path in paths:
+        if os.path.splitext(path)[1].lower() not in IMAGE_FORMATS or not os.path.isfile(path):
+            continue
+        if exclude and os.path.abspath(path).startswith(exclude):
+            continue
+        yield path, root
+
+
+def render_file(effect, source, target):
+    """Filter the image at ``source`` and write it to ``target`` atomically."""
+    with Image.open(source) as image:
+        frame = np.array(ImageOps.exif_transpose(image).convert("RGB"))
+    # Every image starts the effect afresh: faces are detected, particles scattered
+    effect.reset()
+    effect(frame)
+
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    image_format = IMAGE_FORMATS[os.path.splitext(target)[1].lower()]
+    temporary = f"{target}.{os.getpid()}.part"
+    try:
+        Image.fromarray(frame).save(temporary, format=image_format, **SAVE_OPTIONS.get(image_format, {}))
+        os.replace(temporary, target)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def _start_worker(filters, options, detector):
+    global _effect
+    _effect = make_effect(filters, options, detector)
+
+
+def _render_chunk(jobs):
+    results = []
+    for source, target in jobs:
+        started = time.perf_counter()
+        try:
+            render_file(_effect, source, target)
+            error = None
+        except Exception as failure:
+            # One unreadable file must not stop the batch
+            error = f"{type(failure).__name__}: {failure}"
+        results.append((source, error, time.perf_counter() - started))
+    return results
+
+
+class BatchReport:
+    def __init__(self):
+        self.done = 0
+        self.skipped = 0
+        self.failed = []
+        self.seconds = 0.0
+        self.started = time.perf_counter()
+
+    def add(self, results):
+        for source, error, seconds in results:
+            self.seconds += seconds
+            if error is None:
+                self.done += 1
+            else:
+                self.failed.append((source, error))
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "done": self.done,
+            "skipped": self.skipped,
+            "failed": len(self.failed),
+            "seconds": round(elapsed, 2),
+            "images_per_second": round(self.done / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+def pending_jobs(patterns, output_dir, report, overwrite=False):
+    """``(source, target)`` for every image still to do, skipping finished ones."""
+    for pattern, folder in zip(patterns, input_folders(patterns)):
+        for path, root in find_images(pattern, exclude=output_dir):
+            target = os.path.join(output_dir, folder, os.path.relpath(path, root))
+            if not overwrite and os.path.isfile(target):
+                report.skipped += 1
+                continue
+            yield path, target
+
+
+def run_batch(patterns, filters, output_dir, options=None, detector=None, workers=None, chunk_size=CHUNK_SIZE,
+              overwrite=False, on_progress=None):
+    """Filter every image ``patterns`` name into ``output_dir``; returns the ``BatchReport``."""
+    workers = workers or os.cpu_count() or 1
+    report = BatchReport()
+    jobs = pending_jobs(patterns, output_dir, report, overwrite)
+
+    with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(filters, options, detector)) as pool:
+        in_flight = set()
+
+        def collect(futures):
+            for future in futures:
+                report.add(future.result())
+            if on_progress is not None:
+                on_progress(report)
+
+        while True:
+            chunk = list(islice(jobs, chunk_size))
+            if not chunk:
+                break
+            if len(in_flight) >= workers * CHUNKS_PER_WORKER:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+            in_flight.add(pool.submit(_render_chunk, chunk))
+        collect(wait(in_flight).done)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply catalog filters to folders of images.")
+    parser.add_argument("inputs", nargs="+", help="directories or glob patterns of images")
+    parser.add_argument("--filter", dest="filters", action="append", required=True,
+                        help="catalog filter id or name; repeat to chain several")
+    parser.add_argument("--output", default="picflick-output", help="directory for the filtered images")
+    parser.add_argument("--workers", type=int, default=None, help="processes, one per core by default")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="images per task")
+    parser.add_argument("--detector", default=None, help="face detector for face filters")
+    parser.add_argument("--option", type=parse_option, action="append", default=[],
+                        help="effect option as name=value (single filter only)")
+    parser.add_argument("--overwrite", action="store_true", help="redo images that already have an output")
+    args = parser.parse_args(argv)
+    if args.option and len(args.filters) > 1:
+        parser.error("--option only applies to a single filter")
+
+    try:
+        effect = make_effect(args.filters, dict(args.option), args.detector)
+    except KeyError as error:
+        parser.error(error.args[0])
+    reason = effect.unavailable() if args.detector is None else None
+    if reason:
+        parser.error(reason)
+
+    def progress(report):
+        print(f"\r{report.done} done, {report.skipped} skipped, {len(report.failed)} failed", end="", flush=True)
+
+    report = run_batch(
+        args.inputs, args.filters, args.output, dict(args.option), args.detector,
+        args.workers, args.chunk_size, args.overwrite, progress,
+    )
+    print()
+    for source, error in report.failed:
+        print(f"failed: {source}: {error}", file=sys.stderr)
+    summary = report.summary()
+    print(
+        f"{effect.name}: {summary['done']} images in {summary['seconds']} s "
+        f"({summary['images_per_second']}/s), {summary['skipped']} skipped, {summary['failed']} failed"
+    )
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
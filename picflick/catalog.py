@@ -0,0 +1,73 @@
+"""Filter catalog shared by the Overlays, Face Deform and Face Filters pages.
+
+The catalog lives in ``filters.json`` as a header of field names followed by one
+row per filter, so thousands of filters stay small on disk and cheap to parse.
+It is loaded once per process and indexed for constant time lookups.
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), "filters.json")
+
+CATEGORIES = ("Overlays", "Face Deform", "Face Filters")
+
+
+class FilterCatalog:
+    def __init__(self, filters):
+        self.filters = tuple(filters)
+        self._by_id = {}
+        self._by_name = {}
+        self._by_category = {category: [] for category in CATEGORIES}
+
+        for filter in self.filters:
+            if filter["id"] in self._by_id:
+                raise ValueError(f"Duplicate filter id: {filter['id']}")
+            self._by_id[filter["id"]] = filter
+            self._by_name.setdefault(filter["name"].lower(), filter)
+            self._by_category.setdefault(filter["category"], []).append(filter)
+
+        self._by_category = {
+            category: tuple(filters) for category, filters in self._by_category.items()
+        }
+
+    def __len__(self):
+        return len(self.filters)
+
+    def __iter__(self):
+        return iter(self.filters)
+
+    def get(self, filter_id):
+        return self._by_id.get(filter_id)
+
+    def find(self, name):
+        # Names are matched case-insensitively, like the sidebar search
+        return self._by_name.get(name.strip().lower())
+
+    def category(self, category):
+        return self._by_category.get(category, ())
+
+    @property
+    def categories(self):
+        return tuple(self._by_category)
+
+
+def read_catalog(path=CATALOG_PATH):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    fields = data["fields"]
+    filters = []
+    for row in data["rows"]:
+        filter = dict(zip(fields, row))
+        # Changes whenever the filter's entry changes, for caches of rendered cards
+        filter["version"] = hashlib.sha1(json.dumps(row).encode("utf-8")).hexdigest()[:12]
+        filters.append(filter)
+    return FilterCatalog(filters)
+
+
+@lru_cache(maxsize=None)
+def load_catalog(path=CATALOG_PATH):
+    """Return the catalog at ``path``, reading the file only once per process."""
+    return read_catalog(path)
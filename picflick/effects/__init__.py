@@ -0,0 +1,41 @@
+"""Filters PicFlick renders itself, frame by frame.
+
+``EFFECTS`` maps catalog filter names to the effect that implements them.
+"""
+from picflick.effects.base import Effect
+from picflick.effects.blur import BlurredEdge
+from picflick.effects.deform import BigEye, FaceWarp
+from picflick.effects.eyes import GreenEye
+from picflick.effects.particles import Rain, Snow
+from picflick.effects.sprites import BaseballCap, TribalMask, WarriorMask
+from picflick.effects.wave import DistortedWave
+
+EFFECTS = {
+    Snow.name: Snow,
+    BlurredEdge.name: BlurredEdge,
+    Rain.name: Rain,
+    DistortedWave.name: DistortedWave,
+    FaceWarp.name: FaceWarp,
+    BigEye.name: BigEye,
+    GreenEye.name: GreenEye,
+    WarriorMask.name: WarriorMask,
+    TribalMask.name: TribalMask,
+    BaseballCap.name: BaseballCap,
+}
+
+
+def has_effect(name):
+    return name in EFFECTS
+
+
+def create_effect(name, **options):
+    """A new effect for the catalog filter called ``name``."""
+    if name not in EFFECTS:
+        raise KeyError(f"No local effect for filter {name!r}")
+    return EFFECTS[name](**options)
+
+
+__all__ = [
+    "EFFECTS", "BaseballCap", "BigEye", "BlurredEdge", "DistortedWave", "Effect", "FaceWarp", "GreenEye", "Rain",
+    "Snow", "TribalMask", "WarriorMask", "create_effect", "has_effect",
+]
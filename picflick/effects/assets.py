@@ -0,0 +1,68 @@
+"""Read-only arrays the effects build once and share: masks, LUTs, sprites.
+
+``shared_asset`` builds each one at most once per process. When several
+processes render together (see ``picflick.video.render``), ``share_assets``
+points them all at one directory: the first process to build an asset saves
+it there as ``.npy``, and the others memory-map that file instead of building
+their own copy, so the operating system keeps a single copy in memory.
+
+Each kind of asset keeps only its most recently used ``max_entries`` in a
+process, so a long-running app seeing many frame sizes does not hold on to a
+mask for every one.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+_assets = {}
+_assets_lock = threading.Lock()
+_directory = None
+
+
+def share_assets(directory):
+    """Share assets with other processes through ``directory`` (None to stop sharing)."""
+    global _directory
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    _directory = directory
+
+
+def asset_path(kind, key):
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(_directory, f"{kind}-{digest}.npy")
+
+
+def shared_asset(kind, key, build, max_entries=None):
+    """The read-only array for ``kind`` and ``key`` (any value with a stable
+    ``repr``), made by ``build()`` the first time it is needed.
+
+    At most ``max_entries`` assets of ``kind`` are kept (all of them for None).
+    """
+    with _assets_lock:
+        cache = _assets.setdefault(kind, OrderedDict())
+        array = cache.get(key)
+        if array is not None:
+            cache.move_to_end(key)
+            return array
+
+    path = asset_path(kind, key) if _directory is not None else None
+    if path is not None and os.path.exists(path):
+        array = np.load(path, mmap_mode="r")
+    else:
+        array = np.ascontiguousarray(build())
+        array.flags.writeable = False
+        if path is not None:
+            # Written under a temporary name so no process maps half a file
+            temporary = f"{path}.{os.getpid()}.part"
+            with open(temporary, "wb") as f:
+                np.save(f, array, allow_pickle=False)
+            os.replace(temporary, path)
+    with _assets_lock:
+        cache[key] = array
+        cache.move_to_end(key)
+        while max_entries is not None and len(cache) > max_entries:
+            cache.popitem(last=False)
+    return array
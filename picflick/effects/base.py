@@ -0,0 +1,98 @@
+"""What every frame effect has in common.
+
+Frames are ``(height, width, 3)`` uint8 RGB arrays, C-contiguous so they can be
+viewed flat. Effects change them in place and return them, so a stream of
+frames can be processed without allocating new ones.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def check_frame(frame):
+    if frame.dtype != np.uint8 or frame.ndim != 3 or frame.shape[2] != 3:
+        raise ValueError(f"Expected an HxWx3 uint8 frame, got {frame.dtype} {frame.shape}")
+    if not frame.flags.c_contiguous or not frame.flags.writeable:
+        raise ValueError("Frames are changed in place and must be writeable and C-contiguous")
+    return frame
+
+
+class Effect:
+    """A filter applied frame by frame.
+
+    ``apply(frame, t)`` draws the effect onto ``frame`` at time ``t`` (seconds
+    into the stream) and returns it. Effects whose output depends on earlier
+    frames set ``stateful``; ``reset(seed)`` puts them back at the start.
+    """
+
+    name = ""
+    stateful = False
+
+    def reset(self, seed=None):
+        pass
+
+    def unavailable(self):
+        """Why the effect cannot run here (a missing optional package), or None."""
+        return None
+
+    def apply(self, frame, t):
+        raise NotImplementedError
+
+    def __call__(self, frame, t=0.0):
+        return self.apply(check_frame(frame), t)
+
+
+class StageTimings:
+    """Last and average time of each named stage, in milliseconds.
+
+    Safe to share between the threads of a pipeline.
+    """
+
+    def __init__(self, smoothing=0.1):
+        self.smoothing = smoothing
+        self.last = {}
+        self.average = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def record(self, name, milliseconds):
+        with self._lock:
+            self.last[name] = milliseconds
+            previous = self.average.get(name, milliseconds)
+            self.average[name] = previous + self.smoothing * (milliseconds - previous)
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {
+                    "last_ms": round(self.last[name], 3),
+                    "avg_ms": round(self.average[name], 3),
+                    "count": self.counts[name],
+                }
+                for name in self.last
+            }
+
+
+def blend_pixels(frame, indices, alpha, color):
+    """Blend ``color`` over the pixels at flat ``indices`` with per-index ``alpha``.
+
+    Indices may repeat: every copy computes the same value from the untouched
+    pixel, so the repeated writes agree. Nothing outside ``indices`` is read.
+    """
+    pixels = frame.reshape(-1, 3)
+    blended = pixels.take(indices, axis=0).astype(np.float32)
+    blended += (np.asarray(color, dtype=np.float32) - blended) * alpha[:, None]
+    blended += 0.5  # Round instead of truncating
+    pixels[indices] = blended
+    return frame
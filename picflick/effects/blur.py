@@ -0,0 +1,157 @@
+"""Blurred Edge: a sharp centre fading into a soft, blurred border.
+
+The frame is shrunk by ``DOWNSCALE`` with a block average, blurred there with a
+separable Gaussian, scaled back up bilinearly and blended in through a radial
+vignette mask. The mask, the resampling tables and every intermediate buffer
+are made once per frame size (and strength), so a running stream allocates
+nothing per frame.
+"""
+import numpy as np
+
+from picflick.effects.assets import shared_asset
+from picflick.effects.base import Effect
+
+DOWNSCALE = 4
+
+
+def smoothstep(x):
+    x = np.clip(x, 0.0, 1.0)
+    return x * x * (3 - 2 * x)
+
+
+def vignette_mask(height, width, strength):
+    """How much of the blurred frame shows at each pixel: 0 in the middle, up to 1 in the corners.
+
+    Shaped ``(height, width, 1)`` so it broadcasts over the channels; read-only
+    because it is shared.
+    """
+    return shared_asset(
+        "vignette", (height, width, strength), lambda: _vignette_mask(height, width, strength), max_entries=16,
+    )
+
+
+def _vignette_mask(height, width, strength):
+    ys = np.linspace(-1, 1, height, dtype=np.float32)[:, None]
+    xs = np.linspace(-1, 1, width, dtype=np.float32)[None, :]
+    radius = np.sqrt(xs * xs + ys * ys) / np.sqrt(2)
+    inner = 0.65 - 0.4 * strength
+    mask = smoothstep((radius - inner) / (1.0 - inner)) * min(1.0, 0.6 + strength)
+    return mask.astype(np.float32)[:, :, None]
+
+
+def gaussian_kernel(sigma):
+    radius = max(1, int(round(2.5 * sigma)))
+    taps = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def linear_taps(source, target):
+    """Lower source index, upper source index and upper weight for resizing ``source`` samples to ``target``."""
+    position = (np.arange(target, dtype=np.float32) + 0.5) * (source / target) - 0.5
+    position = np.clip(position, 0, source - 1)
+    lower = np.floor(position).astype(np.intp)
+    upper = np.minimum(lower + 1, source - 1)
+    return lower, upper, (position - lower).astype(np.float32)
+
+
+class _Buffers:
+    """Everything one frame size needs, allocated once."""
+
+    def __init__(self, height, width, strength):
+        self.small_height = max(1, height // DOWNSCALE)
+        self.small_width = max(1, width // DOWNSCALE)
+        sh, sw = self.small_height, self.small_width
+
+        self.kernel = gaussian_kernel(0.8 + 2.2 * strength)
+        radius = len(self.kernel) // 2
+        self.rows = np.empty((sh, sw * DOWNSCALE, 3), dtype=np.float32)
+        self.small = np.empty((sh, sw, 3), dtype=np.float32)
+        self.padded = np.empty((sh + 2 * radius, sw + 2 * radius, 3), dtype=np.float32)
+        self.term = np.empty((sh, sw, 3), dtype=np.float32)
+
+        self.x_taps = linear_taps(sw, width)
+        self.y_taps = linear_taps(sh, height)
+        self.wide = np.empty((sh, width, 3), dtype=np.float32)
+        self.wide_upper = np.empty((sh, width, 3), dtype=np.float32)
+        self.full = np.empty((height, width, 3), dtype=np.float32)
+        self.full_upper = np.empty((height, width, 3), dtype=np.float32)
+
+        self.mask = vignette_mask(height, width, strength)
+
+
+class BlurredEdge(Effect):
+    name = "Blurred Edge"
+
+    def __init__(self, strength=0.6):
+        self.strength = float(np.clip(strength, 0.0, 1.0))
+        self._buffers = None
+
+    def _buffers_for(self, height, width):
+        buffers = self._buffers
+        if buffers is None or buffers.full.shape[:2] != (height, width):
+            buffers = self._buffers = _Buffers(height, width, self.strength)
+        return buffers
+
+    def apply(self, frame, t):
+        height, width = frame.shape[:2]
+        b = self._buffers_for(height, width)
+        sh, sw = b.small_height, b.small_width
+
+        # Block average down to the small buffer: rows first, then columns, as
+        # strided sums (much faster than a mean over a 5-d view)
+        source = frame[:sh * DOWNSCALE, :sw * DOWNSCALE]
+        np.copyto(b.rows, source[0::DOWNSCALE])
+        for row in range(1, DOWNSCALE):
+            b.rows += source[row::DOWNSCALE]
+        np.copyto(b.small, b.rows[:, 0::DOWNSCALE])
+        for column in range(1, DOWNSCALE):
+            b.small += b.rows[:, column::DOWNSCALE]
+        b.small *= 1 / (DOWNSCALE * DOWNSCALE)
+
+        self._blur(b)
+        self._upscale(b)
+
+        # frame += (blurred - frame) * mask, rounded back into the frame
+        np.subtract(b.full, frame, out=b.full)
+        np.multiply(b.full, b.mask, out=b.full)
+        np.add(b.full, frame, out=b.full)
+        b.full += 0.5
+        np.copyto(frame, b.full, casting="unsafe")
+        return frame
+
+    def _blur(self, b):
+        radius = len(b.kernel) // 2
+        sh, sw = b.small_height, b.small_width
+        for axis in (0, 1):
+            # Pad by repeating the edge, then sum shifted copies weighted by the kernel
+            p = b.padded
+            p[radius:radius + sh, radius:radius + sw] = b.small
+            if axis == 0:
+                p[:radius, radius:radius + sw] = b.small[:1]
+                p[radius + sh:, radius:radius + sw] = b.small[-1:]
+            else:
+                p[radius:radius + sh, :radius] = b.small[:, :1]
+                p[radius:radius + sh, radius + sw:] = b.small[:, -1:]
+            b.small.fill(0)
+            for offset, weight in enumerate(b.kernel):
+                if axis == 0:
+                    shifted = p[offset:offset + sh, radius:radius + sw]
+                else:
+                    shifted = p[radius:radius + sh, offset:offset + sw]
+                np.multiply(shifted, weight, out=b.term)
+                b.small += b.term
+
+    def _upscale(self, b):
+        lower, upper, weight = b.x_taps
+        np.take(b.small, lower, axis=1, out=b.wide, mode="clip")
+        np.take(b.small, upper, axis=1, out=b.wide_upper, mode="clip")
+        b.wide_upper -= b.wide
+        b.wide_upper *= weight[None, :, None]
+        b.wide += b.wide_upper
+
+        lower, upper, weight = b.y_taps
+        np.take(b.wide, lower, axis=0, out=b.full, mode="clip")
+        np.take(b.wide, upper, axis=0, out=b.full_upper, mode="clip")
+        b.full_upper -= b.full
+        b.full_upper *= weight[:, None, None]
+        b.full += b.full_upper
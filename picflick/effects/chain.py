@@ -0,0 +1,142 @@
+"""Several filters stacked into one effect, planned to share work.
+
+Running filters one after another repeats work that can be shared. The chain
+plans the filters from all three catalogs before the first frame:
+
+- Face stages (Face Deform and Face Filters effects) share one landmark
+  tracker. It runs once per frame, on the frame as it came in, and each stage
+  then draws only inside its own region of the face.
+- Stages that gather pixels from elsewhere in the frame (``render(source,
+  out, t)``, e.g. Distorted Wave) read one of two preallocated buffers and
+  write the other instead of copying the frame first; the buffers swap
+  roles, and the result is copied back only if it ends in the spare one.
+- Everything else already changes the frame in place and runs as it is.
+"""
+import numpy as np
+
+from picflick.catalog import load_catalog
+from picflick.effects import EFFECTS, create_effect
+from picflick.effects.base import Effect, StageTimings
+from picflick.effects.face import KEYFRAME_INTERVAL, FaceEffect, FaceTracker, get_detector
+
+
+def filter_name(key):
+    """Name of the filter ``key`` refers to: a catalog id, or a name in any case.
+
+    Raises KeyError for filters that do not exist or that PicFlick cannot render.
+    """
+    catalog = load_catalog()
+    if isinstance(key, int) or str(key).strip().isdigit():
+        filter = catalog.get(int(key))
+    else:
+        filter = catalog.find(str(key))
+    if filter is None:
+        raise KeyError(f"No filter {key!r} in the catalog")
+    if filter["name"] not in EFFECTS:
+        raise KeyError(f"Filter {filter['name']!r} is not rendered by PicFlick")
+    return filter["name"]
+
+
+class FilterChain(Effect):
+    """``filters`` (catalog ids or names) applied in order as one effect.
+
+    ``options`` maps a filter name to the options for its effect. Face stages
+    find faces with ``detector`` (see ``get_detector``).
+    """
+
+    def __init__(self, filters, options=None, detector=None, keyframe_interval=KEYFRAME_INTERVAL):
+        options = options or {}
+        self.names = [filter_name(key) for key in filters]
+        if not self.names:
+            raise ValueError("A filter chain needs at least one filter")
+        self.stages = [create_effect(name, **options.get(name, {})) for name in self.names]
+        self.name = " + ".join(self.names)
+        self.stateful = any(stage.stateful for stage in self.stages)
+        self.detector = detector
+        self.keyframe_interval = keyframe_interval
+        self.timings = StageTimings()
+        self._tracker = None
+        self._spare = None
+
+    def reset(self, seed=None):
+        for stage in self.stages:
+            stage.reset(seed)
+        if self._tracker is not None:
+            self._tracker.reset()
+
+    def unavailable(self):
+        for stage in self.stages:
+            reason = stage.unavailable() if self.detector is None else None
+            if reason:
+                return f"{stage.name}: {reason}"
+        return None
+
+    @property
+    def face_stages(self):
+        return [stage for stage in self.stages if isinstance(stage, FaceEffect)]
+
+    def plan(self):
+        """How each stage will run: ``(name, "face" | "ping-pong" | "in place")``."""
+        plan = []
+        for name, stage in zip(self.names, self.stages):
+            if isinstance(stage, FaceEffect):
+                plan.append((name, "face"))
+            elif hasattr(stage, "render"):
+                plan.append((name, "ping-pong"))
+            else:
+                plan.append((name, "in place"))
+        return plan
+
+    def tracker(self):
+        if self._tracker is None and self.face_stages:
+            detector = self.detector if callable(self.detector) else get_detector(self.detector)
+            if detector is not None:
+                self._tracker = FaceTracker(detector, self.keyframe_interval, self.timings)
+        return self._tracker
+
+    def apply(self, frame, t):
+        # Landmarks come from the frame before any stage has drawn on it
+        tracker = self.tracker()
+        face = tracker.update(frame, t) if tracker is not None else None
+
+        if self._spare is None or self._spare.shape != frame.shape:
+            self._spare = np.empty_like(frame)
+        current, spare = frame, self._spare
+        for name, stage in zip(self.names, self.stages):
+            with self.timings.stage(name):
+                if isinstance(stage, FaceEffect):
+                    if face is not None:
+                        stage.draw(current, face, t)
+                elif hasattr(stage, "render"):
+                    stage.render(current, spare, t)
+                    current, spare = spare, current
+                else:
+                    stage.apply(current, t)
+        if current is not frame:
+            np.copyto(frame, current)
+        return frame
+
+    def stats(self):
+        tracker = self._tracker
+        return {
+            "plan": self.plan(),
+            "stages": self.timings.snapshot(),
+            "keyframes": tracker.keyframes if tracker else 0,
+            "tracking_lost": tracker.lost if tracker else 0,
+        }
+
+
+def make_effect(filters, options=None, detector=None):
+    """The effect for one filter, or a ``FilterChain`` for several.
+
+    ``filters`` are catalog ids or names; ``options`` are the effect's options
+    for a single filter, or options by filter name for a chain.
+    """
+    filters = [filters] if isinstance(filters, (int, str)) else list(filters)
+    if len(filters) == 1:
+        name = filter_name(filters[0])
+        options = dict(options or {})
+        if detector is not None and issubclass(EFFECTS[name], FaceEffect):
+            options["detector"] = detector
+        return create_effect(name, **options)
+    return FilterChain(filters, options, detector=detector)
@@ -0,0 +1,171 @@
+"""Face Warp and Big Eye: the face is bent by displacement fields.
+
+A field says, for each pixel of a small rectangle around part of the face, how
+far away its new value is read from. Fields only cover the pixels that
+actually move, and each is turned once into flat source indices and bilinear
+weights, so applying it is four gathers and a blend over those pixels, never
+the whole frame. Fields are rebuilt only when the landmarks have moved more
+than ``REUSE_DISTANCE`` pixels since they were made.
+"""
+import numpy as np
+
+from picflick.effects.face import KEYFRAME_INTERVAL, FaceEffect, clip_rect
+
+# Landmarks moving less than this many pixels keep the current fields
+REUSE_DISTANCE = 1.5
+
+# Pixels displaced by less than this are left out of a field
+MIN_DISPLACEMENT = 0.05
+
+
+def radial_field(rect, centre, radius, strength):
+    """Displacement over ``rect`` that magnifies (``strength`` > 0) or shrinks (< 0) a disc.
+
+    Returns ``(dx, dy)``, each shaped like ``rect``. The magnification at the
+    centre is ``1 / (1 - strength)`` and fades smoothly to none at ``radius``.
+    """
+    x0, y0, x1, y1 = rect
+    xs = np.arange(x0, x1, dtype=np.float32)[None, :] - np.float32(centre[0])
+    ys = np.arange(y0, y1, dtype=np.float32)[:, None] - np.float32(centre[1])
+    falloff = np.clip(1 - (xs * xs + ys * ys) / np.float32(radius * radius), 0, 1) ** 2
+    # Reading from nearer the centre magnifies
+    scale = np.float32(-strength) * falloff
+    return xs * scale, ys * scale
+
+
+class Warp:
+    """A displacement field over ``rect`` of a ``height`` by ``width`` frame, ready to apply."""
+
+    def __init__(self, rect, dx, dy, height, width):
+        x0, y0, x1, y1 = rect
+        moving = (np.abs(dx) > MIN_DISPLACEMENT) | (np.abs(dy) > MIN_DISPLACEMENT)
+        ys, xs = np.nonzero(moving)
+        source_x = np.clip(xs + x0 + dx[moving], 0, width - 1.001)
+        source_y = np.clip(ys + y0 + dy[moving], 0, height - 1.001)
+        left = source_x.astype(np.intp)
+        top = source_y.astype(np.intp)
+        fx = (source_x - left).astype(np.float32)
+        fy = (source_y - top).astype(np.float32)
+
+        corner = top * width + left
+        # The four bilinear taps of every moving pixel, one after the other
+        self.sources = np.concatenate([corner, corner + 1, corner + width, corner + width + 1])
+        self.weights = np.concatenate([(1 - fx) * (1 - fy), fx * (1 - fy), (1 - fx) * fy, fx * fy])[:, None]
+        self.targets = (ys + y0) * width + (xs + x0)
+        count = len(self.targets)
+        self.taps = np.empty((4 * count, 3), dtype=np.uint8)
+        self.blend = np.empty((4 * count, 3), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def apply(self, frame):
+        count = len(self.targets)
+        if not count:
+            return frame
+        pixels = frame.reshape(-1, 3)
+        np.take(pixels, self.sources, axis=0, out=self.taps)
+        np.multiply(self.taps, self.weights, out=self.blend)
+        b = self.blend
+        result = b[:count]
+        result += b[count:2 * count]
+        result += b[2 * count:3 * count]
+        result += b[3 * count:]
+        result += 0.5
+        pixels[self.targets] = result
+        return frame
+
+
+class DeformEffect(FaceEffect):
+    """A face effect made of displacement fields; subclasses say which in ``fields``."""
+
+    def __init__(self, detector=None, keyframe_interval=KEYFRAME_INTERVAL, reuse_distance=REUSE_DISTANCE):
+        super().__init__(detector, keyframe_interval)
+        self.reuse_distance = reuse_distance
+        self.reused = 0
+        self._warps = None
+        self._warped_face = None
+        self._shape = None
+
+    def reset(self, seed=None):
+        super().reset(seed)
+        self._warps = None
+        self._warped_face = None
+
+    def fields(self, face):
+        """Yield ``(rect, terms)`` for each warp of ``face``: the radial fields
+        given as ``(centre, radius, strength)`` terms are summed over ``rect``."""
+        raise NotImplementedError
+
+    def draw(self, frame, face, t):
+        height, width = frame.shape[:2]
+        if (
+            self._warps is None or self._shape != (height, width)
+            or face.distance(self._warped_face) >= self.reuse_distance
+        ):
+            with self.timings.stage("field"):
+                self._warps = self._build(face, height, width)
+            self._warped_face = face
+            self._shape = (height, width)
+        else:
+            self.reused += 1
+        with self.timings.stage("warp"):
+            for warp in self._warps:
+                warp.apply(frame)
+
+    def _build(self, face, height, width):
+        warps = []
+        for rect, terms in self.fields(face):
+            rect = clip_rect(rect, height, width)
+            if rect[2] - rect[0] < 2 or rect[3] - rect[1] < 2:
+                continue
+            dx = dy = 0
+            for centre, radius, strength in terms:
+                term_x, term_y = radial_field(rect, centre, radius, strength)
+                dx, dy = dx + term_x, dy + term_y
+            warps.append(Warp(rect, dx, dy, height, width))
+        return warps
+
+    def stats(self):
+        stats = super().stats()
+        stats["fields_reused"] = self.reused
+        stats["pixels_warped"] = sum(len(warp) for warp in self._warps or ())
+        return stats
+
+
+def disc_rect(centre, radius):
+    x, y = centre
+    return x - radius, y - radius, x + radius + 1, y + radius + 1
+
+
+class FaceWarp(DeformEffect):
+    """The middle of the face swells and the chin shrinks."""
+
+    name = "Face Warp"
+
+    def __init__(self, strength=0.45, **options):
+        super().__init__(**options)
+        self.strength = float(np.clip(strength, 0.0, 0.9))
+
+    def fields(self, face):
+        width = face.width
+        nose, chin = face["nose"], face["chin"]
+        swell = (nose, 0.55 * width, self.strength)
+        shrink = (chin, 0.35 * width, -0.8 * self.strength)
+        yield face.bbox(0.1), (swell, shrink)
+
+
+class BigEye(DeformEffect):
+    """Both eyes magnified."""
+
+    name = "Big Eye"
+
+    def __init__(self, strength=0.4, **options):
+        super().__init__(**options)
+        self.strength = float(np.clip(strength, 0.0, 0.9))
+
+    def fields(self, face):
+        for side in ("right", "left"):
+            centre, eye_width, _ = face.eye(side)
+            radius = 1.1 * eye_width
+            yield disc_rect(centre, radius), ((centre, radius, self.strength),)
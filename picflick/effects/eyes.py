@@ -0,0 +1,144 @@
+"""Green Eye: irises recoloured to a shade of green.
+
+The recolour is a 3-D lookup table from quantised RGB to the recoloured RGB,
+built once per shade and shared. Each frame only the pixels of the two small
+squares around the irises go through it: the table is indexed with their top
+six bits per channel and blended back through a feathered iris mask that
+leaves out the pupil and whatever the eyelids cover. The rest of the frame is
+never read, so the cost follows the size of the eyes, not of the frame.
+"""
+import numpy as np
+
+from picflick.effects.assets import shared_asset
+from picflick.effects.blur import smoothstep
+from picflick.effects.face import FaceEffect, clip_rect
+
+# Named shades of green; any RGB triple works too
+SHADES = {
+    "emerald": (40, 170, 90),
+    "jade": (70, 160, 120),
+    "hazel green": (110, 140, 60),
+    "sea green": (50, 140, 110),
+    "olive": (120, 135, 50),
+}
+
+# Bits per channel of the lookup table: 64 levels, 262,144 entries
+LUT_BITS = 6
+
+
+def rgb_to_hsv(rgb):
+    """``(..., 3)`` floats 0-1 to hue, saturation and value, all 0-1."""
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    value = rgb.max(-1)
+    spread = value - rgb.min(-1)
+    saturation = np.where(value > 0, spread / np.maximum(value, 1e-6), 0)
+    safe = np.maximum(spread, 1e-6)
+    hue = np.select(
+        [value == r, value == g],
+        [((g - b) / safe) % 6, (b - r) / safe + 2],
+        (r - g) / safe + 4,
+    ) / 6
+    return hue, saturation, value
+
+
+def hsv_to_rgb(hue, saturation, value):
+    sector = hue * 6
+    part = sector - np.floor(sector)
+    sector = sector.astype(int) % 6
+    p = value * (1 - saturation)
+    q = value * (1 - saturation * part)
+    t = value * (1 - saturation * (1 - part))
+    choices = [
+        (value, t, p), (q, value, p), (p, value, t), (p, q, value), (t, p, value), (value, p, q),
+    ]
+    conditions = [sector == number for number in range(6)]
+    return np.stack([np.select(conditions, [choice[channel] for choice in choices]) for channel in range(3)], -1)
+
+
+def recolor_lut(shade):
+    """Lookup table turning any colour into the same brightness of ``shade``.
+
+    Shaped ``(levels ** 3, 3)`` uint8, indexed by the top ``LUT_BITS`` bits
+    of red, green and blue in that order; read-only because it is shared.
+    """
+    return shared_asset("recolor-lut", (tuple(shade), LUT_BITS), lambda: _recolor_lut(shade), max_entries=8)
+
+
+def _recolor_lut(shade):
+    levels = 1 << LUT_BITS
+    steps = (np.arange(levels, dtype=np.float32) + 0.5) / levels
+    r, g, b = np.meshgrid(steps, steps, steps, indexing="ij")
+    hue, saturation, value = rgb_to_hsv(np.stack([r, g, b], -1).reshape(-1, 3))
+    target_hue, target_saturation, _ = rgb_to_hsv(np.array(shade, dtype=np.float32) / 255)
+    # Keep each pixel's brightness, take the shade's hue, and saturate dull
+    # irises enough to read as green while keeping some of their own variation
+    saturation = np.clip(0.35 * saturation + 0.75 * target_saturation, 0, 1)
+    return np.round(hsv_to_rgb(np.full_like(hue, target_hue), saturation, value) * 255).astype(np.uint8)
+
+
+def shade_rgb(shade):
+    if isinstance(shade, str):
+        if shade not in SHADES:
+            raise ValueError(f"Unknown shade {shade!r}; choose from {', '.join(SHADES)}")
+        return SHADES[shade]
+    return tuple(int(channel) for channel in shade)
+
+
+def iris_alpha(rect, centre, radius, eye_centre, eye_width, eye_height, angle):
+    """Feathered mask of an iris over ``rect``: the iris disc, without the pupil,
+    cut to the visible eye opening."""
+    x0, y0, x1, y1 = rect
+    xs = np.arange(x0, x1, dtype=np.float32)[None, :]
+    ys = np.arange(y0, y1, dtype=np.float32)[:, None]
+    feather = max(radius * 0.25, 0.75)
+
+    distance = np.hypot(xs - centre[0], ys - centre[1])
+    alpha = smoothstep((radius - distance) / feather)
+    alpha *= smoothstep((distance - 0.4 * radius) / feather)
+
+    # The eye opening as an ellipse along the line between the eye corners
+    cos, sin = np.cos(angle), np.sin(angle)
+    along = (xs - eye_centre[0]) * cos + (ys - eye_centre[1]) * sin
+    across = (ys - eye_centre[1]) * cos - (xs - eye_centre[0]) * sin
+    half_height = max(eye_height / 2, 1.0)
+    inside = 1 - np.hypot(along / max(eye_width / 2, 1.0), across / half_height)
+    alpha *= smoothstep(inside * half_height / feather)
+    return alpha.astype(np.float32)[:, :, None]
+
+
+class GreenEye(FaceEffect):
+    name = "Green Eye"
+
+    def __init__(self, shade="emerald", strength=0.85, **options):
+        """``shade`` is a name from ``SHADES`` or an RGB triple; ``strength`` how much of it shows."""
+        super().__init__(**options)
+        self.lut = recolor_lut(shade_rgb(shade))
+        self.strength = float(np.clip(strength, 0.0, 1.0))
+
+    def draw(self, frame, face, t):
+        height, width = frame.shape[:2]
+        shift = 8 - LUT_BITS
+        for side in ("right", "left"):
+            centre, radius = face.iris(side)
+            if radius < 1:
+                continue
+            with self.timings.stage("mask"):
+                reach = radius + 1
+                rect = clip_rect(
+                    (centre[0] - reach, centre[1] - reach, centre[0] + reach + 1, centre[1] + reach + 1),
+                    height, width,
+                )
+                x0, y0, x1, y1 = rect
+                if x1 - x0 < 2 or y1 - y0 < 2:
+                    continue
+                alpha = iris_alpha(rect, centre, radius, *face.eye(side), face.angle)
+                alpha *= self.strength
+
+            with self.timings.stage("recolor"):
+                region = frame[y0:y1, x0:x1]
+                quantised = (region >> shift).astype(np.intp)
+                index = (quantised[..., 0] << (2 * LUT_BITS)) | (quantised[..., 1] << LUT_BITS) | quantised[..., 2]
+                blended = region.astype(np.float32)
+                blended += (self.lut[index] - blended) * alpha
+                blended += 0.5
+                np.copyto(region, blended, casting="unsafe")
@@ -0,0 +1,248 @@
+"""Faces for the face effects: landmarks found on keyframes and tracked in between.
+
+Landmark detection (MediaPipe Face Mesh, an optional dependency) is far too
+slow to run on every frame, so ``FaceTracker`` runs it on a keyframe every
+``KEYFRAME_INTERVAL`` frames, or sooner when tracking is lost, and follows the
+landmarks in between with Lucas–Kanade on a crop around the face. Only the
+few dozen landmarks the effects anchor to are kept, by name.
+"""
+from importlib.util import find_spec
+
+import numpy as np
+
+from picflick.effects.base import Effect, StageTimings
+from picflick.effects.tracking import LucasKanade, to_gray
+
+# Left and right are the person's own, so the right eye is on the left of the picture
+LANDMARKS = (
+    "forehead", "chin", "right_cheek", "left_cheek", "nose",
+    "mouth_top", "mouth_bottom", "mouth_right", "mouth_left",
+    "right_eye_outer", "right_eye_inner", "right_eye_top", "right_eye_bottom",
+    "left_eye_inner", "left_eye_outer", "left_eye_top", "left_eye_bottom",
+    "right_iris", "right_iris_edge", "left_iris", "left_iris_edge",
+)
+INDEX = {name: number for number, name in enumerate(LANDMARKS)}
+
+# The same landmarks in MediaPipe's 478 point face mesh (with refined irises)
+MEDIAPIPE_INDICES = (
+    10, 152, 234, 454, 1,
+    13, 14, 61, 291,
+    33, 133, 159, 145,
+    362, 263, 386, 374,
+    468, 469, 473, 474,
+)
+
+KEYFRAME_INTERVAL = 12
+
+# Below this share of landmarks followed, tracking counts as lost
+MIN_TRACKED = 0.6
+
+# Tracking crop around the face, as a share of the face width on every side
+CROP_MARGIN = 0.35
+
+
+class FaceLandmarks:
+    """Named landmark positions of one face, in pixels: ``points`` is ``(len(LANDMARKS), 2)`` x, y."""
+
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=np.float32).reshape(len(LANDMARKS), 2)
+
+    def __getitem__(self, name):
+        return self.points[INDEX[name]]
+
+    @property
+    def width(self):
+        return float(np.hypot(*(self["left_cheek"] - self["right_cheek"])))
+
+    @property
+    def angle(self):
+        """Roll of the head in radians, 0 when the eyes are level."""
+        dx, dy = self.eye("left")[0] - self.eye("right")[0]
+        return float(np.arctan2(dy, dx))
+
+    def eye(self, side):
+        """Centre, width and height of the ``"left"`` or ``"right"`` eye."""
+        outer, inner = self[f"{side}_eye_outer"], self[f"{side}_eye_inner"]
+        top, bottom = self[f"{side}_eye_top"], self[f"{side}_eye_bottom"]
+        return (outer + inner) / 2, float(np.hypot(*(outer - inner))), float(np.hypot(*(top - bottom)))
+
+    def iris(self, side):
+        """Centre and radius of the ``"left"`` or ``"right"`` iris."""
+        centre = self[f"{side}_iris"]
+        return centre, float(np.hypot(*(self[f"{side}_iris_edge"] - centre)))
+
+    def bbox(self, margin=0.0):
+        """``(x0, y0, x1, y1)`` around every landmark, grown by ``margin`` face widths."""
+        pad = margin * self.width
+        (x0, y0), (x1, y1) = self.points.min(0) - pad, self.points.max(0) + pad
+        return float(x0), float(y0), float(x1), float(y1)
+
+    def distance(self, other):
+        """How far the landmarks moved between ``other`` and this face, in pixels."""
+        return float(np.abs(self.points - other.points).max())
+
+
+def clip_rect(rect, height, width):
+    """``rect`` as whole pixels inside a ``height`` by ``width`` frame; may be empty."""
+    x0, y0, x1, y1 = rect
+    x0, y0 = max(0, int(np.floor(x0))), max(0, int(np.floor(y0)))
+    x1, y1 = min(width, int(np.ceil(x1))), min(height, int(np.ceil(y1)))
+    return x0, y0, max(x0, x1), max(y0, y1)
+
+
+class MediaPipeDetector:
+    """Landmarks of the most prominent face, from MediaPipe Face Mesh."""
+
+    def __init__(self):
+        import mediapipe as mp
+
+        self.mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1, refine_landmarks=True)
+
+    def __call__(self, frame, t):
+        result = self.mesh.process(frame)
+        if not result.multi_face_landmarks:
+            return None
+        marks = result.multi_face_landmarks[0].landmark
+        height, width = frame.shape[:2]
+        return FaceLandmarks([(marks[i].x * width, marks[i].y * height) for i in MEDIAPIPE_INDICES])
+
+
+def get_detector(name=None):
+    """A landmark detector, called as ``detector(frame, t)``.
+
+    ``name`` is ``"mediapipe"``, ``"synthetic"`` (the face drawn by
+    ``synthetic_frame``) or None for MediaPipe if it is installed; None is
+    returned when there is nothing to detect faces with.
+    """
+    if name == "synthetic":
+        from picflick.effects.synthetic import SyntheticFaceDetector
+
+        return SyntheticFaceDetector()
+    if name == "mediapipe" or (name is None and find_spec("mediapipe") is not None):
+        return MediaPipeDetector()
+    if name is not None:
+        raise ValueError(f"Unknown face detector {name!r}")
+    return None
+
+
+class FaceTracker:
+    """Landmarks of one face, frame after frame.
+
+    Call ``update`` with each frame before anything is drawn on it.
+    """
+
+    def __init__(self, detector, keyframe_interval=KEYFRAME_INTERVAL, timings=None):
+        self.detector = detector
+        self.keyframe_interval = keyframe_interval
+        self.timings = timings if timings is not None else StageTimings()
+        self.lucas_kanade = LucasKanade()
+        self.reset()
+
+    def reset(self):
+        self.face = None
+        self.since_keyframe = self.keyframe_interval
+        self.keyframes = 0
+        self.lost = 0
+        self._gray = None
+        self._rect = None
+
+    def update(self, frame, t):
+        """The face's landmarks in ``frame``, or None if there is no face."""
+        self.since_keyframe += 1
+        if self.since_keyframe >= self.keyframe_interval:
+            return self._keyframe(frame, t)
+        if self.face is None:
+            # Wait for the next keyframe rather than detect on every frame
+            return None
+
+        with self.timings.stage("track"):
+            face = self._track(frame)
+        if face is None:
+            self.lost += 1
+            return self._keyframe(frame, t)
+        return face
+
+    def _keyframe(self, frame, t):
+        with self.timings.stage("detect"):
+            self.face = self.detector(frame, t)
+        self.keyframes += 1
+        self.since_keyframe = 0
+        if self.face is not None:
+            self._remember(frame)
+        return self.face
+
+    def _remember(self, frame):
+        height, width = frame.shape[:2]
+        self._rect = clip_rect(self.face.bbox(CROP_MARGIN), height, width)
+        x0, y0, x1, y1 = self._rect
+        self._gray = to_gray(frame, self._rect) if x1 - x0 >= 8 and y1 - y0 >= 8 else None
+
+    def _track(self, frame):
+        if self._gray is None:
+            return None
+        x0, y0 = self._rect[:2]
+        origin = np.array([x0, y0], dtype=np.float32)
+        points, ok = self.lucas_kanade.track(self._gray, to_gray(frame, self._rect), self.face.points - origin)
+        if ok.mean() < MIN_TRACKED:
+            return None
+        # Landmarks that could not be followed move with the rest of the face
+        if not ok.all():
+            shift = np.median(points[ok] - (self.face.points - origin)[ok], axis=0)
+            points[~ok] = self.face.points[~ok] - origin + shift
+        self.face = FaceLandmarks(points + origin)
+        self._remember(frame)
+        return self.face
+
+
+class FaceEffect(Effect):
+    """An effect drawn relative to the landmarks of a face.
+
+    ``detector`` is a detector name for ``get_detector`` or a callable. Time
+    spent in each stage is kept in ``timings``; ``stats()`` reports it along
+    with how often landmarks were detected rather than tracked.
+    """
+
+    stateful = True
+
+    def __init__(self, detector=None, keyframe_interval=KEYFRAME_INTERVAL):
+        self.detector = detector
+        self.keyframe_interval = keyframe_interval
+        self.timings = StageTimings()
+        self._tracker = None
+
+    def reset(self, seed=None):
+        if self._tracker is not None:
+            self._tracker.reset()
+
+    def unavailable(self):
+        if self.detector is None and find_spec("mediapipe") is None:
+            return "Finding faces needs the optional mediapipe package (pip install mediapipe)."
+        return None
+
+    def tracker(self):
+        if self._tracker is None:
+            detector = self.detector if callable(self.detector) else get_detector(self.detector)
+            if detector is None:
+                return None
+            self._tracker = FaceTracker(detector, self.keyframe_interval, self.timings)
+        return self._tracker
+
+    def apply(self, frame, t):
+        tracker = self.tracker()
+        if tracker is None:
+            return frame
+        face = tracker.update(frame, t)
+        if face is not None:
+            self.draw(frame, face, t)
+        return frame
+
+    def draw(self, frame, face, t):
+        raise NotImplementedError
+
+    def stats(self):
+        tracker = self._tracker
+        return {
+            "stages": self.timings.snapshot(),
+            "keyframes": tracker.keyframes if tracker else 0,
+            "tracking_lost": tracker.lost if tracker else 0,
+        }
@@ -0,0 +1,198 @@
+"""Snow and rain drawn by a vectorised particle system.
+
+Particle state is kept as one NumPy array per property (position, velocity,
+size, alpha), and every frame is a handful of whole-array operations: move all
+particles, respawn those that left the frame, turn each into the flat pixel
+indices of its stamp (a soft disc for snow, a streak for rain), sum the
+coverage of each pixel with ``bincount`` and blend only the pixels that were
+hit. Speeds and sizes scale with the frame height, so the look is the same at
+any resolution.
+"""
+import numpy as np
+
+from picflick.effects.base import Effect, blend_pixels
+
+# Longest time step simulated at once, in seconds, so a stalled stream does not
+# make every particle jump
+MAX_STEP = 0.1
+
+
+def disc_stamp(radius):
+    """Offsets and weights of a soft-edged disc."""
+    oy, ox = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    distance = np.hypot(ox, oy)
+    weights = np.clip(radius + 0.5 - distance, 0.0, 1.0)
+    keep = weights > 0
+    return ox[keep], oy[keep], weights[keep].astype(np.float32)
+
+
+class ParticleSystem:
+    """Positions, velocities, sizes, alphas and phases of ``count`` particles, one array each."""
+
+    def __init__(self, count, seed=0):
+        self.count = count
+        self.rng = np.random.default_rng(seed)
+        self.x = np.zeros(count, dtype=np.float32)
+        self.y = np.zeros(count, dtype=np.float32)
+        self.vx = np.zeros(count, dtype=np.float32)
+        self.vy = np.zeros(count, dtype=np.float32)
+        self.size = np.zeros(count, dtype=np.int8)
+        self.alpha = np.zeros(count, dtype=np.float32)
+        self.phase = np.zeros(count, dtype=np.float32)
+
+    def uniform(self, low, high, count):
+        return self.rng.uniform(low, high, count).astype(np.float32)
+
+
+def stamp_indices(x, y, ox, oy, width, height):
+    """Flat pixel indices of a stamp placed at every ``(x, y)``, and which
+    entries fall inside the frame. Returns ``(indices, inside)``, both shaped
+    ``(len(x), len(ox))``."""
+    xs = x.astype(np.int32)[:, None] + ox.astype(np.int32)
+    ys = y.astype(np.int32)[:, None] + oy.astype(np.int32)
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    return ys.astype(np.intp) * width + xs, inside
+
+
+class ParticleEffect(Effect):
+    stateful = True
+    color = (255, 255, 255)
+
+    def __init__(self, count=2000, seed=0):
+        self.count = count
+        self.seed = seed
+        self.reset()
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed = seed
+        self.particles = None
+        self.shape = None
+        self.last_t = None
+
+    def apply(self, frame, t):
+        height, width = frame.shape[:2]
+        if self.shape != (height, width):
+            self.shape = (height, width)
+            self.particles = ParticleSystem(self.count, self.seed)
+            self.spawn(np.arange(self.count), height, width, initial=True)
+            self.last_t = t
+        dt = min(max(t - self.last_t, 0.0), MAX_STEP)
+        self.last_t = t
+
+        self.step(dt, t, height, width)
+        indices, weights = self.rasterize(height, width)
+        if len(indices):
+            coverage = np.bincount(indices, weights=weights, minlength=height * width)
+            alpha = np.minimum(coverage[indices], 1.0).astype(np.float32)
+            blend_pixels(frame, indices, alpha, self.color)
+        return frame
+
+    def spawn(self, which, height, width, initial=False):
+        raise NotImplementedError
+
+    def step(self, dt, t, height, width):
+        raise NotImplementedError
+
+    def rasterize(self, height, width):
+        raise NotImplementedError
+
+
+class Snow(ParticleEffect):
+    """Flakes of a few sizes drifting down and swaying."""
+
+    name = "Snow Effect"
+    color = (255, 255, 255)
+
+    # Flake radii relative to a 720 pixel high frame, and how common each is
+    RADII = (1, 2, 3)
+    RADIUS_SHARE = (0.6, 0.3, 0.1)
+    SWAY = 0.03  # Sideways speed as a fraction of the frame height per second
+
+    def spawn(self, which, height, width, initial=False):
+        p = self.particles
+        n = len(which)
+        p.x[which] = p.uniform(0, width, n)
+        p.y[which] = p.uniform(0, height, n) if initial else p.uniform(-0.05 * height, 0, n)
+        p.size[which] = p.rng.choice(len(self.RADII), n, p=self.RADIUS_SHARE)
+        # Bigger flakes are closer, so they fall faster and are more opaque
+        depth = (p.size[which] + p.uniform(0.5, 1.5, n)) / len(self.RADII)
+        p.vy[which] = height * 0.06 * (1 + depth)
+        # Peak sideways speed; the sway itself follows a sine
+        p.vx[which] = self.SWAY * height * p.uniform(0.5, 1.5, n)
+        p.phase[which] = p.uniform(0, 2 * np.pi, n)
+        p.alpha[which] = np.clip(0.35 + 0.35 * depth, 0, 0.95)
+
+    def step(self, dt, t, height, width):
+        p = self.particles
+        p.y += p.vy * dt
+        p.x += p.vx * np.sin(p.phase + np.float32(1.3 * t)) * np.float32(dt)
+        np.mod(p.x, width, out=p.x)
+        gone = np.flatnonzero(p.y >= height + 4)
+        if len(gone):
+            self.spawn(gone, height, width)
+
+    def rasterize(self, height, width):
+        p = self.particles
+        scale = max(height / 720, 0.5)
+        indices = []
+        weights = []
+        for size, radius in enumerate(self.RADII):
+            which = np.flatnonzero(p.size == size)
+            if not len(which):
+                continue
+            ox, oy, stamp = disc_stamp(max(1, round(radius * scale)))
+            flat, inside = stamp_indices(p.x[which], p.y[which], ox, oy, width, height)
+            indices.append(flat[inside])
+            weights.append((p.alpha[which, None] * stamp)[inside])
+        if not indices:
+            # No flakes at all, or no flake sizes configured
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        return np.concatenate(indices), np.concatenate(weights)
+
+
+class Rain(ParticleEffect):
+    """Thin, fast, slanted streaks."""
+
+    name = "Rain Effect"
+    color = (205, 215, 235)
+
+    SLANT = 0.15  # Sideways speed as a fraction of the falling speed
+    LENGTH = 0.04  # Longest streak as a fraction of the frame height
+
+    def __init__(self, count=1500, seed=0):
+        super().__init__(count, seed)
+
+    def spawn(self, which, height, width, initial=False):
+        p = self.particles
+        n = len(which)
+        # Spawn far enough left that slanted drops cover the right-hand side too
+        p.x[which] = p.uniform(-self.SLANT * height, width, n)
+        p.y[which] = p.uniform(0, height, n) if initial else p.uniform(-self.LENGTH * height, 0, n)
+        p.vy[which] = height * p.uniform(1.2, 2.0, n)
+        p.vx[which] = p.vy[which] * self.SLANT
+        p.size[which] = p.rng.integers(40, 101, n)  # Streak length in percent of LENGTH
+        p.alpha[which] = p.uniform(0.15, 0.45, n)
+
+    def step(self, dt, t, height, width):
+        p = self.particles
+        p.x += p.vx * dt
+        p.y += p.vy * dt
+        gone = np.flatnonzero(p.y >= height + self.LENGTH * height)
+        if len(gone):
+            self.spawn(gone, height, width)
+
+    def rasterize(self, height, width):
+        p = self.particles
+        length = max(2, round(self.LENGTH * height))
+        # Every drop falls at the same angle, so one streak stamp serves them all
+        steps = np.arange(length)
+        ox = np.round(-steps * self.SLANT).astype(np.int32)
+        oy = -steps.astype(np.int32)
+        flat, inside = stamp_indices(p.x, p.y, ox, oy, width, height)
+        # Drops shorter than the stamp fade out early; the head is the brightest part
+        position = steps / length
+        fade = (1.0 - position)[None, :] * (position[None, :] * 100 < p.size[:, None])
+        weights = p.alpha[:, None] * fade.astype(np.float32)
+        inside &= weights > 0
+        return flat[inside], weights[inside]
@@ -0,0 +1,258 @@
+"""Face Filters overlays: masks and hats drawn onto the tracked head.
+
+Each overlay is a sprite kept as premultiplied-alpha arrays: colour already
+multiplied by alpha, and one minus alpha. Blending is then a single multiply
+and add, ``pixel * (1 - alpha) + colour``, over the sprite's bounding box
+only, written straight back into the frame. Sprites are scaled and rotated to
+fit the face once per size and angle step and the results kept, so a moving
+face reuses a handful of prepared variants instead of resampling every frame.
+
+Artwork is read from ``PICFLICK_SPRITES_DIR`` (``assets/sprites`` by default);
+when a file is missing a simple drawn version stands in for it.
+"""
+import math
+import os
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from picflick.effects.assets import shared_asset
+from picflick.effects.face import FaceEffect, clip_rect
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SPRITES_DIR = os.getenv("PICFLICK_SPRITES_DIR", os.path.join(ROOT_DIR, "assets", "sprites"))
+
+# Sprite variants are made for widths in steps of SIZE_STEP pixels and angles in
+# steps of ANGLE_STEP degrees; at most VARIANTS of them are kept per overlay
+SIZE_STEP = 8
+ANGLE_STEP = 3
+VARIANTS = 64
+
+# Width of the drawn stand-in sprites
+DRAWN_SIZE = 512
+
+
+def premultiply(image):
+    """An RGBA image as ``(colour * alpha, 1 - alpha)``: float32 ``(h, w, 3)`` 0-255 and ``(h, w, 1)`` 0-1."""
+    rgba = np.asarray(image.convert("RGBA"), dtype=np.float32)
+    alpha = rgba[:, :, 3:] / 255
+    return rgba[:, :, :3] * alpha, 1 - alpha
+
+
+def load_sprite(name, draw):
+    """The RGBA artwork called ``name``, from ``SPRITES_DIR`` or drawn by ``draw()`` if missing.
+
+    Returned as a read-only float32 ``(h, w, 4)`` premultiplied array (colour
+    0-255 times alpha, then alpha 0-1), loaded once per process and shared.
+    """
+    path = os.path.join(SPRITES_DIR, f"{name}.png")
+    # A changed file is a different asset
+    version = os.path.getmtime(path) if os.path.exists(path) else "drawn"
+
+    def build():
+        image = Image.open(path) if version != "drawn" else draw()
+        colour, transparency = premultiply(image)
+        return np.concatenate([colour, 1 - transparency], axis=2)
+
+    return shared_asset("sprite", (name, version), build)
+
+
+def resample(sprite, width, degrees):
+    """``sprite`` (premultiplied ``(h, w, 4)``) scaled to ``width`` and rotated by ``degrees`` clockwise.
+
+    Resampling premultiplied channels keeps the edges free of dark fringes.
+    """
+    height = max(1, round(sprite.shape[0] * width / sprite.shape[1]))
+    channels = []
+    for channel in range(4):
+        image = Image.fromarray(np.ascontiguousarray(sprite[:, :, channel]), mode="F")
+        image = image.resize((width, height), Image.BILINEAR)
+        if degrees:
+            image = image.rotate(-degrees, Image.BILINEAR, expand=True)
+        channels.append(np.asarray(image, dtype=np.float32))
+    return np.stack(channels, axis=2)
+
+
+class Variant:
+    """A sprite prepared for one size and angle, with ``anchor`` its anchor point in pixels."""
+
+    def __init__(self, sprite, anchor, width, degrees):
+        resampled = resample(sprite, width, degrees)
+        self.colour = np.ascontiguousarray(resampled[:, :, :3])
+        self.transparency = np.ascontiguousarray(1 - np.clip(resampled[:, :, 3:], 0, 1))
+        self.buffer = np.empty_like(self.colour)
+
+        # Where the anchor ends up: scaled with the sprite, then turned about the centre
+        source_height, source_width = sprite.shape[:2]
+        scale = width / source_width
+        offset_x = (anchor[0] - 0.5) * source_width * scale
+        offset_y = (anchor[1] - 0.5) * source_height * scale
+        radians = math.radians(degrees)
+        cos, sin = math.cos(radians), math.sin(radians)
+        height, width = self.colour.shape[:2]
+        self.anchor = (width / 2 + offset_x * cos - offset_y * sin, height / 2 + offset_x * sin + offset_y * cos)
+
+    def blend(self, frame, x, y):
+        """Composite onto ``frame`` in place with the anchor at ``(x, y)``, only over the sprite's box."""
+        height, width = self.colour.shape[:2]
+        left, top = round(x - self.anchor[0]), round(y - self.anchor[1])
+        x0, y0, x1, y1 = clip_rect((left, top, left + width, top + height), *frame.shape[:2])
+        if x1 <= x0 or y1 <= y0:
+            return frame
+        sprite_box = (slice(y0 - top, y1 - top), slice(x0 - left, x1 - left))
+        region = frame[y0:y1, x0:x1]
+        buffer = self.buffer[sprite_box]
+        np.multiply(region, self.transparency[sprite_box], out=buffer)
+        buffer += self.colour[sprite_box]
+        buffer += 0.5
+        np.copyto(region, buffer, casting="unsafe")
+        return frame
+
+
+class SpriteEffect(FaceEffect):
+    """An overlay that follows the head.
+
+    Subclasses name the artwork (``asset``), draw a stand-in (``stand_in``), give
+    the sprite's ``anchor`` as a fraction of its size, its ``scale`` in face
+    widths, and where on the face the anchor goes (``place``).
+    """
+
+    asset = ""
+    anchor = (0.5, 0.5)
+    scale = 1.0
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.sprite = load_sprite(self.asset, self.stand_in)
+        self.variants = OrderedDict()
+
+    @staticmethod
+    def stand_in():
+        raise NotImplementedError
+
+    def place(self, face):
+        """Frame position of the sprite's anchor for ``face``."""
+        raise NotImplementedError
+
+    def variant(self, face):
+        width = max(SIZE_STEP, round(face.width * self.scale / SIZE_STEP) * SIZE_STEP)
+        degrees = round(math.degrees(face.angle) / ANGLE_STEP) * ANGLE_STEP
+        key = (width, degrees)
+        variant = self.variants.get(key)
+        if variant is None:
+            with self.timings.stage("resample"):
+                variant = self.variants[key] = Variant(self.sprite, self.anchor, width, degrees)
+            if len(self.variants) > VARIANTS:
+                self.variants.popitem(last=False)
+        else:
+            self.variants.move_to_end(key)
+        return variant
+
+    def draw(self, frame, face, t):
+        variant = self.variant(face)
+        with self.timings.stage("blend"):
+            variant.blend(frame, *self.place(face))
+
+    def stats(self):
+        stats = super().stats()
+        stats["variants"] = len(self.variants)
+        return stats
+
+
+def eye_line_centre(face):
+    return (face.eye("right")[0] + face.eye("left")[0]) / 2
+
+
+def transparent(width, height):
+    image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    return image, ImageDraw.Draw(image)
+
+
+def eye_holes(draw, width, y, rx, ry):
+    # Eyes sit 0.2 face widths either side of the centre; masks are 1.25 face widths wide
+    for x in (0.5 - 0.16, 0.5 + 0.16):
+        draw.ellipse((x * width - rx, y - ry, x * width + rx, y + ry), fill=(0, 0, 0, 0))
+
+
+class WarriorMask(SpriteEffect):
+    """A steel half mask with red war paint."""
+
+    name = "Warrior Mask"
+    asset = "warrior_mask"
+    anchor = (0.5, 0.42)
+    scale = 1.25
+
+    @staticmethod
+    def stand_in():
+        width, height = DRAWN_SIZE, 360
+        image, draw = transparent(width, height)
+        outline = [(20, 60), (256, 0), (492, 60), (470, 220), (340, 300), (256, 262), (172, 300), (42, 220)]
+        draw.polygon(outline, fill=(150, 152, 162, 255), outline=(40, 40, 46, 255), width=8)
+        draw.line([(256, 8), (256, 255)], fill=(205, 207, 215, 255), width=12)
+        for side in (-1, 1):
+            x = 256 + side * 82
+            draw.polygon([(x - 50, 190), (x + 50, 190), (x + 30, 235), (x - 30, 235)], fill=(175, 30, 30, 255))
+            draw.line([(x - 60, 95), (x + 60, 115 if side < 0 else 75)], fill=(60, 60, 66, 255), width=10)
+        eye_holes(draw, width, 0.42 * height, 46, 26)
+        return image
+
+    def place(self, face):
+        return eye_line_centre(face)
+
+
+class TribalMask(SpriteEffect):
+    """A flat, brightly patterned mask."""
+
+    name = "2D Colourful Tribal Mask"
+    asset = "tribal_mask"
+    anchor = (0.5, 0.42)
+    scale = 1.25
+
+    COLOURS = ((230, 120, 30), (30, 150, 200), (220, 40, 110), (250, 210, 40), (40, 170, 80))
+
+    @staticmethod
+    def stand_in():
+        width, height = DRAWN_SIZE, 400
+        image, draw = transparent(width, height)
+        colours = TribalMask.COLOURS
+        for band in range(5):
+            inset = band * 28
+            draw.ellipse(
+                (8 + inset, 8 + inset, width - 8 - inset, height - 8 - inset),
+                fill=colours[band] + (255,), outline=(25, 20, 20, 255), width=4,
+            )
+        for number in range(9):
+            x = 60 + number * 49
+            draw.polygon([(x, 95), (x + 24, 45), (x + 48, 95)], fill=colours[(number + 2) % 5] + (255,))
+        draw.polygon([(256, 215), (226, 300), (286, 300)], fill=colours[4] + (255,), outline=(25, 20, 20, 255))
+        eye_holes(draw, width, 0.42 * height, 44, 28)
+        return image
+
+    def place(self, face):
+        return eye_line_centre(face)
+
+
+class BaseballCap(SpriteEffect):
+    """A cap sitting on top of the head."""
+
+    name = "Baseball Cap"
+    asset = "baseball_cap"
+    anchor = (0.5, 0.85)
+    scale = 1.2
+
+    @staticmethod
+    def stand_in():
+        width, height = DRAWN_SIZE, 300
+        image, draw = transparent(width, height)
+        crown, brim = (25, 60, 140, 255), (15, 35, 90, 255)
+        draw.pieslice((56, 40, 456, 440), 180, 360, fill=crown)
+        for x in (156, 256, 356):
+            draw.line([(256, 42), (x, 240)], fill=brim, width=5)
+        draw.ellipse((242, 30, 270, 54), fill=brim)
+        draw.ellipse((206, 120, 306, 200), fill=(240, 240, 240, 255))
+        draw.ellipse((30, 222, 482, 296), fill=brim)
+        return image
+
+    def place(self, face):
+        return face["forehead"]
@@ -0,0 +1,99 @@
+"""Synthetic frames, for trying effects without a camera or video file.
+
+The frames show a cartoon face circling over a moving gradient. Its landmarks
+are known exactly, so face effects can be tried without a face detector.
+"""
+import numpy as np
+
+from picflick.effects.face import LANDMARKS, FaceLandmarks
+
+SKIN = (226, 186, 150)
+EYE_WHITE = (245, 245, 245)
+IRIS = (110, 75, 40)
+PUPIL = (15, 10, 10)
+MOUTH = (150, 40, 50)
+NOSE = (196, 150, 120)
+
+# Landmark positions as multiples of the face radius from its centre
+FACE_LAYOUT = {
+    "forehead": (0.0, -0.95), "chin": (0.0, 0.95), "right_cheek": (-0.95, 0.0), "left_cheek": (0.95, 0.0),
+    "nose": (0.0, 0.1),
+    "mouth_top": (0.0, 0.42), "mouth_bottom": (0.0, 0.58), "mouth_right": (-0.35, 0.5), "mouth_left": (0.35, 0.5),
+    "right_eye_outer": (-0.6, -0.2), "right_eye_inner": (-0.16, -0.2),
+    "right_eye_top": (-0.38, -0.31), "right_eye_bottom": (-0.38, -0.09),
+    "left_eye_inner": (0.16, -0.2), "left_eye_outer": (0.6, -0.2),
+    "left_eye_top": (0.38, -0.31), "left_eye_bottom": (0.38, -0.09),
+    "right_iris": (-0.38, -0.2), "right_iris_edge": (-0.29, -0.2),
+    "left_iris": (0.38, -0.2), "left_iris_edge": (0.47, -0.2),
+}
+LAYOUT = np.array([FACE_LAYOUT[name] for name in LANDMARKS], dtype=np.float32)
+
+
+def synthetic_face(width, height, t):
+    """Centre ``(x, y)`` and radius of the synthetic face at time ``t``."""
+    radius = max(4, min(width, height) // 5)
+    x = (0.5 + 0.3 * np.cos(t)) * (width - 2 * radius) + radius
+    y = (0.5 + 0.3 * np.sin(t)) * (height - 2 * radius) + radius
+    return (x, y), radius
+
+
+def synthetic_landmarks(width, height, t):
+    (x, y), radius = synthetic_face(width, height, t)
+    return FaceLandmarks(LAYOUT * radius + np.array([x, y], dtype=np.float32))
+
+
+def _ellipse(xs, ys, centre, rx, ry):
+    return ((xs - centre[0]) / rx) ** 2 + ((ys - centre[1]) / ry) ** 2 <= 1
+
+
+def draw_face(out, t):
+    height, width = out.shape[:2]
+    (cx, cy), radius = synthetic_face(width, height, t)
+    x0, y0 = int(cx - radius), int(cy - radius)
+    region = out[y0:y0 + 2 * radius + 1, x0:x0 + 2 * radius + 1]
+    ys, xs = np.mgrid[0:region.shape[0], 0:region.shape[1]].astype(np.float32)
+    # Coordinates in face radii from the centre
+    xs = (xs + x0 - cx) / radius
+    ys = (ys + y0 - cy) / radius
+
+    region[_ellipse(xs, ys, (0, 0), 1, 1)] = SKIN
+    region[_ellipse(xs, ys, (0, 0.1), 0.07, 0.07)] = NOSE
+    region[_ellipse(xs, ys, (0, 0.5), 0.35, 0.08)] = MOUTH
+    for side in (-1, 1):
+        eye = (0.38 * side, -0.2)
+        region[_ellipse(xs, ys, eye, 0.22, 0.11)] = EYE_WHITE
+        region[_ellipse(xs, ys, eye, 0.09, 0.09)] = IRIS
+        region[_ellipse(xs, ys, eye, 0.04, 0.04)] = PUPIL
+
+
+def synthetic_frame(width, height, t=0.0, out=None):
+    """A moving colour gradient with a cartoon face that circles the frame.
+
+    Pass ``out`` to draw into an existing frame instead of allocating one.
+    """
+    if out is None:
+        out = np.empty((height, width, 3), dtype=np.uint8)
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    ys = np.linspace(0, 255, height, dtype=np.float32)
+    shift = np.float32(40 * t)
+    out[..., 0] = ((xs[None, :] + shift) % 256).astype(np.uint8)
+    out[..., 1] = ys[:, None].astype(np.uint8)
+    out[..., 2] = 96
+    draw_face(out, t)
+    return out
+
+
+def synthetic_frames(width, height, count, fps=30.0):
+    """Yield ``(frame, t)`` for ``count`` frames at ``fps``, reusing one buffer."""
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    for number in range(count):
+        t = number / fps
+        yield synthetic_frame(width, height, t, out=frame), t
+
+
+class SyntheticFaceDetector:
+    """Landmarks of the face ``synthetic_frame`` draws, for trying face effects without a detector."""
+
+    def __call__(self, frame, t):
+        height, width = frame.shape[:2]
+        return synthetic_landmarks(width, height, t)
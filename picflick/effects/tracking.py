@@ -0,0 +1,125 @@
+"""Pyramidal Lucas–Kanade point tracking in NumPy.
+
+Only a couple of dozen points are followed, so everything is done for all of
+them at once: each point's window is sampled bilinearly as one row of a
+``(points, window pixels)`` array, and every iteration is a few whole-array
+sums. Images are small grayscale crops around the face, never whole frames.
+"""
+import numpy as np
+
+# Luma weights for RGB to gray
+GRAY_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def to_gray(frame, rect):
+    """The ``(x0, y0, x1, y1)`` crop of ``frame`` as float32 gray levels 0-255."""
+    x0, y0, x1, y1 = rect
+    return frame[y0:y1, x0:x1] @ GRAY_WEIGHTS
+
+
+def half_size(image):
+    """``image`` shrunk to half its size by averaging 2x2 blocks."""
+    h, w = image.shape[0] // 2, image.shape[1] // 2
+    image = image[:2 * h, :2 * w]
+    return 0.25 * (image[0::2, 0::2] + image[1::2, 0::2] + image[0::2, 1::2] + image[1::2, 1::2])
+
+
+def pyramid(image, levels):
+    """``image`` followed by ``levels - 1`` successively halved copies, stopping before they get tiny."""
+    images = [image]
+    while len(images) < levels and min(images[-1].shape) >= 32:
+        images.append(half_size(images[-1]))
+    return images
+
+
+def bilinear(image, xs, ys):
+    """``image`` sampled at float coordinates (any matching shapes), clamped to its edges."""
+    h, w = image.shape
+    xs = np.clip(xs, 0, w - 1.001)
+    ys = np.clip(ys, 0, h - 1.001)
+    x0 = xs.astype(np.intp)
+    y0 = ys.astype(np.intp)
+    fx = xs - x0
+    fy = ys - y0
+    flat = image.ravel()
+    i = y0 * w + x0
+    top = flat[i] * (1 - fx) + flat[i + 1] * fx
+    bottom = flat[i + w] * (1 - fx) + flat[i + w + 1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+class LucasKanade:
+    """Follows points from one gray image to the next.
+
+    ``window`` is the side of the square each point is matched by, ``levels``
+    the pyramid depth (each level doubles the largest motion that can be
+    followed). Points whose window has too little texture, whose match is
+    poor, or that leave the image are reported as lost.
+    """
+
+    def __init__(self, window=13, levels=3, iterations=10, min_texture=2.0, max_error=18.0):
+        half = window // 2
+        oy, ox = np.mgrid[-half:half + 1, -half:half + 1]
+        self.ox = ox.ravel().astype(np.float32)
+        self.oy = oy.ravel().astype(np.float32)
+        self.levels = levels
+        self.iterations = iterations
+        self.min_texture = min_texture
+        self.max_error = max_error
+
+    def track(self, previous, current, points):
+        """Where ``points`` (``(n, 2)`` x, y in ``previous``) went in ``current``.
+
+        Returns the new points and a boolean array of which were tracked.
+        """
+        points = np.asarray(points, dtype=np.float32)
+        previous_levels = pyramid(previous, self.levels)
+        current_levels = pyramid(current, self.levels)
+        ox, oy = self.ox, self.oy
+        area = len(ox)
+
+        motion = np.zeros_like(points)
+        for level in range(len(previous_levels) - 1, -1, -1):
+            scale = 2.0 ** level
+            before, after = previous_levels[level], current_levels[level]
+            xs = points[:, 0:1] / scale + ox
+            ys = points[:, 1:2] / scale + oy
+
+            # The previous window and its gradients stay fixed while iterating
+            template = bilinear(before, xs, ys)
+            ix = 0.5 * (bilinear(before, xs + 1, ys) - bilinear(before, xs - 1, ys))
+            iy = 0.5 * (bilinear(before, xs, ys + 1) - bilinear(before, xs, ys - 1))
+            sxx = (ix * ix).sum(1)
+            syy = (iy * iy).sum(1)
+            sxy = (ix * iy).sum(1)
+            det = sxx * syy - sxy * sxy
+            # Texture: the smaller eigenvalue of the gradient matrix per window pixel
+            smallest = 0.5 * (sxx + syy) - np.sqrt(0.25 * (sxx - syy) ** 2 + sxy * sxy)
+            textured = smallest / area >= self.min_texture
+            usable = det > 1e-6
+            det = np.where(usable, det, 1.0)
+
+            for _ in range(self.iterations):
+                moved = bilinear(after, xs + motion[:, 0:1], ys + motion[:, 1:2])
+                difference = template - moved
+                bx = (difference * ix).sum(1)
+                by = (difference * iy).sum(1)
+                step_x = np.where(usable, (syy * bx - sxy * by) / det, 0.0)
+                step_y = np.where(usable, (sxx * by - sxy * bx) / det, 0.0)
+                motion[:, 0] += step_x
+                motion[:, 1] += step_y
+                # Flat windows may never settle, so only textured ones decide when to stop
+                if not textured.any() or max(np.abs(step_x[textured]).max(), np.abs(step_y[textured]).max()) < 0.03:
+                    break
+            if level:
+                motion *= 2
+
+        # Judge the match at full resolution
+        error = np.abs(difference).mean(1)
+        tracked = points + motion
+        h, w = current.shape
+        inside = (
+            (tracked[:, 0] >= 0) & (tracked[:, 0] <= w - 1) & (tracked[:, 1] >= 0) & (tracked[:, 1] <= h - 1)
+        )
+        ok = usable & textured & (error <= self.max_error) & inside
+        return tracked, ok
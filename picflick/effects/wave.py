@@ -0,0 +1,100 @@
+"""Distorted Wave: the picture ripples sideways and up and down.
+
+Each output pixel is read from a source pixel shifted by a sine of the other
+coordinate: rows slide left and right, columns up and down. Both shifts are
+tabulated once per frame size over the frame plus one wavelength, so animating
+the wave is just starting the table at another offset; no sine is evaluated per
+frame. The output is gathered from the source through a preallocated index
+map; only the bands along the edges, where a shift can point outside the
+frame, are clamped separately, in scratch buffers made with the tables, so
+drawing a frame allocates nothing. ``render`` reads one buffer and writes
+another; ``apply`` works in place by copying the frame first.
+"""
+import numpy as np
+
+from picflick.effects.base import Effect
+
+
+class _Tables:
+    def __init__(self, height, width, amplitude, wavelength):
+        self.amplitude = max(1, int(round(amplitude * height)))
+        self.wavelength = max(8, int(round(wavelength * height)))
+        a, period = self.amplitude, self.wavelength
+
+        # Shift of every row (sideways) and every column (up and down), over
+        # one extra wavelength so any phase is a plain slice
+        self.row_shift = np.round(a * np.sin(2 * np.pi * np.arange(height + period) / period)).astype(np.intp)
+        self.column_shift = np.round(a * np.sin(2 * np.pi * np.arange(width + period) / period)).astype(np.intp)
+
+        # Flat index of output pixel (y, x) in the source, before any shift
+        self.row_base = np.arange(height, dtype=np.intp) * width
+        self.column_base = np.arange(width, dtype=np.intp)
+        self.row_term = np.empty(height, dtype=np.intp)
+        self.column_term = np.empty(width, dtype=np.intp)
+        self.index = np.empty((height, width), dtype=np.intp)
+
+        # Only pixels within the amplitude of an edge can be shifted outside
+        # the frame; these bands are clamped on their own, each with its
+        # coordinates and room for its clamped source rows and columns
+        a = min(a, height // 2, width // 2)
+        middle, across = slice(a, height - a), slice(0, width)
+        self.edges = []
+        for rows, columns in (
+            (slice(0, a), across), (slice(height - a, height), across),
+            (middle, slice(0, a)), (middle, slice(width - a, width)),
+        ):
+            ys = np.arange(height, dtype=np.intp)[rows, None]
+            xs = np.arange(width, dtype=np.intp)[None, columns]
+            shape = (ys.shape[0], xs.shape[1])
+            self.edges.append((rows, columns, ys, xs, np.empty(shape, np.intp), np.empty(shape, np.intp)))
+        self.copy = np.empty((height, width, 3), dtype=np.uint8)
+
+
+class DistortedWave(Effect):
+    name = "Distorted Wave Effect"
+
+    def __init__(self, amplitude=0.012, wavelength=0.25, speed=0.8):
+        """``amplitude`` and ``wavelength`` are fractions of the frame height;
+        ``speed`` is in wavelengths per second."""
+        self.amplitude = amplitude
+        self.wavelength = wavelength
+        self.speed = speed
+        self._tables = None
+        self._shape = None
+
+    def _tables_for(self, height, width):
+        if self._shape != (height, width):
+            self._tables = _Tables(height, width, self.amplitude, self.wavelength)
+            self._shape = (height, width)
+        return self._tables
+
+    def apply(self, frame, t):
+        tables = self._tables_for(*frame.shape[:2])
+        np.copyto(tables.copy, frame)
+        return self.render(tables.copy, frame, t)
+
+    def render(self, source, out, t):
+        """Draw the wave of ``source`` into ``out``, a different frame of the same size."""
+        height, width = source.shape[:2]
+        tables = self._tables_for(height, width)
+        period = tables.wavelength
+
+        # Phase-shift the tables by slicing them at another offset
+        offset = int(t * self.speed * period) % period
+        row_shift = tables.row_shift[offset:offset + height]
+        column_shift = tables.column_shift[offset:offset + width]
+        np.add(tables.row_base, row_shift, out=tables.row_term)
+        np.multiply(column_shift, width, out=tables.column_term)
+        tables.column_term += tables.column_base
+        np.add(tables.row_term[:, None], tables.column_term[None, :], out=tables.index)
+
+        for rows, columns, ys, xs, source_y, source_x in tables.edges:
+            np.add(ys, column_shift[None, columns], out=source_y)
+            np.clip(source_y, 0, height - 1, out=source_y)
+            source_y *= width
+            np.add(xs, row_shift[rows, None], out=source_x)
+            np.clip(source_x, 0, width - 1, out=source_x)
+            np.add(source_y, source_x, out=tables.index[rows, columns])
+
+        np.take(source.reshape(-1, 3), tables.index.reshape(-1), axis=0, out=out.reshape(-1, 3), mode="clip")
+        return out
@@ -0,0 +1,258 @@
+"""Offline thumbnail pyramids for every image in the filter catalog.
+
+Run before deploying so no page view has to download or resize anything::
+
+    python -m picflick.pyramid --workers 8
+
+Each source image is resized to every width in ``LEVELS`` plus a tiny blurred
+placeholder, in a process pool. Sources are fetched with the ETag and
+Last-Modified the server sent last time, so an unchanged image is not
+downloaded again; when the server does not support that, sources whose
+content hash matches the previous run are still skipped. The results are
+listed in ``static/pyramid/manifest.json``, which the pages read to pick an
+image size.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import ImageFilter
+
+from picflick.catalog import CATALOG_PATH, load_catalog
+from picflick.thumbnails import (
+    FETCH_TIMEOUT, IMAGE_FORMAT, MAX_SOURCE_BYTES, STATIC_DIR, STATIC_URL, USER_AGENT, content_name,
+    encode_image, open_image, write_atomic,
+)
+
+# Under static/, the only place the pages can serve the images from
+PYRAMID_DIR = os.path.join(STATIC_DIR, "pyramid")
+MANIFEST_PATH = os.path.join(PYRAMID_DIR, "manifest.json")
+PYRAMID_URL = f"{STATIC_URL}/pyramid"
+
+LEVELS = (160, 320, 640)
+PLACEHOLDER_WIDTH = 24
+
+# How often the pages check the manifest for a newer build, in seconds
+MANIFEST_CHECK_INTERVAL = 5
+
+
+def placeholder_data_uri(image):
+    placeholder = image.copy()
+    placeholder.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH * 4))
+    placeholder = placeholder.filter(ImageFilter.GaussianBlur(1))
+    data = encode_image(placeholder, PLACEHOLDER_WIDTH, quality=30)
+    return f"data:image/{IMAGE_FORMAT.lower()};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def fetch_if_changed(url, validators=None, timeout=FETCH_TIMEOUT):
+    """The image at ``url`` and the validators to ask with next time, or None for
+    the image if the server says it has not changed since ``validators``."""
+    headers = {"User-Agent": USER_AGENT}
+    validators = validators or {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as response:
+            data = response.read(MAX_SOURCE_BYTES + 1)
+            sent = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None, validators
+        raise
+    if len(data) > MAX_SOURCE_BYTES:
+        raise ValueError(f"Image larger than {MAX_SOURCE_BYTES} bytes: {url}")
+    return data, {name: value for name, value in sent.items() if value}
+
+
+def build_pyramid(url, previous=None, output_dir=PYRAMID_DIR, force=False):
+    """Build the pyramid for one source image.
+
+    Returns its manifest entry and whether anything was rebuilt; ``previous`` is
+    returned when the source has not changed.
+    """
+    reusable = bool(previous) and not force and all(
+        os.path.exists(os.path.join(output_dir, name)) for name in previous["levels"].values()
+    )
+    data, validators = fetch_if_changed(url, previous.get("validators") if reusable else None)
+    if data is None:
+        return previous, False
+    source_hash = hashlib.sha256(data).hexdigest()
+
+    if reusable and previous["source_hash"] == source_hash:
+        # The same image again; keep the new validators so next time can ask
+        return dict(previous, validators=validators), False
+
+    image = open_image(data)
+    levels = {}
+    for width in LEVELS:
+        # Small sources are not upscaled, so several levels may share one file
+        encoded = encode_image(image, width)
+        name = content_name(encoded)
+        path = os.path.join(output_dir, name)
+        if not os.path.exists(path):
+            write_atomic(path, encoded)
+        levels[str(width)] = name
+
+    entry = {
+        "source_hash": source_hash,
+        "width": image.width,
+        "height": image.height,
+        "levels": levels,
+        "placeholder": placeholder_data_uri(image),
+        "validators": validators,
+    }
+    return entry, True
+
+
+def _build_pyramid_in_worker(*args):
+    # Some errors, such as urllib's HTTPError, cannot be pickled back to the parent process
+    try:
+        return build_pyramid(*args)
+    except Exception as e:
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+def read_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"levels": list(LEVELS), "images": {}}
+
+
+def build_manifest(catalog, output_dir=PYRAMID_DIR, workers=None, force=False, prune=False):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    previous = read_manifest(manifest_path)["images"]
+
+    urls = sorted({filter["image_url"] for filter in catalog if filter["image_url"].startswith("http")})
+    images = {}
+    built = skipped = failed = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_build_pyramid_in_worker, url, previous.get(url), output_dir, force): url
+            for url in urls
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                images[url], changed = future.result()
+            except Exception as e:
+                print(f"Failed {url}: {e}", file=sys.stderr)
+                failed += 1
+                # Keep serving the last good build if there is one
+                if url in previous:
+                    images[url] = previous[url]
+                continue
+            built += changed
+            skipped += not changed
+
+    manifest = {"levels": list(LEVELS), "images": dict(sorted(images.items()))}
+    write_atomic(manifest_path, json.dumps(manifest, indent=1).encode("utf-8"))
+
+    if prune:
+        referenced = {name for entry in images.values() for name in entry["levels"].values()}
+        for entry in os.scandir(output_dir):
+            if entry.is_file() and entry.name != "manifest.json" and entry.name not in referenced:
+                os.remove(entry.path)
+
+    return {"built": built, "skipped": skipped, "failed": failed}
+
+
+class PyramidManifest:
+    """The last built manifest, reloaded when the file on disk changes."""
+
+    def __init__(self, path=MANIFEST_PATH, url_prefix=PYRAMID_URL):
+        self.path = path
+        self.url_prefix = url_prefix
+        self._images = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < MANIFEST_CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                self._images, self._mtime = {}, None
+                return
+            if mtime != self._mtime:
+                self._images, self._mtime = read_manifest(self.path)["images"], mtime
+
+    @property
+    def version(self):
+        self._refresh()
+        return self._mtime
+
+    def get(self, url):
+        self._refresh()
+        return self._images.get(url)
+
+    def src(self, url, width):
+        """URL of the smallest level at least ``width`` wide, or None if ``url`` was not built."""
+        entry = self.get(url)
+        if entry is None:
+            return None
+        levels = sorted(int(level) for level in entry["levels"])
+        level = next((level for level in levels if level >= width), levels[-1])
+        return f"{self.url_prefix}/{entry['levels'][str(level)]}"
+
+    def srcset(self, url):
+        entry = self.get(url)
+        if entry is None:
+            return None
+        # Levels larger than the source share a file, which must only be listed once
+        widths = {}
+        for level, name in entry["levels"].items():
+            widths.setdefault(name, min(int(level), entry["width"]))
+        return ", ".join(f"{self.url_prefix}/{name} {width}w" for name, width in widths.items())
+
+    def placeholder(self, url):
+        entry = self.get(url)
+        return entry["placeholder"] if entry else None
+
+
+_manifest = PyramidManifest()
+
+
+def get_manifest():
+    return _manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build thumbnail pyramids for the filter catalog.")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="catalog file to read")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="rebuild even unchanged sources")
+    parser.add_argument("--prune", action="store_true", help="delete images no longer in the manifest")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = build_manifest(
+        load_catalog(args.catalog), PYRAMID_DIR, workers=args.workers, force=args.force, prune=args.prune
+    )
+    print(
+        f"Built {stats['built']}, skipped {stats['skipped']} unchanged, "
+        f"{stats['failed']} failed in {time.perf_counter() - started:.1f}s"
+    )
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
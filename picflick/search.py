@@ -0,0 +1,173 @@
+"""Ranked full-text search over every filter in the catalog.
+
+The index is built once per process: an inverted index from terms to weighted
+postings, a sorted vocabulary for prefix expansion, and a trigram index over the
+vocabulary so misspelt words still find their closest terms.
+"""
+import re
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from picflick.catalog import CATALOG_PATH, load_catalog
+
+# Matches in the name count for more than matches in the descriptions
+FIELD_WEIGHTS = {"name": 3.0, "short_desc": 1.5, "long_desc": 1.0}
+
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.8
+FUZZY_MATCH = 0.5
+
+# Caps on how many vocabulary terms a single query word may expand to
+MAX_PREFIX_TERMS = 50
+MAX_FUZZY_TERMS = 10
+
+SearchHit = namedtuple("SearchHit", ["filter", "score"])
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words too common in the descriptions to be worth indexing
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or that the this to "
+    "with you your".split()
+)
+
+
+def tokenize(text):
+    return [word for word in _TOKEN_RE.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Edit distance between ``a`` and ``b`` counting swapped neighbours as one edit.
+
+    Gives up and returns ``limit + 1`` as soon as the distance exceeds ``limit``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            distance = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+            if before and i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, before[j - 2] + 1)
+            current.append(distance)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    def __init__(self, filters):
+        self.filters = tuple(filters)
+
+        postings = {}
+        for doc, filter in enumerate(self.filters):
+            for field, weight in FIELD_WEIGHTS.items():
+                for term, count in Counter(tokenize(filter.get(field) or "")).items():
+                    # Repeated words help, but with diminishing returns
+                    doc_weights = postings.setdefault(term, {})
+                    doc_weights[doc] = doc_weights.get(doc, 0.0) + weight * (1 + 0.1 * (count - 1))
+
+        # Each posting list is a pair of arrays so a query scores whole lists at once
+        self.vocabulary = sorted(postings)
+        self.postings = [
+            (
+                np.fromiter(postings[term].keys(), dtype=np.int32),
+                np.fromiter(postings[term].values(), dtype=np.float32),
+            )
+            for term in self.vocabulary
+        ]
+
+        self._trigrams = {}
+        for term_id, term in enumerate(self.vocabulary):
+            for trigram in trigrams(term):
+                self._trigrams.setdefault(trigram, []).append(term_id)
+
+    def __len__(self):
+        return len(self.filters)
+
+    def _prefix_terms(self, word):
+        # Yields (term id, match quality), the exact term first if present
+        start = bisect_left(self.vocabulary, word)
+        stop = min(start + MAX_PREFIX_TERMS, len(self.vocabulary))
+        for term_id in range(start, stop):
+            term = self.vocabulary[term_id]
+            if not term.startswith(word):
+                break
+            yield term_id, EXACT_MATCH if term == word else PREFIX_MATCH
+
+    def _fuzzy_terms(self, word):
+        limit = 1 if len(word) <= 4 else 2
+        query_trigrams = trigrams(word)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+
+        matches = []
+        for term_id, count in shared.most_common():
+            if count < len(query_trigrams) // 3:
+                break
+            term = self.vocabulary[term_id]
+            # Compare against the start of the term so typos in a prefix still match
+            distance = min(
+                edit_distance(word, term, limit),
+                edit_distance(word, term[:len(word)], limit),
+            )
+            if distance <= limit:
+                matches.append((term_id, FUZZY_MATCH * (1 - distance / (limit + 1))))
+                if len(matches) == MAX_FUZZY_TERMS:
+                    break
+        return matches
+
+    def _expand(self, word):
+        terms = list(self._prefix_terms(word))
+        if not terms and len(word) >= 3:
+            terms = self._fuzzy_terms(word)
+        return terms
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` :class:`SearchHit` s for ``query``, best match first."""
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+
+        scores = np.zeros(len(self.filters), dtype=np.float32)
+        matched_words = np.zeros(len(self.filters), dtype=np.float32)
+        best = np.empty_like(scores)
+        for word in words:
+            # A word only counts once per filter, through its best matching term
+            best.fill(0.0)
+            for term_id, quality in self._expand(word):
+                docs, weights = self.postings[term_id]
+                best[docs] = np.maximum(best[docs], quality * weights)
+            scores += best
+            matched_words += best > 0
+
+        # Filters that match more of the query words always rank first
+        ranking = matched_words * (scores.max() + 1) + scores
+        candidates = np.flatnonzero(ranking)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-ranking[candidates], limit - 1)[:limit]]
+        ranked = candidates[np.lexsort((candidates, -ranking[candidates]))]
+        return [SearchHit(self.filters[doc], round(float(scores[doc]), 3)) for doc in ranked]
+
+
+@lru_cache(maxsize=None)
+def load_search_index(path=CATALOG_PATH):
+    """Return the search index for the catalog at ``path``, built once per process."""
+    return SearchIndex(load_catalog(path))
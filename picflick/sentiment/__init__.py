@@ -0,0 +1,11 @@
+"""Sentiment analysis behind the Sentiment Analysis Report page."""
+from picflick.sentiment.analysis import (
+    DEFAULT_MODE, MODES, AnalysisError, analyze_conversation, iter_analysis,
+)
+from picflick.sentiment.conversation import ConversationStore
+from picflick.sentiment.llm import get_model, model_metrics
+
+__all__ = [
+    "DEFAULT_MODE", "MODES", "AnalysisError", "analyze_conversation", "iter_analysis",
+    "ConversationStore", "get_model", "model_metrics",
+]
@@ -0,0 +1,674 @@
+"""Sentiment analysis of support conversations, one turn at a time.
+
+Each turn (a user message and the agent's reply) is scored once and cached under
+a hash of its content, so re-analysing a growing conversation only sends the new
+turns to the model. The report figures are then derived from the cached scores.
+
+Long conversations are split into windows of at most ``WINDOW_TOKENS`` prompt
+tokens, which are sent to the model concurrently. Every window scores its own
+turns, so merging is just putting the scores back in turn order, and a
+conversation ten times longer takes about as long as one window.
+
+Gemini is asked for output matching a JSON schema, and responses are parsed
+leniently and validated. Turns or fields that are still missing or invalid are
+asked for again on their own, rather than redoing the whole conversation.
+
+Three modes trade quality for speed and cost:
+
+- ``llm``: the model scores every turn.
+- ``fast``: the offline lexicon scores every turn; no API calls at all.
+- ``hybrid``: the lexicon scores every turn, and one cached model call per
+  window picks the dominant emotion and the most positive and negative messages.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from picflick.sentiment import lexicon
+from picflick.sentiment.conversation import turn_keys
+from picflick.sentiment.llm import DEFAULT_MODEL, MAX_CONCURRENCY, PooledModel, get_model, metrics
+from picflick.sentiment.parsing import extract_object, iter_objects
+from picflick.sentiment.results import get_result_store, result_key
+from picflick.sentiment.singleflight import SingleFlight
+
+EMOTIONS = ("frustrated", "satisfied", "confused", "neutral", "angry")
+
+# Near misses for the emotions above, taken as the emotion they stand for
+EMOTION_ALIASES = {
+    "happy": "satisfied", "pleased": "satisfied", "grateful": "satisfied", "positive": "satisfied",
+    "annoyed": "frustrated", "irritated": "frustrated", "disappointed": "frustrated", "upset": "frustrated",
+    "mad": "angry", "furious": "angry", "unsure": "confused", "uncertain": "confused", "calm": "neutral",
+}
+
+HIGHLIGHT_FIELDS = ("dominant_emotion", "top_positive", "top_negative")
+
+# Bump whenever the prompt or its parsing changes, so stale results are not reused
+PROMPT_VERSION = "turns-2"
+
+# Ask Gemini for output matching a JSON schema instead of trusting the prompt alone
+STRUCTURED_OUTPUT = os.getenv("SENTIMENT_STRUCTURED_OUTPUT", "1") != "0"
+
+TURN_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "turn": {"type": "integer"},
+            "score": {"type": "number", "minimum": -1, "maximum": 1},
+            "emotion": {"type": "string", "enum": list(EMOTIONS)},
+        },
+        "required": ["turn", "score", "emotion"],
+    },
+}
+
+# Earlier turns sent along with the new ones so the model has some context
+CONTEXT_TURNS = 2
+
+# Rough budget for the turns in one prompt; longer conversations are split up
+WINDOW_TOKENS = int(os.getenv("SENTIMENT_WINDOW_TOKENS", "4000"))
+
+MAX_CACHED_TURNS = 50_000
+MAX_CACHED_HIGHLIGHTS = 5_000
+
+MODES = ("hybrid", "fast", "llm")
+# Modes whose finished analyses are kept in the result store; fast is cheaper to redo
+STORED_MODES = ("hybrid", "llm")
+DEFAULT_MODE = os.getenv("SENTIMENT_MODE", "hybrid").strip().lower()
+if DEFAULT_MODE not in MODES:
+    # A mistyped setting must not take the report page down
+    DEFAULT_MODE = "llm"
+
+
+class AnalysisError(Exception):
+    def __init__(self, message, raw=None):
+        super().__init__(message)
+        self.raw = raw
+
+
+# Shared Gemini model, built once per process
+def get_sentiment_model():
+    return get_model(temperature=0.3)
+
+
+def conversation_key(chat_history):
+    return hashlib.sha256("".join(turn_keys(chat_history)).encode("ascii")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU shared by every session in the process."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, key):
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None:
+                self._values.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+
+
+_turn_scores = LRUCache(MAX_CACHED_TURNS)
+_highlights = LRUCache(MAX_CACHED_HIGHLIGHTS)
+
+# Identical analyses asked for at the same time share one set of model calls
+_flights = SingleFlight(on_join=lambda: metrics.add(coalesced=1))
+
+# Runs the windows of a long conversation side by side; the pooled model still
+# caps how many calls are in flight
+_window_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="sentiment-window")
+
+
+def estimate_tokens(text):
+    # About four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def split_windows(indices, cost, budget=WINDOW_TOKENS):
+    """Split ``indices`` into runs whose summed ``cost(index)`` stays within ``budget``.
+
+    A turn bigger than the budget gets a window of its own. The split only
+    depends on the turns themselves, so a growing conversation keeps the
+    windows it had and cached results stay valid.
+    """
+    windows = []
+    window = []
+    used = 0
+    for index in indices:
+        tokens = cost(index)
+        if window and used + tokens > budget:
+            windows.append(window)
+            window = []
+            used = 0
+        window.append(index)
+        used += tokens
+    if window:
+        windows.append(window)
+    return windows
+
+
+def _map_windows(function, windows):
+    """``function`` applied to every window concurrently, in window order.
+
+    Waits for every window before raising the first error, so the windows that
+    did succeed are cached.
+    """
+    if len(windows) == 1:
+        return [function(windows[0])]
+    futures = [_window_executor.submit(function, window) for window in windows]
+    wait(futures)
+    return [future.result() for future in futures]
+
+
+def _json_output(llm, schema):
+    """Call options that constrain a Gemini model's output to ``schema``."""
+    # Wrappers around a model (such as the batch rate limit) take the same options
+    llm = getattr(llm, "wrapped", llm)
+    if not STRUCTURED_OUTPUT or not isinstance(llm, PooledModel):
+        return {}
+    return {"response_mime_type": "application/json", "response_json_schema": schema}
+
+
+def valid_score(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return None
+    if score != score:  # NaN
+        return None
+    # Scores just past the ends are the model overshooting, not nonsense
+    return max(-1.0, min(1.0, score))
+
+
+def valid_emotion(value):
+    emotion = str(value).strip().lower() if isinstance(value, str) else ""
+    emotion = EMOTION_ALIASES.get(emotion, emotion)
+    return emotion if emotion in EMOTIONS else None
+
+
+def format_turn(number, turn):
+    return f"[{number}] User: {turn['user']}\n[{number}] Agent: {turn['chatbot']}"
+
+
+def build_turn_prompt(chat_history, indices):
+    first = indices[0]
+    context = [
+        format_turn(index + 1, chat_history[index])
+        for index in range(max(0, first - CONTEXT_TURNS), first)
+    ]
+    turns = [format_turn(index + 1, chat_history[index]) for index in indices]
+
+    return f"""Score the numbered turns of this customer support conversation.
+For every turn, write one JSON object on its own line with:
+- turn: the turn number
+- score: float between -1 (negative) and 1 (positive) for the user's sentiment
+- emotion: string from [{", ".join(EMOTIONS)}]
+
+Example valid response:
+{{"turn": 3, "score": 0.2, "emotion": "satisfied"}}
+{{"turn": 4, "score": -0.5, "emotion": "frustrated"}}
+
+Earlier turns, for context only (do not score them):
+{chr(10).join(context) or "(none)"}
+
+Turns to score:
+{chr(10).join(turns)}
+
+Return only the JSON lines without any formatting or comments:"""
+
+
+def parse_turn_scores(text, indices):
+    """Map each index in ``indices`` that the model scored validly to ``{"score", "emotion"}``."""
+    wanted = set(indices)
+    scores = {}
+    for item in iter_objects(text):
+        try:
+            index = int(item.get("turn")) - 1
+        except (TypeError, ValueError):
+            continue
+        score = valid_score(item.get("score"))
+        emotion = valid_emotion(item.get("emotion"))
+        if index in wanted and score is not None and emotion is not None:
+            scores[index] = {"score": score, "emotion": emotion}
+    return scores
+
+
+def _cached_scores(chat_history, cache):
+    keys = turn_keys(chat_history)
+    scores = [cache.get(key) for key in keys]
+    missing = [index for index, score in enumerate(scores) if score is None]
+    return keys, scores, missing
+
+
+def _fill_scores(text, keys, scores, missing, cache):
+    """Store the scores parsed from ``text``; return the turns of ``missing`` still unscored."""
+    new_scores = parse_turn_scores(text, missing)
+    for index, score in new_scores.items():
+        cache.put(keys[index], score)
+        scores[index] = score
+    return [index for index in missing if index not in new_scores]
+
+
+def _unscored_error(missing, text):
+    return AnalysisError(
+        f"Model did not score turns {', '.join(str(index + 1) for index in sorted(missing))}", raw=text
+    )
+
+
+def turn_windows(chat_history, indices):
+    return split_windows(indices, lambda index: estimate_tokens(format_turn(index + 1, chat_history[index])))
+
+
+def score_turns(chat_history, llm=None, cache=_turn_scores):
+    """Return the ``{"score", "emotion"}`` of every turn, asking the model only for new ones."""
+    keys, scores, missing = _cached_scores(chat_history, cache)
+    if not missing:
+        return scores
+
+    llm = llm or get_sentiment_model()
+
+    def score_window(window):
+        response = llm.invoke(build_turn_prompt(chat_history, window), **_json_output(llm, TURN_SCHEMA))
+        unscored = _fill_scores(response.content, keys, scores, window, cache)
+        if unscored:
+            # Ask again for just the turns that were skipped or invalid
+            response = llm.invoke(build_turn_prompt(chat_history, unscored), **_json_output(llm, TURN_SCHEMA))
+            unscored = _fill_scores(response.content, keys, scores, unscored, cache)
+        if unscored:
+            raise _unscored_error(unscored, response.content)
+
+    _map_windows(score_window, turn_windows(chat_history, missing))
+    return scores
+
+
+async def ascore_turns(chat_history, llm=None, cache=_turn_scores):
+    """Async :func:`score_turns`."""
+    keys, scores, missing = _cached_scores(chat_history, cache)
+    if not missing:
+        return scores
+
+    llm = llm or get_sentiment_model()
+
+    async def score_window(window):
+        response = await llm.ainvoke(build_turn_prompt(chat_history, window), **_json_output(llm, TURN_SCHEMA))
+        unscored = _fill_scores(response.content, keys, scores, window, cache)
+        if unscored:
+            response = await llm.ainvoke(build_turn_prompt(chat_history, unscored), **_json_output(llm, TURN_SCHEMA))
+            unscored = _fill_scores(response.content, keys, scores, unscored, cache)
+        if unscored:
+            raise _unscored_error(unscored, response.content)
+
+    results = await asyncio.gather(
+        *(score_window(window) for window in turn_windows(chat_history, missing)),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return scores
+
+
+def stream_turn_scores(chat_history, llm=None, cache=_turn_scores):
+    """Yield ``{index: score}`` batches as turns are scored.
+
+    Cached turns come first, in one batch. New turns follow as soon as the
+    model has written their line, instead of after the whole response. The
+    windows of a long conversation stream side by side, and their batches are
+    yielded in the order they arrive.
+    """
+    keys, scores, missing = _cached_scores(chat_history, cache)
+    cached = {index: score for index, score in enumerate(scores) if score is not None}
+    if cached:
+        yield cached
+    if not missing:
+        return
+
+    llm = llm or get_sentiment_model()
+    windows = turn_windows(chat_history, missing)
+    if len(windows) == 1:
+        yield from _stream_window(chat_history, windows[0], llm, keys, cache)
+        return
+
+    batches = queue.Queue()
+
+    def stream_window(window):
+        try:
+            for batch in _stream_window(chat_history, window, llm, keys, cache):
+                batches.put(batch)
+        finally:
+            batches.put(None)  # This window is done
+
+    futures = [_window_executor.submit(stream_window, window) for window in windows]
+    for _ in windows:
+        yield from iter(batches.get, None)
+    for future in futures:
+        future.result()
+
+
+def _stream_window(chat_history, window, llm, keys, cache):
+    pending = set(window)
+    text = ""
+    parsed_upto = 0
+    for chunk in llm.stream(build_turn_prompt(chat_history, window), **_json_output(llm, TURN_SCHEMA)):
+        text += chunk.content
+        # Only whole objects are parsed; the last one may still be arriving
+        complete = text.rfind("}") + 1
+        if complete <= parsed_upto:
+            continue
+        batch = parse_turn_scores(text[parsed_upto:complete], pending)
+        parsed_upto = complete
+        if batch:
+            for index, score in batch.items():
+                cache.put(keys[index], score)
+            pending.difference_update(batch)
+            yield batch
+
+    batch = parse_turn_scores(text[parsed_upto:], pending)
+    for index, score in batch.items():
+        cache.put(keys[index], score)
+    pending.difference_update(batch)
+    if batch:
+        yield batch
+    if not pending:
+        return
+
+    # Ask again for just the turns that were skipped or invalid
+    unscored = sorted(pending)
+    response = llm.invoke(build_turn_prompt(chat_history, unscored), **_json_output(llm, TURN_SCHEMA))
+    batch = parse_turn_scores(response.content, unscored)
+    for index, score in batch.items():
+        cache.put(keys[index], score)
+    if batch:
+        yield batch
+    if len(batch) < len(unscored):
+        raise _unscored_error(set(unscored) - set(batch), response.content)
+
+
+def summarize(chat_history, turn_scores):
+    """Build the report figures from per-turn scores.
+
+    Turns not scored yet may be None; they are left out of the figures and show
+    as gaps in the trend.
+    """
+    scored = [index for index, score in enumerate(turn_scores) if score is not None]
+    trend = [score["score"] if score is not None else float("nan") for score in turn_scores]
+
+    # Ties go to the emotion seen most recently
+    counts = Counter(turn_scores[index]["emotion"] for index in scored)
+    last_seen = {turn_scores[index]["emotion"]: index for index in scored}
+    dominant_emotion = max(counts, key=lambda emotion: (counts[emotion], last_seen[emotion]))
+
+    best = max(scored, key=lambda index: trend[index])
+    worst = min(scored, key=lambda index: trend[index])
+
+    analysis = {
+        "overall_score": sum(trend[index] for index in scored) / len(scored),
+        "dominant_emotion": dominant_emotion,
+        "top_positive_turn": best if trend[best] > 0 else None,
+        "top_negative_turn": worst if trend[worst] < 0 else None,
+        "sentiment_trend": pd.Series(trend),
+    }
+    return _add_messages(chat_history, analysis)
+
+
+def _add_messages(chat_history, analysis):
+    # The turn indices are what counts; the messages are there for display
+    for field in ("top_positive", "top_negative"):
+        index = analysis[f"{field}_turn"]
+        analysis[field] = chat_history[index]["user"] if index is not None else ""
+    return analysis
+
+
+_HIGHLIGHT_DESCRIPTIONS = {
+    "dominant_emotion": f"string from [{', '.join(EMOTIONS)}]",
+    "top_positive": "number of the most positive user message, or null if none is positive",
+    "top_negative": "number of the most negative user message, or null if none is negative",
+}
+_HIGHLIGHT_EXAMPLE = {"dominant_emotion": "frustrated", "top_positive": 4, "top_negative": 2}
+
+
+def highlights_schema(fields=HIGHLIGHT_FIELDS):
+    properties = {
+        "dominant_emotion": {"type": "string", "enum": list(EMOTIONS)},
+        "top_positive": {"type": ["integer", "null"]},
+        "top_negative": {"type": ["integer", "null"]},
+    }
+    return {
+        "type": "object",
+        "properties": {field: properties[field] for field in fields},
+        "required": list(fields),
+    }
+
+
+def build_highlights_prompt(chat_history, fields=HIGHLIGHT_FIELDS):
+    messages = "\n".join(f"[{number}] {turn['user']}" for number, turn in enumerate(chat_history, 1))
+    descriptions = "\n".join(f"- {field}: {_HIGHLIGHT_DESCRIPTIONS[field]}" for field in fields)
+    example = json.dumps({field: _HIGHLIGHT_EXAMPLE[field] for field in fields})
+    return f"""Read the numbered user messages from this customer support conversation. Return JSON with:
+{descriptions}
+
+Example valid response:
+{example}
+
+User Messages:
+{messages}
+
+Return only plain JSON without any formatting or comments:"""
+
+
+def parse_highlights(text, turn_count):
+    """The highlight fields ``text`` gives valid values for; the others are left out.
+
+    Turn numbers become 0-based indices, and an explicit null stays None.
+    """
+    data = extract_object(text) or {}
+    highlights = {}
+    emotion = valid_emotion(data.get("dominant_emotion"))
+    if emotion is not None:
+        highlights["dominant_emotion"] = emotion
+    for field in ("top_positive", "top_negative"):
+        if field not in data:
+            continue
+        if data[field] is None:
+            highlights[field] = None
+            continue
+        try:
+            number = int(data[field])
+        except (TypeError, ValueError):
+            continue
+        if 1 <= number <= turn_count:
+            highlights[field] = number - 1
+    return highlights
+
+
+def _ask_highlights(turns, llm):
+    response = llm.invoke(build_highlights_prompt(turns), **_json_output(llm, highlights_schema()))
+    highlights = parse_highlights(response.content, len(turns))
+    missing = [field for field in HIGHLIGHT_FIELDS if field not in highlights]
+    if missing:
+        # Ask again for just the fields that were missing or invalid
+        response = llm.invoke(build_highlights_prompt(turns, missing), **_json_output(llm, highlights_schema(missing)))
+        retry = parse_highlights(response.content, len(turns))
+        highlights.update((field, retry[field]) for field in missing if field in retry)
+
+    if "dominant_emotion" not in highlights:
+        raise AnalysisError("Model did not return a dominant emotion", raw=response.content)
+    for field in ("top_positive", "top_negative"):
+        highlights.setdefault(field, None)
+    return highlights
+
+
+def _window_highlights(chat_history, window, llm, cache):
+    # Highlight windows are runs of consecutive turns
+    turns = chat_history[window[0]:window[-1] + 1]
+    key = conversation_key(turns)
+    highlights = cache.get(key)
+    if highlights is None:
+        highlights = _ask_highlights(turns, llm)
+        cache.put(key, highlights)
+
+    # Positions within the window back to indices into the conversation
+    return {
+        field: window[value] if field != "dominant_emotion" and value is not None else value
+        for field, value in highlights.items()
+    }
+
+
+def merge_highlights(windows, window_highlights, turn_scores):
+    """Combine the highlights of each window into those of the whole conversation.
+
+    The dominant emotion is the one dominating the most turns, ties going to the
+    later window. The top messages are the windows' picks ranked by their turn
+    score, ties going to the earlier turn.
+    """
+    counts = Counter()
+    last_seen = {}
+    for position, (window, highlights) in enumerate(zip(windows, window_highlights)):
+        counts[highlights["dominant_emotion"]] += len(window)
+        last_seen[highlights["dominant_emotion"]] = position
+    positives = [highlights["top_positive"] for highlights in window_highlights if highlights["top_positive"] is not None]
+    negatives = [highlights["top_negative"] for highlights in window_highlights if highlights["top_negative"] is not None]
+
+    return {
+        "dominant_emotion": max(counts, key=lambda emotion: (counts[emotion], last_seen[emotion])),
+        "top_positive": max(positives, key=lambda index: (turn_scores[index]["score"], -index)) if positives else None,
+        "top_negative": min(negatives, key=lambda index: (turn_scores[index]["score"], index)) if negatives else None,
+    }
+
+
+def llm_highlights(chat_history, llm=None, cache=_highlights, turn_scores=None):
+    """Dominant emotion and the indices of the most positive and negative turns, from the model.
+
+    Long conversations are read a window at a time; ``turn_scores`` (the lexicon's
+    by default) decide between the windows' picks.
+    """
+    llm = llm or get_sentiment_model()
+    windows = split_windows(
+        range(len(chat_history)), lambda index: estimate_tokens(chat_history[index]["user"]) + 2
+    )
+    window_highlights = _map_windows(lambda window: _window_highlights(chat_history, window, llm, cache), windows)
+    if len(windows) == 1:
+        return window_highlights[0]
+    return merge_highlights(windows, window_highlights, turn_scores or lexicon.score_turns(chat_history))
+
+
+def _apply_highlights(chat_history, analysis, highlights):
+    analysis["dominant_emotion"] = highlights["dominant_emotion"]
+    analysis["top_positive_turn"] = highlights["top_positive"]
+    analysis["top_negative_turn"] = highlights["top_negative"]
+    return _add_messages(chat_history, analysis)
+
+
+def _shared_analyses(chat_history, llm, mode, results, produce):
+    """Analyses from ``produce()``, or the stored one.
+
+    Callers asking for the same analysis while it is running follow the one
+    already in flight instead of starting their own; the finished analysis is
+    kept in ``results``.
+    """
+    if results is None:
+        results = get_result_store(PROMPT_VERSION)
+    model = getattr(getattr(llm, "model", None), "model", None) or DEFAULT_MODEL
+    key = result_key(conversation_key(chat_history), mode, model, PROMPT_VERSION)
+    analysis = results.get(key)
+    if analysis is not None:
+        return iter([analysis])
+
+    def produce_and_store():
+        # Another caller may have finished it in the meantime
+        analysis = results.get(key)
+        if analysis is not None:
+            yield analysis
+            return
+        for analysis in produce():
+            yield analysis
+        results.put(key, PROMPT_VERSION, analysis)
+
+    return _flights.run(key, produce_and_store)
+
+
+def analyze_conversation(chat_history, llm=None, mode="llm", results=None):
+    """Analyse ``chat_history``, a list of ``{"user": ..., "chatbot": ...}`` turns or a
+    :class:`~picflick.sentiment.conversation.ConversationStore`.
+
+    ``top_positive_turn`` and ``top_negative_turn`` give the index of the notable
+    turns, or None; ``top_positive`` and ``top_negative`` their user message.
+    Analyses that need the model are kept in ``results``, the shared
+    :class:`~picflick.sentiment.results.ResultStore` by default.
+    """
+    if mode not in STORED_MODES:
+        return _analyze(chat_history, llm, mode)
+
+    # The analysis runs on its own thread; later turns appended meanwhile must not leak in
+    chat_history = chat_history[:]
+    *_, analysis = _shared_analyses(
+        chat_history, llm, mode, results, lambda: iter([_analyze(chat_history, llm, mode)])
+    )
+    return analysis
+
+
+def _analyze(chat_history, llm, mode):
+    if mode == "llm":
+        return summarize(chat_history, score_turns(chat_history, llm))
+
+    turn_scores = lexicon.score_turns(chat_history)
+    analysis = summarize(chat_history, turn_scores)
+    if mode == "hybrid":
+        _apply_highlights(chat_history, analysis, llm_highlights(chat_history, llm, turn_scores=turn_scores))
+    return analysis
+
+
+def iter_analysis(chat_history, llm=None, mode="llm", results=None):
+    """Yield ever more complete analyses of ``chat_history``, ending with the full one.
+
+    Lets the report show the first figures while the model is still writing. A
+    stored analysis is yielded on its own, straight away. Partial analyses may
+    be skipped when the caller is slower than the model.
+    """
+    if mode not in STORED_MODES:
+        yield from _iter_analysis(chat_history, llm, mode)
+        return
+
+    chat_history = chat_history[:]
+    yield from _shared_analyses(
+        chat_history, llm, mode, results, lambda: _iter_analysis(chat_history, llm, mode)
+    )
+
+
+def _iter_analysis(chat_history, llm, mode):
+    if mode == "llm":
+        turn_scores = [None] * len(chat_history)
+        for batch in stream_turn_scores(chat_history, llm):
+            for index, score in batch.items():
+                turn_scores[index] = score
+            yield summarize(chat_history, turn_scores)
+        return
+
+    turn_scores = lexicon.score_turns(chat_history)
+    analysis = summarize(chat_history, turn_scores)
+    if mode == "hybrid":
+        # The lexicon figures are ready long before the model's highlights
+        yield dict(analysis)
+        _apply_highlights(chat_history, analysis, llm_highlights(chat_history, llm, turn_scores=turn_scores))
+    yield analysis
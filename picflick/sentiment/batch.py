@@ -0,0 +1,230 @@
+"""Sentiment analysis for archives of conversations.
+
+Reads one conversation per JSONL line, for example::
+
+    {"conversation_id": "c-1", "chat_history": [{"user": "...", "chatbot": "..."}]}
+
+and writes one result per line::
+
+    python -m picflick.sentiment.batch conversations.jsonl results.jsonl --concurrency 16 --rate 5
+
+Conversations are analysed by a pool of asyncio workers with a cap on model
+requests per second, counting every window and re-ask separately, and failed
+analyses are retried with exponential backoff. Every result is flushed as soon
+as it is ready, so an interrupted run picks up where it left off:
+conversations already in the output are skipped. Conversations that still
+fail go to ``<output>.failed.jsonl`` and are retried on the next run.
+A ``.parquet`` output is written at the end of every run from the
+conversations analysed so far, so one failure does not hold back the rest.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+from picflick.sentiment.analysis import ascore_turns, get_sentiment_model, summarize
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second on average, in bursts of up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RateLimitedModel:
+    """``wrapped``, with every request taking a token from ``bucket`` first.
+
+    One conversation can take many requests (a window each, plus re-asks), so
+    the limit is applied per request rather than per conversation.
+    """
+
+    def __init__(self, wrapped, bucket):
+        self.wrapped = wrapped
+        self.bucket = bucket
+
+    @property
+    def model(self):
+        return getattr(self.wrapped, "model", None)
+
+    async def ainvoke(self, prompt, **kwargs):
+        await self.bucket.acquire()
+        return await self.wrapped.ainvoke(prompt, **kwargs)
+
+
+def read_conversations(path, id_field="conversation_id", history_field="chat_history"):
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            # A record without a history is reported as failed by the workers
+            yield str(record.get(id_field, line_number)), record.get(history_field)
+
+
+def read_done_ids(path, id_field="conversation_id"):
+    """Ids already written to ``path``; a line cut short by an interruption is ignored."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(str(json.loads(line)[id_field]))
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def end_partial_line(path):
+    # A run killed mid-write leaves a line without its newline; end it so the
+    # next record does not get glued onto it
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+
+def write_parquet(jsonl_path, parquet_path, id_field="conversation_id"):
+    """Write the results in ``jsonl_path`` to ``parquet_path``; returns how many.
+
+    A line cut short by an interruption is left out.
+    """
+    records = []
+    with open(jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    if not records:
+        return 0
+    frame = pd.DataFrame.from_records(records)
+    frame[id_field] = frame[id_field].astype(str)
+    frame.to_parquet(parquet_path, index=False)
+    return len(records)
+
+
+def to_record(conversation_id, analysis, id_field="conversation_id"):
+    record = {id_field: conversation_id}
+    record.update(analysis)
+    record["sentiment_trend"] = [float(score) for score in analysis["sentiment_trend"]]
+    return record
+
+
+async def analyze_with_retries(chat_history, llm, retries, base_delay):
+    for attempt in range(retries + 1):
+        try:
+            return summarize(chat_history, await ascore_turns(chat_history, llm))
+        except Exception:
+            if attempt == retries:
+                raise
+            # Full jitter keeps retrying workers from hitting the API in lockstep
+            await asyncio.sleep(random.uniform(0, base_delay * 2 ** attempt))
+
+
+async def run_batch(
+    input_path, output_path, llm=None, concurrency=8, rate=5.0, retries=4, base_delay=1.0,
+    id_field="conversation_id", history_field="chat_history",
+):
+    llm = RateLimitedModel(llm or get_sentiment_model(), TokenBucket(rate))
+    done = read_done_ids(output_path, id_field)
+    end_partial_line(output_path)
+    failed_path = f"{output_path}.failed.jsonl"
+    stats = {"analysed": 0, "failed": 0, "skipped": 0}
+
+    # Bounded so the reader never gets far ahead of the workers
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    with open(output_path, "a", encoding="utf-8") as output, open(failed_path, "w", encoding="utf-8") as failures:
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                conversation_id, chat_history = item
+                try:
+                    if chat_history is None:
+                        raise ValueError(f"Record has no {history_field!r} field")
+                    if not chat_history:
+                        raise ValueError("Conversation has no turns")
+                    analysis = await analyze_with_retries(chat_history, llm, retries, base_delay)
+                except Exception as e:
+                    failures.write(json.dumps({id_field: conversation_id, "error": str(e)}) + "\n")
+                    failures.flush()
+                    stats["failed"] += 1
+                    continue
+                output.write(json.dumps(to_record(conversation_id, analysis, id_field), ensure_ascii=False) + "\n")
+                output.flush()
+                stats["analysed"] += 1
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        for conversation_id, chat_history in read_conversations(input_path, id_field, history_field):
+            if conversation_id in done:
+                stats["skipped"] += 1
+                continue
+            await queue.put((conversation_id, chat_history))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    if os.path.getsize(failed_path) == 0:
+        os.remove(failed_path)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse the sentiment of many conversations.")
+    parser.add_argument("input", help="JSONL file with one conversation per line")
+    parser.add_argument("output", help="results file, .jsonl or .parquet")
+    parser.add_argument("--concurrency", type=int, default=8, help="conversations analysed at once")
+    parser.add_argument("--rate", type=float, default=5.0, help="model requests per second")
+    parser.add_argument("--retries", type=int, default=4, help="retries per conversation")
+    parser.add_argument("--id-field", default="conversation_id")
+    parser.add_argument("--history-field", default="chat_history")
+    args = parser.parse_args(argv)
+
+    # Parquet cannot be appended to, so progress is checkpointed as JSONL first
+    parquet = args.output.endswith(".parquet")
+    jsonl_path = args.output[: -len(".parquet")] + ".jsonl" if parquet else args.output
+
+    started = time.perf_counter()
+    stats = asyncio.run(run_batch(
+        args.input, jsonl_path, concurrency=args.concurrency, rate=args.rate, retries=args.retries,
+        id_field=args.id_field, history_field=args.history_field,
+    ))
+    if parquet and os.path.exists(jsonl_path):
+        write_parquet(jsonl_path, args.output, args.id_field)
+
+    print(
+        f"Analysed {stats['analysed']}, skipped {stats['skipped']} already done, "
+        f"{stats['failed']} failed in {time.perf_counter() - started:.1f}s"
+    )
+    if stats["failed"]:
+        print(f"Failures are listed in {jsonl_path}.failed.jsonl", file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
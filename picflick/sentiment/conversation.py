@@ -0,0 +1,143 @@
+"""Columnar storage for a chat history.
+
+``ConversationStore`` keeps user messages, agent replies and turn keys in one
+growing array each, instead of a dict per turn. A turn's id is its position in
+the columns, which is what the model reports, so duplicate messages stay apart
+and a turn is found without scanning the conversation. Slices share the
+columns instead of copying them.
+
+It behaves like the list of ``{"user": ..., "chatbot": ...}`` dicts it mirrors:
+turns can be appended, indexed and iterated as dicts. ``sync`` keeps a store
+kept across reruns up to date with that list, hashing only new turns.
+"""
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+INITIAL_CAPACITY = 64
+
+
+def turn_key(turn):
+    data = json.dumps([turn["user"], turn["chatbot"]], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ConversationStore:
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._users = np.empty(capacity, dtype=object)
+        self._replies = np.empty(capacity, dtype=object)
+        self._keys = np.empty(capacity, dtype=object)
+        self._length = 0
+
+    @classmethod
+    def from_turns(cls, turns):
+        store = cls(max(len(turns), INITIAL_CAPACITY))
+        for turn in turns:
+            store.append(turn)
+        return store
+
+    def _grow(self):
+        # Doubling keeps appends amortised O(1); a slice is always full, so
+        # appending to one copies it first and never writes into its parent
+        capacity = max(2 * len(self._users), INITIAL_CAPACITY)
+        for name in ("_users", "_replies", "_keys"):
+            column = np.empty(capacity, dtype=object)
+            column[:self._length] = getattr(self, name)[:self._length]
+            setattr(self, name, column)
+
+    def append(self, turn):
+        if self._length == len(self._users):
+            self._grow()
+        index = self._length
+        self._users[index] = turn["user"]
+        self._replies[index] = turn["chatbot"]
+        self._keys[index] = turn_key(turn)
+        self._length += 1
+
+    def _truncate(self, length):
+        # Fresh columns, so slices already handed out keep the turns they had
+        for name in ("_users", "_replies", "_keys"):
+            column = np.empty(len(self._users), dtype=object)
+            column[:length] = getattr(self, name)[:length]
+            setattr(self, name, column)
+        self._length = length
+
+    def sync(self, turns):
+        """Bring the store in line with ``turns``, the list of dicts it mirrors.
+
+        Turns added since the last sync are appended. Earlier turns are only
+        checked for identity, so an unchanged history costs no hashing; from
+        the first turn edited or removed in the list on, the store is rebuilt.
+        """
+        users = self._users
+        replies = self._replies
+        kept = min(self._length, len(turns))
+        for index in range(kept):
+            turn = turns[index]
+            if turn["user"] is not users[index] or turn["chatbot"] is not replies[index]:
+                kept = index
+                break
+        if kept < self._length:
+            self._truncate(kept)
+        for index in range(kept, len(turns)):
+            self.append(turns[index])
+        return self
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self.turn(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view(index)
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("turn index out of range")
+        return self.turn(index)
+
+    def __repr__(self):
+        return f"ConversationStore({self._length} turns)"
+
+    def _view(self, index):
+        view = ConversationStore.__new__(ConversationStore)
+        view._users = self.users[index]
+        view._replies = self.replies[index]
+        view._keys = self.keys[index]
+        view._length = len(view._users)
+        return view
+
+    def turn(self, index):
+        return {"user": self._users[index], "chatbot": self._replies[index]}
+
+    @property
+    def users(self):
+        return self._users[:self._length]
+
+    @property
+    def replies(self):
+        return self._replies[:self._length]
+
+    @property
+    def keys(self):
+        return self._keys[:self._length]
+
+    def to_frame(self):
+        return pd.DataFrame({"user": self.users, "chatbot": self.replies})
+
+
+def user_messages(chat_history):
+    if isinstance(chat_history, ConversationStore):
+        return chat_history.users
+    return [turn["user"] for turn in chat_history]
+
+
+def turn_keys(chat_history):
+    if isinstance(chat_history, ConversationStore):
+        return chat_history.keys
+    return [turn_key(turn) for turn in chat_history]
@@ -0,0 +1,166 @@
+"""Offline sentiment scoring with a small lexicon.
+
+All user messages are scored in one go: their words are mapped to integer ids,
+then weights, negations and intensifiers are applied across every word of the
+conversation with NumPy and summed per message. Fast and free, at the cost of
+the nuance an LLM picks up.
+"""
+import re
+
+import numpy as np
+
+from picflick.sentiment.conversation import user_messages
+
+# Word weights on a -3 (very negative) to 3 (very positive) scale
+LEXICON = {
+    # Positive
+    "amazing": 3.0, "awesome": 3.0, "excellent": 3.0, "fantastic": 3.0, "love": 3.0,
+    "perfect": 3.0, "wonderful": 3.0, "brilliant": 2.8, "outstanding": 2.8, "superb": 2.8,
+    "great": 2.5, "thank": 2.0, "thanks": 2.0, "thx": 1.5, "appreciate": 2.0,
+    "appreciated": 2.0, "grateful": 2.2, "happy": 2.2, "glad": 2.0, "pleased": 2.0,
+    "helpful": 2.0, "resolved": 2.0, "solved": 2.0, "fixed": 1.8, "works": 1.5,
+    "working": 1.0, "good": 1.8, "nice": 1.8, "cool": 1.5, "fast": 1.2, "quick": 1.2,
+    "quickly": 1.2, "easy": 1.5, "clear": 1.2, "friendly": 1.8, "kind": 1.5,
+    "satisfied": 2.0, "recommend": 2.0, "fine": 0.8, "ok": 0.5, "okay": 0.5,
+    "better": 1.2, "best": 2.5, "smooth": 1.5, "enjoy": 2.0, "enjoyed": 2.0,
+    "like": 1.0, "yes": 0.5, "sure": 0.5, "cheers": 1.5, "finally": 0.5,
+    # Negative
+    "terrible": -3.0, "horrible": -3.0, "awful": -3.0, "worst": -3.0, "hate": -3.0,
+    "useless": -2.8, "ridiculous": -2.5, "unacceptable": -2.8, "disgusting": -3.0,
+    "pathetic": -2.8, "scam": -3.0, "garbage": -2.8, "rubbish": -2.5, "joke": -1.5,
+    "bad": -2.0, "poor": -2.0, "broken": -2.0, "bug": -1.5, "bugs": -1.5, "crash": -2.0,
+    "crashes": -2.0, "crashed": -2.0, "error": -1.5, "errors": -1.5, "fail": -2.0,
+    "failed": -2.0, "failing": -2.0, "fails": -2.0, "problem": -1.5, "problems": -1.5,
+    "issue": -1.2, "issues": -1.2, "wrong": -1.8, "slow": -1.5, "stuck": -1.8,
+    "lost": -1.8, "missing": -1.5, "annoying": -2.2, "annoyed": -2.2,
+    "frustrating": -2.5, "frustrated": -2.5, "disappointed": -2.5, "disappointing": -2.5,
+    "angry": -2.8, "furious": -3.0, "mad": -2.5, "upset": -2.3, "unhappy": -2.3,
+    "waste": -2.3, "wasted": -2.3, "waiting": -1.2, "wait": -0.8, "refund": -1.2,
+    "cancel": -1.5, "complain": -2.0, "complaint": -2.0, "never": -1.0, "nothing": -0.8,
+    "confused": -1.2, "confusing": -1.5, "unclear": -1.3, "lag": -1.5, "laggy": -1.8,
+    "sucks": -2.8, "worse": -2.2, "no": -0.5, "again": -0.5, "still": -0.5,
+}
+
+# Emotions signalled by specific words, checked before falling back to the score
+EMOTION_WORDS = {
+    "angry": {
+        "angry", "furious", "mad", "hate", "ridiculous", "unacceptable", "scam", "pathetic",
+        "disgusting", "garbage", "sucks", "worst",
+    },
+    "confused": {
+        "confused", "confusing", "unclear", "understand", "how", "why", "what", "where",
+        "lost", "huh", "mean",
+    },
+    "frustrated": {
+        "frustrated", "frustrating", "annoying", "annoyed", "again", "still", "stuck",
+        "waiting", "disappointed", "useless",
+    },
+}
+
+NEGATORS = {"not", "no", "never", "dont", "don't", "didnt", "didn't", "doesnt", "doesn't",
+            "isnt", "isn't", "wasnt", "wasn't", "cant", "can't", "cannot", "wont", "won't",
+            "without", "hardly", "nothing"}
+INTENSIFIERS = {"very": 1.3, "really": 1.3, "so": 1.25, "extremely": 1.5, "super": 1.4,
+                "totally": 1.3, "absolutely": 1.4, "completely": 1.4, "too": 1.2, "incredibly": 1.5}
+
+# Negation flips a word's weight, damped slightly ("not bad" is not "great")
+NEGATION_FACTOR = -0.75
+# Added per exclamation mark (up to three) in the direction of the message's sentiment
+EXCLAMATION_BOOST = 0.3
+# Normalises summed weights into (-1, 1) like VADER does
+NORMALIZATION_ALPHA = 15.0
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+# Vocabulary ids: 0 is reserved for words the lexicon does not know
+_VOCABULARY = {}
+for _word in sorted(set(LEXICON) | NEGATORS | set(INTENSIFIERS) | set().union(*EMOTION_WORDS.values())):
+    _VOCABULARY[_word] = len(_VOCABULARY) + 1
+
+_WEIGHTS = np.zeros(len(_VOCABULARY) + 1)
+_IS_NEGATOR = np.zeros(len(_VOCABULARY) + 1, dtype=bool)
+_INTENSITY = np.ones(len(_VOCABULARY) + 1)
+_EMOTION_FLAGS = {emotion: np.zeros(len(_VOCABULARY) + 1, dtype=bool) for emotion in EMOTION_WORDS}
+for _word, _id in _VOCABULARY.items():
+    _WEIGHTS[_id] = LEXICON.get(_word, 0.0)
+    _IS_NEGATOR[_id] = _word in NEGATORS
+    _INTENSITY[_id] = INTENSIFIERS.get(_word, 1.0)
+    for _emotion, _words in EMOTION_WORDS.items():
+        _EMOTION_FLAGS[_emotion][_id] = _word in _words
+
+
+def _encode(messages):
+    """Token ids of every message concatenated, and the message each token belongs to."""
+    ids = []
+    lengths = []
+    for message in messages:
+        tokens = _TOKEN_RE.findall(message.lower())
+        ids.extend(_VOCABULARY.get(token, 0) for token in tokens)
+        lengths.append(len(tokens))
+    owner = np.repeat(np.arange(len(messages)), lengths)
+    return np.asarray(ids, dtype=np.int32), owner
+
+
+def _previous(values, owner, fill, steps=1):
+    # values shifted by ``steps`` tokens, without crossing into the previous message
+    shifted = np.full_like(values, fill)
+    shifted[steps:] = values[:-steps]
+    shifted[steps:][owner[steps:] != owner[:-steps]] = fill
+    return shifted
+
+
+def _score(ids, owner, messages):
+    count = len(messages)
+    if not len(ids):
+        return np.zeros(count)
+
+    weights = _WEIGHTS[ids]
+    # A negator up to two words back flips the weight: "not good", "not very good"
+    negated = _previous(_IS_NEGATOR[ids], owner, False) | _previous(_IS_NEGATOR[ids], owner, False, steps=2)
+    weights = np.where(negated, weights * NEGATION_FACTOR, weights)
+    weights *= _previous(_INTENSITY[ids], owner, 1.0)
+
+    totals = np.bincount(owner, weights=weights, minlength=count)
+    exclamations = np.minimum([message.count("!") for message in messages], 3)
+    totals += np.sign(totals) * exclamations * EXCLAMATION_BOOST
+
+    return totals / np.sqrt(totals * totals + NORMALIZATION_ALPHA)
+
+
+def _emotions(ids, owner, messages, scores):
+    count = len(messages)
+    hits = {
+        emotion: np.bincount(owner, weights=flags[ids], minlength=count)
+        for emotion, flags in _EMOTION_FLAGS.items()
+    }
+    questions = np.array([message.count("?") for message in messages])
+
+    labels = np.select(
+        [
+            (hits["angry"] > 0) & (scores < 0),
+            (hits["frustrated"] > 0) & (scores < 0),
+            ((hits["confused"] > 0) | (questions > 0)) & (scores < 0.3),
+            scores <= -0.2,
+            scores >= 0.2,
+        ],
+        ["angry", "frustrated", "confused", "frustrated", "satisfied"],
+        default="neutral",
+    )
+    return labels.tolist()
+
+
+def score_messages(messages):
+    """Score each message in ``messages`` between -1 and 1."""
+    ids, owner = _encode(messages)
+    return _score(ids, owner, messages)
+
+
+def score_turns(chat_history):
+    """Per-turn ``{"score", "emotion"}`` like :func:`picflick.sentiment.analysis.score_turns`."""
+    messages = user_messages(chat_history)
+    ids, owner = _encode(messages)
+    scores = _score(ids, owner, messages)
+    return [
+        {"score": float(score), "emotion": emotion}
+        for score, emotion in zip(scores, _emotions(ids, owner, messages, scores))
+    ]
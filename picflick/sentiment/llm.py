@@ -0,0 +1,214 @@
+"""Process-wide pool of Gemini chat models.
+
+Building a ``ChatGoogleGenerativeAI`` sets up auth and a fresh HTTP client, so
+models are built once per configuration and shared by every session and rerun.
+Reusing a model reuses its HTTP client and the keep-alive connections it holds.
+Each shared model caps how many calls may be in flight at once.
+
+Set ``GEMINI_BASE_URL`` to send requests to another endpoint, such as a local
+fake server in tests.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+DEFAULT_MODEL = os.getenv("SENTIMENT_MODEL", "gemini-1.5-flash")
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+REQUEST_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+
+class ModelMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clients_created = 0
+        self.setup_seconds = 0.0
+        self.client_reuses = 0
+        self.calls = 0
+        self.errors = 0
+        self.waited_for_slot = 0
+        self.coalesced = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.call_seconds = 0.0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def snapshot(self):
+        with self._lock:
+            calls = max(self.calls, 1)
+            return {
+                "clients_created": self.clients_created,
+                "setup_ms_total": round(self.setup_seconds * 1000, 1),
+                "client_reuses": self.client_reuses,
+                "calls": self.calls,
+                "errors": self.errors,
+                "waited_for_slot": self.waited_for_slot,
+                "coalesced": self.coalesced,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "avg_call_ms": round(self.call_seconds / calls * 1000, 1),
+            }
+
+
+metrics = ModelMetrics()
+
+
+class PooledModel:
+    """A shared chat model that allows at most ``max_concurrency`` calls at once.
+
+    Sync and async callers share the slots. A freed slot is handed straight to
+    the caller that has waited longest: a thread waits on an event, and a
+    coroutine awaits a future on its own event loop, so no thread is ever
+    blocked on behalf of a coroutine.
+    """
+
+    def __init__(self, model, max_concurrency=MAX_CONCURRENCY):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self._free = max_concurrency
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _take_slot(self, make_waiter):
+        """None if a slot was free and is now taken, else a new waiter in line for one."""
+        with self._lock:
+            if self._free:
+                self._free -= 1
+                return None
+            waiter = make_waiter()
+            self._waiters.append(waiter)
+        metrics.add(waited_for_slot=1)
+        return waiter
+
+    def _free_slot(self):
+        with self._lock:
+            if not self._waiters:
+                self._free += 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return
+        try:
+            waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+        except RuntimeError:
+            # Its event loop has closed; pass the slot on
+            self._free_slot()
+
+    def _wake(self, waiter):
+        if waiter.cancelled():
+            self._free_slot()
+        else:
+            waiter.set_result(None)
+
+    def _acquire(self):
+        waiter = self._take_slot(threading.Event)
+        if waiter is not None:
+            waiter.wait()
+        metrics.add(in_flight=1)
+        return time.perf_counter()
+
+    async def _aacquire(self):
+        waiter = self._take_slot(asyncio.get_running_loop().create_future)
+        if waiter is not None:
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    queued = waiter in self._waiters
+                    if queued:
+                        self._waiters.remove(waiter)
+                # A slot handed over just before the cancellation is passed on;
+                # one still on its way is passed on by _wake
+                if not queued and waiter.done() and not waiter.cancelled():
+                    self._free_slot()
+                raise
+        metrics.add(in_flight=1)
+        return time.perf_counter()
+
+    def _release(self, started, failed):
+        self._free_slot()
+        metrics.add(
+            in_flight=-1, calls=1, errors=int(failed), call_seconds=time.perf_counter() - started
+        )
+
+    def invoke(self, prompt, **kwargs):
+        started = self._acquire()
+        failed = True
+        try:
+            response = self.model.invoke(prompt, **kwargs)
+            failed = False
+            return response
+        finally:
+            self._release(started, failed)
+
+    def stream(self, prompt, **kwargs):
+        started = self._acquire()
+        failed = True
+        try:
+            yield from self.model.stream(prompt, **kwargs)
+            failed = False
+        finally:
+            self._release(started, failed)
+
+    async def ainvoke(self, prompt, **kwargs):
+        started = await self._aacquire()
+        failed = True
+        try:
+            response = await self.model.ainvoke(prompt, **kwargs)
+            failed = False
+            return response
+        finally:
+            self._release(started, failed)
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def build_model(model, temperature, api_key, base_url, **kwargs):
+    options = dict(
+        model=model,
+        temperature=temperature,
+        google_api_key=api_key,
+        timeout=REQUEST_TIMEOUT,
+        **kwargs,
+    )
+    if base_url:
+        options["base_url"] = base_url
+    return ChatGoogleGenerativeAI(**options)
+
+
+def get_model(model=DEFAULT_MODEL, temperature=0.3, max_concurrency=MAX_CONCURRENCY, **kwargs):
+    """Return the shared :class:`PooledModel` for this configuration, building it on first use."""
+    api_key = os.getenv("GOOGLE_API_KEY")  # From .env file
+    base_url = os.getenv("GEMINI_BASE_URL")
+    key = (model, temperature, api_key, base_url, max_concurrency, repr(sorted(kwargs.items())))
+
+    pooled = _models.get(key)
+    if pooled is not None:
+        metrics.add(client_reuses=1)
+        return pooled
+
+    with _models_lock:
+        pooled = _models.get(key)
+        if pooled is None:
+            started = time.perf_counter()
+            pooled = PooledModel(build_model(model, temperature, api_key, base_url, **kwargs), max_concurrency)
+            metrics.add(clients_created=1, setup_seconds=time.perf_counter() - started)
+            _models[key] = pooled
+        else:
+            metrics.add(client_reuses=1)
+    return pooled
+
+
+def model_metrics():
+    return metrics.snapshot()
@@ -0,0 +1,60 @@
+"""Lenient JSON parsing for model responses.
+
+Models wrap JSON in code fences, put a sentence before or after it, use single
+quotes or Python literals, or leave a trailing comma behind. Those mistakes are
+repaired here rather than by asking the model again.
+"""
+import json
+import re
+
+_FENCE_RE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_SINGLE_QUOTED_RE = re.compile(r"'([^'\"\n]*)'")
+_LITERAL_RE = re.compile(r"\b(True|False|None|NaN)\b")
+_LITERALS = {"True": "true", "False": "false", "None": "null", "NaN": "null"}
+_UNQUOTED_KEY_RE = re.compile(r"([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)\s*:")
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+# Objects without nested objects, which is all the model is asked for
+_FLAT_OBJECT_RE = re.compile(r"\{[^{}]*\}")
+
+
+def repair_json(text):
+    """Fix the usual mistakes in ``text``; only worth calling once ``json.loads`` failed."""
+    text = _FENCE_RE.sub("", text).strip()
+    text = _SINGLE_QUOTED_RE.sub(r'"\1"', text)
+    text = _LITERAL_RE.sub(lambda match: _LITERALS[match.group()], text)
+    text = _UNQUOTED_KEY_RE.sub(r'\1"\2":', text)
+    return _TRAILING_COMMA_RE.sub(r"\1", text)
+
+
+def loads(text):
+    """``json.loads``, retried on a repaired ``text``; None if neither parses."""
+    for candidate in (text, repair_json(text)):
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def extract_object(text):
+    """The outermost JSON object in ``text``, or None.
+
+    A response cut off before its closing brace gets one added.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+    end = text.rfind("}")
+    value = loads(text[start:end + 1]) if end > start else None
+    if value is None:
+        value = loads(text[start:].rstrip().rstrip(",") + "}")
+    return value if isinstance(value, dict) else None
+
+
+def iter_objects(text):
+    """Every flat JSON object in ``text``, wherever it is, skipping ones beyond repair."""
+    for match in _FLAT_OBJECT_RE.finditer(text):
+        value = loads(match.group())
+        if isinstance(value, dict):
+            yield value
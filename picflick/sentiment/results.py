@@ -0,0 +1,138 @@
+"""Finished analyses, kept on disk and shared across sessions.
+
+Model-backed analyses are stored in a local SQLite database keyed by the
+conversation's content hash, the analysis mode, the model and the prompt
+version, so a refresh, a new tab or a teammate opening the same conversation
+gets the report without another model call. Entries expire after
+``RESULTS_TTL`` seconds, the least recently used go once the database holds more
+than ``MAX_RESULTS_BYTES``, and results of older prompt versions are dropped
+when the store is opened.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RESULTS_PATH = os.getenv("SENTIMENT_RESULTS_DB", os.path.join(ROOT_DIR, "cache", "sentiment.sqlite3"))
+
+RESULTS_TTL = float(os.getenv("SENTIMENT_RESULTS_TTL_HOURS", "168")) * 3600
+MAX_RESULTS_BYTES = int(os.getenv("SENTIMENT_RESULTS_MB", "50")) * 1024 * 1024
+
+# Checking sizes and ages on every write would be wasted work
+EVICT_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    prompt_version TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL,
+    size INTEGER NOT NULL,
+    data TEXT NOT NULL
+)
+"""
+
+
+def result_key(conversation_key, mode, model, prompt_version):
+    data = json.dumps([conversation_key, mode, model, prompt_version])
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def encode_analysis(analysis):
+    data = dict(analysis)
+    data["sentiment_trend"] = [float(score) for score in analysis["sentiment_trend"]]
+    return json.dumps(data, ensure_ascii=False)
+
+
+def decode_analysis(text):
+    analysis = json.loads(text)
+    analysis["sentiment_trend"] = pd.Series(analysis["sentiment_trend"], dtype=float)
+    return analysis
+
+
+class ResultStore:
+    def __init__(self, path=RESULTS_PATH, prompt_version=None, ttl=RESULTS_TTL, max_bytes=MAX_RESULTS_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(SCHEMA)
+            db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+            if prompt_version is not None:
+                # Results of an older prompt would never be asked for again
+                db.execute("DELETE FROM results WHERE prompt_version != ?", (prompt_version,))
+        self.evict()
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across threads and
+        # processes; SQLite does the locking
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT data FROM results WHERE key = ? AND created >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+        return decode_analysis(row[0])
+
+    def put(self, key, prompt_version, analysis):
+        data = encode_analysis(analysis)
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO results (key, prompt_version, created, used, size, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, prompt_version, now, now, len(data), data),
+            )
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        with self._connect() as db:
+            db.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl,))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # Oldest first, until the rest fits
+            rows = db.execute("SELECT key, size FROM results ORDER BY used").fetchall()
+            stale = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            db.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def __len__(self):
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+@lru_cache(maxsize=None)
+def get_result_store(prompt_version=None):
+    return ResultStore(prompt_version=prompt_version)
@@ -0,0 +1,83 @@
+"""Coalescing of identical work running at the same time.
+
+When several sessions ask for the same analysis at once, only the first one
+starts it; the others follow along and get the same results. The work runs on
+its own thread, so it finishes (and gets stored) even if the session that
+started it goes away.
+"""
+import threading
+
+
+class Flight:
+    """The progress of one piece of work: its latest result, and whether it is done."""
+
+    def __init__(self):
+        self.latest = None
+        self.version = 0
+        self.done = False
+        self.error = None
+        self._condition = threading.Condition()
+
+    def publish(self, value):
+        with self._condition:
+            self.latest = value
+            self.version += 1
+            self._condition.notify_all()
+
+    def finish(self, error=None):
+        with self._condition:
+            self.done = True
+            self.error = error
+            self._condition.notify_all()
+
+    def follow(self):
+        """Yield each new result as it is published; results that came and went
+        while the caller was busy are skipped, only the latest matters."""
+        seen = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self.version > seen or self.done)
+                latest, version, done, error = self.latest, self.version, self.done, self.error
+            if version > seen:
+                seen = version
+                yield latest
+            if done and version == seen:
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    def __init__(self, on_join=None):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._on_join = on_join
+
+    def __len__(self):
+        return len(self._flights)
+
+    def run(self, key, produce):
+        """Yield the results of ``produce()``, a generator function, sharing them
+        with every other caller that asks for the same ``key`` meanwhile."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight()
+                threading.Thread(
+                    target=self._fly, args=(key, flight, produce), name="sentiment-flight", daemon=True
+                ).start()
+            elif self._on_join is not None:
+                self._on_join()
+        return flight.follow()
+
+    def _fly(self, key, flight, produce):
+        try:
+            for value in produce():
+                flight.publish(value)
+        except Exception as e:
+            flight.finish(e)
+        else:
+            flight.finish()
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
@@ -0,0 +1,247 @@
+"""Local thumbnail cache for the filter card images.
+
+Remote ``image_url`` s are downloaded once, resized for the card and expanded
+views, re-encoded and stored under ``static/thumbnails`` so Streamlit can serve
+them itself (``server.enableStaticServing``). Files are named after a hash of
+their contents and the least recently used ones are evicted once the cache
+outgrows its size limit.
+
+Pages never wait for a download: on a miss the remote URL is served as it is
+and the image is fetched in the background, to be served locally from then on.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageOps, features
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(ROOT_DIR, "static")
+CACHE_DIR = os.path.join(STATIC_DIR, "thumbnails")
+
+# Where Streamlit serves the contents of STATIC_DIR
+STATIC_URL = "app/static"
+
+# Target widths in pixels for each place a filter image is shown
+SIZES = {"card": 480, "expanded": 960}
+
+MAX_CACHE_BYTES = int(os.getenv("PICFLICK_THUMBNAIL_CACHE_MB", "200")) * 1024 * 1024
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+FETCH_TIMEOUT = 10
+
+# Downloads running in the background at once
+FETCH_WORKERS = 4
+
+# How long a failed download is remembered before it is retried, in seconds
+RETRY_AFTER = 300
+
+USER_AGENT = "PicFlick/1.0 (+thumbnail cache)"
+
+IMAGE_FORMAT, IMAGE_EXTENSION = ("WEBP", ".webp") if features.check("webp") else ("JPEG", ".jpg")
+
+
+def fetch_image(url, timeout=FETCH_TIMEOUT):
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = response.read(MAX_SOURCE_BYTES + 1)
+    if len(data) > MAX_SOURCE_BYTES:
+        raise ValueError(f"Image larger than {MAX_SOURCE_BYTES} bytes: {url}")
+    return data
+
+
+def open_image(data):
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    # Keep transparency only where the output format can store it
+    if image.mode in ("RGBA", "LA", "P") and IMAGE_FORMAT == "WEBP":
+        return image.convert("RGBA")
+    return image.convert("RGB")
+
+
+def encode_image(image, width, quality=80):
+    """Shrink ``image`` to at most ``width`` pixels wide and encode it."""
+    image = image.copy()
+    if image.width > width:
+        image.thumbnail((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, IMAGE_FORMAT, quality=quality, method=4 if IMAGE_FORMAT == "WEBP" else 0)
+    return buffer.getvalue()
+
+
+def content_name(data, extension=IMAGE_EXTENSION):
+    return hashlib.sha256(data).hexdigest()[:32] + extension
+
+
+def write_atomic(path, data):
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+class ThumbnailCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, url_prefix=None, fetch=fetch_image):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.url_prefix = url_prefix or STATIC_URL + "/" + os.path.relpath(root, STATIC_DIR).replace(os.sep, "/")
+        self.fetch = fetch
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._pending = set()
+        self._executor = None
+        os.makedirs(root, exist_ok=True)
+
+        # (image url, size) -> file name, shared with other processes through index.json
+        self._index_path = os.path.join(root, "index.json")
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                self._index = {tuple(key.split(" ", 1)): name for key, name in json.load(f).items()}
+        except (OSError, ValueError):
+            self._index = {}
+
+        self._sizes = {}
+        for entry in os.scandir(root):
+            if entry.is_file() and entry.name.endswith(IMAGE_EXTENSION):
+                self._sizes[entry.name] = entry.stat().st_size
+
+    @property
+    def total_bytes(self):
+        return sum(self._sizes.values())
+
+    def _save_index(self):
+        index = {f"{size} {url}": name for (size, url), name in self._index.items()}
+        write_atomic(self._index_path, json.dumps(index).encode("utf-8"))
+
+    def _touch(self, name):
+        # The modification time doubles as the last access time for LRU eviction
+        try:
+            os.utime(os.path.join(self.root, name))
+            return True
+        except FileNotFoundError:
+            self._sizes.pop(name, None)
+            return False
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        by_age = []
+        for name in self._sizes:
+            try:
+                by_age.append((os.path.getmtime(os.path.join(self.root, name)), name))
+            except FileNotFoundError:
+                by_age.append((0, name))
+        by_age.sort()
+
+        total = self.total_bytes
+        for _, name in by_age:
+            if total <= self.max_bytes:
+                break
+            total -= self._sizes.pop(name)
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+        self._index = {key: name for key, name in self._index.items() if name in self._sizes}
+
+    def store(self, url, data):
+        """Resize the source image ``data`` for every size and cache it under ``url``."""
+        image = open_image(data)
+        encoded_sizes = {size: encode_image(image, width) for size, width in SIZES.items()}
+        names = {}
+        with self._lock:
+            for size, encoded in encoded_sizes.items():
+                name = content_name(encoded)
+                path = os.path.join(self.root, name)
+                if not os.path.exists(path):
+                    write_atomic(path, encoded)
+                self._sizes[name] = len(encoded)
+                self._index[(size, url)] = name
+                names[size] = name
+            self._evict()
+            self._save_index()
+        return names
+
+    def cached_path(self, url, size="card"):
+        """Return the local file for ``url`` at ``size`` if it is cached, else None."""
+        with self._lock:
+            name = self._index.get((size, url))
+            if name and self._touch(name):
+                return os.path.join(self.root, name)
+        return None
+
+    def _failed_recently(self, url):
+        return time.monotonic() - self._failures.get(url, -RETRY_AFTER) < RETRY_AFTER
+
+    def path(self, url, size="card"):
+        """Return the local file for ``url`` at ``size``, downloading it on a miss.
+
+        Returns None if the image cannot be fetched or decoded.
+        """
+        path = self.cached_path(url, size)
+        if path is not None:
+            return path
+        with self._lock:
+            if self._failed_recently(url):
+                return None
+
+        try:
+            names = self.store(url, self.fetch(url))
+        except Exception:
+            with self._lock:
+                self._failures[url] = time.monotonic()
+            return None
+        return os.path.join(self.root, names[size])
+
+    def prefetch(self, url):
+        """Download ``url`` in the background unless it is already on its way
+        or failed recently."""
+        with self._lock:
+            if url in self._pending or self._failed_recently(url):
+                return
+            self._pending.add(url)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(FETCH_WORKERS, thread_name_prefix="thumbnail-fetch")
+        self._executor.submit(self._prefetch, url)
+
+    def _prefetch(self, url):
+        try:
+            self.path(url)
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def url(self, url, size="card", wait=False):
+        """Return the URL to serve for ``url`` at ``size``, falling back to ``url`` itself.
+
+        On a miss the image is downloaded in the background and ``url`` is
+        returned straight away, unless ``wait`` is set.
+        """
+        if not url.startswith("http"):
+            return url
+        if wait:
+            path = self.path(url, size)
+        else:
+            path = self.cached_path(url, size)
+            if path is None:
+                self.prefetch(url)
+        if path is None:
+            return url
+        return f"{self.url_prefix}/{os.path.basename(path)}"
+
+
+@lru_cache(maxsize=None)
+def get_thumbnail_cache():
+    return ThumbnailCache()
+
+
+def thumbnail_url(url, size="card"):
+    return get_thumbnail_cache().url(url, size)
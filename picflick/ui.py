@@ -0,0 +1,261 @@
+"""Streamlit building blocks shared by the filter pages."""
+import math
+import os
+
+import numpy as np
+import streamlit as st
+from PIL import Image, ImageOps
+
+from picflick.effects import create_effect, has_effect
+from picflick.pyramid import get_manifest
+from picflick.search import load_search_index
+from picflick.thumbnails import RETRY_AFTER, ROOT_DIR, SIZES, thumbnail_url
+
+# Choices for how many filter cards the grid shows at once
+PAGE_SIZES = (9, 18, 36, 72)
+
+# Rendered cards are kept this long; a card drawn while its image was still
+# downloading, or after the download failed, then picks up the local copy
+CARD_CACHE_TTL = RETRY_AFTER
+CARD_CACHE_ENTRIES = 20_000
+
+# Photo the local effects are shown on until the user uploads their own
+SAMPLE_PHOTO = os.path.join(ROOT_DIR, "Sutton_Hoo_helmet_2016.png")
+PREVIEW_WIDTH = 960
+
+CARD_STYLE = """
+<style>
+    .card {
+        border: 1px solid #007bff;
+        border-radius: 10px;
+        padding: 15px;
+        margin: 10px;
+        transition: transform 0.2s;
+        background-color: black;
+        color: lightgrey;
+    }
+    .card:hover {
+        transform: translateY(-5px);
+        box-shadow: 0 4px 8px rgba(0,0,0,0.1);
+    }
+    .expanded-card {
+        border: 1px solid #ddd;
+        position: fixed;
+        top: 50%;
+        left: 50%;
+        transform: translate(-50%, -50%);
+        z-index: 1000;
+        background:rgb(14, 17, 23);
+        width: 60%;
+        padding: 10px;
+        border-radius: 15px;
+        box-shadow: 0 0 20px rgba(0,0,0,0.2);
+    }
+    .sidebar .sidebar-content {
+        transition: width 0.3s;
+    }
+</style>
+"""
+
+
+def image_src(url, size="card"):
+    """Local copy of a filter image: the prebuilt pyramid, else the thumbnail cache."""
+    return get_manifest().src(url, SIZES[size]) or thumbnail_url(url, size)
+
+
+def image_attributes(url, sizes="33vw"):
+    """Card ``<img>`` attributes, with a srcset and blurred placeholder for pyramid images."""
+    manifest = get_manifest()
+    srcset = manifest.srcset(url)
+    if not srcset:
+        return 'style="border-radius: 8px;"'
+    return (
+        f'srcset="{srcset}" sizes="{sizes}" '
+        f'style="border-radius: 8px; background: url({manifest.placeholder(url)}) center / cover;"'
+    )
+
+
+def card_style():
+    st.markdown(CARD_STYLE, unsafe_allow_html=True)
+
+
+def select_filter(filter):
+    st.session_state.selected_filter = filter
+
+
+def close_expanded_card():
+    st.session_state.selected_filter = None
+
+
+def search_sidebar(limit=10):
+    """Search box listing ranked matches from every filter page."""
+    search_query = st.text_input("🔍 Search Filters")
+    if not search_query:
+        return
+
+    hits = load_search_index().search(search_query, limit=limit)
+    if not hits:
+        st.caption("No filters match your search.")
+        return
+
+    for hit in hits:
+        filter = hit.filter
+        st.button(
+            f"{filter['name']} · {filter['category']}",
+            key=f"search_{filter['id']}",
+            on_click=select_filter,
+            args=(filter,),
+            width="stretch",
+        )
+
+
+# The filter itself is not hashed: its id and version identify it, and the manifest
+# version changes whenever the pyramid is rebuilt
+@st.cache_data(ttl=CARD_CACHE_TTL, max_entries=CARD_CACHE_ENTRIES, show_spinner=False)
+def _card_html(filter_id, version, manifest_version, _filter):
+    filter = _filter
+    return f"""
+    <div class="card" onclick="window.streamlit.setComponentValue({filter['id']})">
+        <img src="{image_src(filter['image_url'])}" width="100%" loading="lazy" decoding="async" {image_attributes(filter['image_url'])}>
+        <h3>{filter['name']}</h3>
+        <p>{filter['short_desc']}</p>
+    </div>
+    """
+
+
+@st.cache_data(ttl=CARD_CACHE_TTL, max_entries=CARD_CACHE_ENTRIES, show_spinner=False)
+def _expanded_card_html(filter_id, version, manifest_version, _filter):
+    filter = _filter
+    return f"""
+    <div class="expanded-card">
+        <div style="display: flex; gap: 20px; padding: 15px;">
+            <div style="flex: 1;">
+                <img src="{image_src(filter['image_url'], 'expanded')}" style="width: 100%; border-radius: 8px;">
+            </div>
+            <div style="flex: 2;">
+                <h2>{filter['name']}</h2>
+                <div style="margin: 10px 0;">
+                    {"⭐" * int(filter["rating"])} ({filter["rating"]})
+                </div>
+                <p>{filter['long_desc']}</p>
+                <a href="{filter['link']}" target="_blank" style="padding: 10px 20px; background-color: #007bff; color: white; text-decoration: none; border-radius: 5px; display: inline-block;">
+                    OPEN FILTER
+                </a>
+            </div>
+        </div>
+    </div>
+    """
+
+
+def card_html(filter):
+    return _card_html(filter["id"], filter.get("version"), get_manifest().version, filter)
+
+
+def expanded_card_html(filter):
+    return _expanded_card_html(filter["id"], filter.get("version"), get_manifest().version, filter)
+
+
+def expanded_card(filter):
+    st.button("Close The Currently Opened Card", on_click=close_expanded_card, key="close_outside_card")
+
+    # Check if the image is local or remote
+    if filter['image_url'].startswith('http'):
+        st.markdown(expanded_card_html(filter), unsafe_allow_html=True)
+        effect_preview(filter)
+        return
+
+    # Use st.columns for layout with local image
+    cols = st.columns([1, 2])
+    with cols[0]:
+        try:
+            st.image(filter['image_url'])
+        except Exception as e:
+            st.error(f"Could not load image: {e}")
+
+    with cols[1]:
+        st.header(filter['name'])
+        st.write("⭐" * int(filter["rating"]) + f" ({filter['rating']})")
+        st.write(filter['long_desc'])
+        st.markdown(f"[OPEN FILTER]({filter['link']})")
+
+    effect_preview(filter)
+
+
+def effect_preview(filter):
+    """Let the user try the filter on a photo, if PicFlick renders it itself."""
+    if not has_effect(filter["name"]):
+        return
+
+    st.subheader("Try It Here")
+    effect = create_effect(filter["name"])
+    reason = effect.unavailable()
+    if reason:
+        st.info(reason)
+        return
+
+    upload = st.file_uploader(
+        "Upload a photo", type=["png", "jpg", "jpeg", "webp"], key=f"effect_photo_{filter['id']}"
+    )
+    image = ImageOps.exif_transpose(Image.open(upload or SAMPLE_PHOTO)).convert("RGB")
+    image.thumbnail((PREVIEW_WIDTH, PREVIEW_WIDTH))
+    frame = np.array(image)
+    effect(frame)
+    st.image(frame, caption=f"{filter['name']}, rendered by PicFlick", width="stretch")
+
+
+def _keep(widget_key, state_key):
+    # Widget state is dropped whenever the widget is not drawn, e.g. while a card
+    # is expanded, so the value is copied somewhere that survives
+    st.session_state[state_key] = st.session_state[widget_key]
+
+
+def filter_grid(filters, key, columns=3):
+    """Render one page of filter cards.
+
+    Only the visible slice is sent to the browser, so reruns cost the same
+    whatever the size of ``filters``. ``key`` keeps each page's position apart.
+    """
+    page_size = st.session_state.get("filters_per_page", PAGE_SIZES[0])
+    page_count = max(1, math.ceil(len(filters) / page_size))
+
+    # The page may no longer exist after the page size grows
+    page_key = f"{key}_grid_page"
+    page = min(st.session_state.get(page_key, 1), page_count)
+    st.session_state[page_key] = page
+
+    start = (page - 1) * page_size
+    cols = st.columns(columns)
+    for idx, filter in enumerate(filters[start:start + page_size]):
+        with cols[idx % columns]:
+            with st.container():
+                st.markdown(card_html(filter), unsafe_allow_html=True)
+                st.button(f"Select {filter['name']}", key=filter['id'], on_click=select_filter, args=(filter,))
+
+    if len(filters) > PAGE_SIZES[0]:
+        st.session_state[f"{page_key}_input"] = page
+        st.session_state["filters_per_page_input"] = page_size
+
+        pager, sizes = st.columns([3, 1])
+        with pager:
+            st.number_input(
+                f"Page (of {page_count})", min_value=1, max_value=page_count, step=1,
+                key=f"{page_key}_input", on_change=_keep, args=(f"{page_key}_input", page_key),
+            )
+        with sizes:
+            st.selectbox(
+                "Filters per page", PAGE_SIZES,
+                key="filters_per_page_input", on_change=_keep, args=("filters_per_page_input", "filters_per_page"),
+            )
+
+
+@st.fragment
+def filter_browser(filters, key):
+    """The card grid, or the expanded card once a filter is selected.
+
+    Runs as a fragment: selecting or closing a card reruns just this part of
+    the page instead of the whole script.
+    """
+    if st.session_state.get("selected_filter"):
+        expanded_card(st.session_state.selected_filter)
+    else:
+        filter_grid(filters, key)
@@ -0,0 +1 @@
+"""Effects applied to video: live streams (``pipeline``) and whole clips (``render``)."""
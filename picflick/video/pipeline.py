@@ -0,0 +1,336 @@
+"""Live video through an effect: capture, process and encode on their own threads.
+
+The stages are joined by small bounded queues that never make the producer
+wait: when a queue is full its oldest frame is dropped, so under load the
+pipeline skips frames instead of falling behind, and the newest frame is
+always the next one out. Frames live in a fixed pool of preallocated buffers;
+capture copies into a free buffer (dropping the frame if none is free),
+effects change it in place, and the buffer goes back to the pool once it has
+been encoded or dropped.
+
+Processing runs on a pool of workers. Stateful effects (particles, face
+tracking) need the frames in order, so they get a single worker by default.
+
+Try it without a camera::
+
+    python -m picflick.video.pipeline "Snow Effect" --seconds 5 --size 1280x720
+"""
+import argparse
+import io
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+from picflick.effects import EFFECTS, create_effect
+from picflick.effects.base import StageTimings, check_frame
+from picflick.effects.synthetic import synthetic_frames
+
+# Frames waiting between two stages
+QUEUE_SIZE = 2
+
+# Latencies kept for the latency figures
+LATENCY_WINDOW = 1000
+
+
+class FramePool:
+    """``count`` preallocated frames of one shape, handed out and given back."""
+
+    def __init__(self, shape, count):
+        self.shape = tuple(shape)
+        self.count = count
+        self._free = queue.SimpleQueue()
+        for _ in range(count):
+            self._free.put(np.empty(self.shape, dtype=np.uint8))
+
+    def acquire(self):
+        """A free frame, or None if all of them are in use."""
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return None
+
+    def release(self, frame):
+        self._free.put(frame)
+
+    def available(self):
+        return self._free.qsize()
+
+
+class LatestQueue:
+    """A bounded queue whose ``put`` never blocks: when full, the oldest item is
+    dropped (and handed to ``on_drop``) to make room for the new one."""
+
+    def __init__(self, maxsize, on_drop=None):
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.dropped = 0
+        self.max_depth = 0
+        self._items = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(self._items.popleft())
+                else:
+                    self._items.popleft()
+            self._items.append(item)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._condition.notify()
+
+    def get(self):
+        """The oldest item, waiting for one; None once the queue is closed and empty."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._items or self._closed)
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def stats(self):
+        return {"depth": len(self._items), "max_depth": self.max_depth, "dropped": self.dropped}
+
+
+class Packet:
+    """A frame travelling through the pipeline."""
+
+    __slots__ = ("number", "t", "frame", "captured")
+
+    def __init__(self, number, t, frame, captured):
+        self.number = number
+        self.t = t
+        self.frame = frame
+        self.captured = captured
+
+
+class Pipeline:
+    """Frames from ``source`` through the effect made by ``make_effect`` into ``sink``.
+
+    ``source`` yields ``(frame, t)``; it may reuse one frame, since each is
+    copied on capture. ``make_effect()`` is called once per worker, and
+    ``sink(frame, t)`` gets the processed frames, newest-first order kept: a
+    frame finished after a newer one has been encoded is dropped. ``stats()``
+    reports queue depths, drops and end-to-end latency while it runs.
+    """
+
+    def __init__(self, source, make_effect, sink, shape, workers=None, queue_size=QUEUE_SIZE):
+        self.source = source
+        self.sink = sink
+        self.effects = [make_effect()]
+        if workers is None:
+            workers = 1 if self.effects[0].stateful else max(1, min(4, os.cpu_count() or 1))
+        self.effects += [make_effect() for _ in range(workers - 1)]
+
+        # Enough frames for every queue slot, every worker and capture and encode
+        self.pool = FramePool(shape, 2 * queue_size + workers + 2)
+        self.process_queue = LatestQueue(queue_size, on_drop=self._drop)
+        self.encode_queue = LatestQueue(queue_size, on_drop=self._drop)
+        self.timings = StageTimings()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.captured = 0
+        self.delivered = 0
+        self.no_buffer = 0
+        self.stale = 0
+        self.error = None
+
+        self._last_number = -1
+        self._workers_left = workers
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._started = None
+        self._capture = threading.Thread(target=self._run_capture, name="capture", daemon=True)
+        self._workers = [
+            threading.Thread(target=self._run_worker, args=(effect,), name=f"process-{number}", daemon=True)
+            for number, effect in enumerate(self.effects)
+        ]
+        self._encoder = threading.Thread(target=self._run_encoder, name="encode", daemon=True)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._encoder.start()
+        for worker in self._workers:
+            worker.start()
+        self._capture.start()
+        return self
+
+    def stop(self):
+        """Stop capturing; frames already captured still go through."""
+        self._stopping.set()
+
+    def join(self):
+        self._capture.join()
+        for worker in self._workers:
+            worker.join()
+        self._encoder.join()
+        if self.error is not None:
+            raise self.error
+        return self.stats()
+
+    def run(self):
+        return self.start().join()
+
+    def _drop(self, packet):
+        self.pool.release(packet.frame)
+
+    def _fail(self, error):
+        with self._lock:
+            if self.error is None:
+                self.error = error
+        self.stop()
+
+    def _run_capture(self):
+        try:
+            for number, (frame, t) in enumerate(self.source):
+                if self._stopping.is_set():
+                    break
+                self.captured += 1
+                buffer = self.pool.acquire()
+                if buffer is None:
+                    # Every buffer is busy downstream: skip this frame rather than wait
+                    self.no_buffer += 1
+                    continue
+                with self.timings.stage("capture"):
+                    np.copyto(buffer, frame)
+                self.process_queue.put(Packet(number, t, buffer, time.perf_counter()))
+        except Exception as error:
+            self._fail(error)
+        finally:
+            self.process_queue.close()
+
+    def _run_worker(self, effect):
+        try:
+            while True:
+                packet = self.process_queue.get()
+                if packet is None:
+                    break
+                if self.error is not None:
+                    self.pool.release(packet.frame)
+                    continue
+                try:
+                    with self.timings.stage("process"):
+                        effect(packet.frame, packet.t)
+                except Exception as error:
+                    # Keep draining, so the frames still queued go back to the pool
+                    self.pool.release(packet.frame)
+                    self._fail(error)
+                    continue
+                self.encode_queue.put(packet)
+        finally:
+            with self._lock:
+                self._workers_left -= 1
+                last = self._workers_left == 0
+            if last:
+                self.encode_queue.close()
+
+    def _run_encoder(self):
+        while True:
+            packet = self.encode_queue.get()
+            if packet is None:
+                break
+            try:
+                if packet.number < self._last_number or self.error is not None:
+                    # A newer frame already went out
+                    self.stale += 1
+                    continue
+                self._last_number = packet.number
+                with self.timings.stage("encode"):
+                    self.sink(packet.frame, packet.t)
+                self.delivered += 1
+                self.latencies.append((time.perf_counter() - packet.captured) * 1000)
+            except Exception as error:
+                self._fail(error)
+            finally:
+                self.pool.release(packet.frame)
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        dropped = {
+            "no_buffer": self.no_buffer,
+            "process_queue": self.process_queue.dropped,
+            "encode_queue": self.encode_queue.dropped,
+            "stale": self.stale,
+        }
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            "captured": self.captured,
+            "delivered": self.delivered,
+            "fps": round(self.delivered / elapsed, 2) if elapsed else 0.0,
+            "workers": len(self._workers),
+            "queues": {"process": self.process_queue.stats(), "encode": self.encode_queue.stats()},
+            "free_buffers": self.pool.available(),
+            "dropped": dropped,
+            "drop_rate": round(sum(dropped.values()) / self.captured, 4) if self.captured else 0.0,
+            "latency_ms": {
+                "mean": round(float(latencies.mean()), 2),
+                "p50": round(float(np.percentile(latencies, 50)), 2),
+                "p95": round(float(np.percentile(latencies, 95)), 2),
+                "max": round(float(latencies.max()), 2),
+            },
+            "stages": self.timings.snapshot(),
+        }
+
+
+def paced(frames, fps):
+    """``frames`` released no faster than ``fps``, the way a camera delivers them."""
+    started = time.perf_counter()
+    for number, item in enumerate(frames):
+        delay = started + number / fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield item
+
+
+class JpegEncoder:
+    """A sink that JPEG-encodes each frame and keeps the newest, e.g. for an MJPEG stream."""
+
+    def __init__(self, quality=80):
+        self.quality = quality
+        self.latest = None
+
+    def __call__(self, frame, t):
+        output = io.BytesIO()
+        Image.fromarray(check_frame(frame)).save(output, format="JPEG", quality=self.quality)
+        self.latest = output.getvalue()
+
+
+def main(argv=None):
+    from picflick.effects.bench import parse_option, parse_size
+
+    parser = argparse.ArgumentParser(description="Run an effect on a live synthetic stream and report the pipeline.")
+    parser.add_argument("effect", choices=sorted(EFFECTS), help="catalog filter name")
+    parser.add_argument("--size", type=parse_size, default=(1280, 720), help="frame size, WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=float, default=30.0, help="camera frame rate")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--option", type=parse_option, action="append", default=[],
+                        help="effect option as name=value, e.g. detector=synthetic")
+    args = parser.parse_args(argv)
+
+    width, height = args.size
+    frames = synthetic_frames(width, height, int(args.seconds * args.fps), args.fps)
+    pipeline = Pipeline(
+        paced(frames, args.fps), lambda: create_effect(args.effect, **dict(args.option)), JpegEncoder(),
+        (height, width, 3), workers=args.workers,
+    )
+    stats = pipeline.run()
+    for name, value in stats.items():
+        print(f"{name}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
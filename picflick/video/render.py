@@ -0,0 +1,369 @@
+"""Apply catalog filters to a whole video file::
+
+    python -m picflick.video.render clip.mp4 clip-snow.mp4 --filter "Snow Effect"
+    python -m picflick.video.render talk.mov talk-eyes.mp4 --filter "Green Eye" --workers 4
+
+The clip is split at keyframes into segments of about ``SEGMENT_SECONDS``,
+and the segments are decoded, filtered and encoded in a pool of processes,
+each into its own file starting on a keyframe. The files are then joined with
+the concat demuxer and the original audio, copying the streams, so nothing is
+encoded twice and there are no seams to re-encode. Frames keep their source
+timestamps throughout, so variable frame rate clips are not retimed.
+
+Stateful effects (falling particles, face trackers) carry state from frame to
+frame, which a segment starting in the middle of the clip would not have. Each
+segment therefore resets its effect with a seed of its own and runs it over
+at least ``WARMUP`` frames before its start, throwing those frames away. The
+warm-up starts on a multiple of the effect's keyframe interval, so face
+trackers detect on the same frames as a single pass would. Segments depend
+only on the clip, never on the number of workers, so the same clip always
+renders to the same frames.
+
+Read-only assets (vignette masks, colour lookup tables, sprites) are built
+once before the pool starts and memory-mapped by every worker (see
+``picflick.effects.assets``). Needs ``ffmpeg`` and ``ffprobe`` on the path,
+or at ``PICFLICK_FFMPEG`` and ``PICFLICK_FFPROBE``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from picflick.effects.assets import share_assets
+from picflick.effects.bench import parse_option
+from picflick.effects.chain import make_effect
+from picflick.effects.face import KEYFRAME_INTERVAL
+
+FFMPEG = os.getenv("PICFLICK_FFMPEG", "ffmpeg")
+FFPROBE = os.getenv("PICFLICK_FFPROBE", "ffprobe")
+
+# Target segment length; segments only ever start on a keyframe
+SEGMENT_SECONDS = 10.0
+
+# Frames before a segment that its stateful effect runs over first, at least
+WARMUP = 3 * KEYFRAME_INTERVAL
+
+# Seed of the first segment; each later one adds its index
+SEED = 0
+
+ENCODE_OPTIONS = ("-c:v", "libx264", "-pix_fmt", "yuv420p")
+
+_effect = None
+
+
+class Clip:
+    """What rendering needs to know about the video stream of ``path``."""
+
+    def __init__(self, path, width, height, times, keyframes, start_time=0.0):
+        self.path = path
+        self.width = width
+        self.height = height
+        # Presentation time of every frame, and the indices of the keyframes;
+        # times count from the container's start, which need not be 0
+        self.start_time = start_time
+        self.times = times
+        self.keyframes = keyframes
+
+    @property
+    def frames(self):
+        return len(self.times)
+
+
+def _run(command):
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(command[0])} failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout.decode()
+
+
+def probe(path):
+    """The ``Clip`` for the first video stream of ``path``."""
+    info = json.loads(_run([
+        FFPROBE, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height:format=start_time", "-of", "json", path,
+    ]))
+    if not info.get("streams"):
+        raise ValueError(f"{path} has no video stream")
+    stream = info["streams"][0]
+    start_time = info.get("format", {}).get("start_time", "N/A")
+
+    packets = []
+    for line in _run([
+        FFPROBE, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path,
+    ]).splitlines():
+        pts_time, _, flags = line.strip().partition(",")
+        if pts_time and pts_time != "N/A":
+            packets.append((float(pts_time), "K" in flags))
+    if not packets:
+        raise ValueError(f"{path} has no video frames")
+    # Packets come in decoding order; frames are shown in presentation order
+    packets.sort()
+    times = np.array([pts_time for pts_time, _ in packets])
+    keyframes = [number for number, (_, key) in enumerate(packets) if key] or [0]
+    if keyframes[0] != 0:
+        keyframes.insert(0, 0)
+    return Clip(
+        path, int(stream["width"]), int(stream["height"]), times, keyframes,
+        float(start_time) if start_time != "N/A" else 0.0,
+    )
+
+
+def plan_segments(clip, seconds=SEGMENT_SECONDS):
+    """``(start, stop)`` frame ranges covering ``clip``, each starting on a keyframe
+    and at least ``seconds`` long except the last."""
+    starts = [0]
+    for keyframe in clip.keyframes[1:]:
+        if clip.times[keyframe] - clip.times[starts[-1]] >= seconds:
+            starts.append(keyframe)
+    return list(zip(starts, starts[1:] + [clip.frames]))
+
+
+def read_frames(clip, start, count):
+    """Yield ``count`` frames of ``clip`` from frame ``start`` on, with their times
+    in seconds from the start of the clip.
+
+    The same buffer is reused for every frame. Raises ``RuntimeError`` if the
+    decoder runs out before ``count`` frames.
+    """
+    frame = np.empty((clip.height, clip.width, 3), dtype=np.uint8)
+    # Input seeking counts from the container's start time; halfway back to
+    # the frame before, so rounding cannot skip the first frame wanted
+    seek = (clip.times[start] + clip.times[start - 1]) / 2 - clip.start_time if start else 0.0
+    decoder = subprocess.Popen([
+        FFMPEG, "-v", "error", "-nostdin", "-ss", f"{max(seek, 0.0):.6f}", "-i", clip.path,
+        "-map", "0:v:0", "-frames:v", str(count), "-fps_mode", "passthrough",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-",
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        buffer = memoryview(frame.reshape(-1))
+        for number in range(start, start + count):
+            read = 0
+            while read < len(buffer):
+                chunk = decoder.stdout.readinto(buffer[read:])
+                if not chunk:
+                    break
+                read += chunk
+            if read < len(buffer):
+                # A short segment would put every later one out of step
+                raise RuntimeError(
+                    f"Decoding {clip.path} gave {number - start} of {count} frames from frame {start}"
+                )
+            yield frame, float(clip.times[number] - clip.start_time)
+    finally:
+        decoder.stdout.close()
+        error = decoder.stderr.read().decode(errors="replace").strip()
+        if decoder.wait() != 0 and error:
+            raise RuntimeError(f"Decoding {clip.path} failed: {error}")
+
+
+def _ebml(element, payload):
+    # An element with an 8 byte size, which fits any payload
+    return element + (len(payload) | 1 << 56).to_bytes(8, "big") + payload
+
+
+def _ebml_uint(element, value):
+    return _ebml(element, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+class MatroskaWriter:
+    """Raw RGB frames with their timestamps, as a minimal Matroska stream.
+
+    Raw video on a pipe carries no timestamps, so an encoder reading it can
+    only assume a constant frame rate; this is about the smallest container
+    ffmpeg reads frame times from on a pipe. Timestamps are in microseconds.
+    """
+
+    def __init__(self, output, width, height):
+        self.output = output
+        self.frame_size = width * height * 3
+        output.write(_ebml(b"\x1a\x45\xdf\xa3", b"".join([
+            _ebml_uint(b"\x42\x86", 1), _ebml_uint(b"\x42\xf7", 1),  # EBML versions
+            _ebml_uint(b"\x42\xf2", 4), _ebml_uint(b"\x42\xf3", 8),  # longest id and size
+            _ebml(b"\x42\x82", b"matroska"), _ebml_uint(b"\x42\x87", 4), _ebml_uint(b"\x42\x85", 2),
+        ])))
+        # A segment of unknown size, as it is streamed
+        output.write(b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff")
+        output.write(_ebml(b"\x15\x49\xa9\x66", _ebml_uint(b"\x2a\xd7\xb1", 1000)))  # Microsecond ticks
+        video = _ebml_uint(b"\xb0", width) + _ebml_uint(b"\xba", height) + _ebml(b"\x2e\xb5\x24", b"RGB\x18")
+        track = b"".join([
+            _ebml_uint(b"\xd7", 1), _ebml_uint(b"\x73\xc5", 1), _ebml_uint(b"\x83", 1),  # Number, uid, video
+            _ebml(b"\x86", b"V_UNCOMPRESSED"), _ebml(b"\xe0", video),
+        ])
+        output.write(_ebml(b"\x16\x54\xae\x6b", _ebml(b"\xae", track)))
+
+    def write(self, frame, t):
+        """Write ``frame`` shown at ``t`` seconds, one cluster per frame."""
+        timestamp = _ebml_uint(b"\xe7", max(0, round(t * 1_000_000)))
+        # Track 1, no offset from the cluster's time, a keyframe
+        block = b"\xa3" + (4 + self.frame_size | 1 << 56).to_bytes(8, "big") + b"\x81\x00\x00\x80"
+        size = len(timestamp) + len(block) + self.frame_size
+        self.output.write(b"\x1f\x43\xb6\x75" + (size | 1 << 56).to_bytes(8, "big") + timestamp + block)
+        self.output.write(frame.data)
+
+
+def warmup_start(effect, start, warmup=WARMUP):
+    """First frame ``effect`` runs over before a segment starting at frame ``start``.
+
+    At least ``warmup`` frames early for stateful effects, and on a multiple of
+    their keyframe interval, so face trackers detect on the frames they would
+    in a single pass.
+    """
+    if not effect.stateful or warmup <= 0:
+        return start
+    interval = getattr(effect, "keyframe_interval", KEYFRAME_INTERVAL)
+    return max(0, (start - warmup) // interval * interval)
+
+
+def render_segment(effect, clip, start, stop, target, index=0, warmup=WARMUP, crf=18, preset="veryfast"):
+    """Render frames ``start`` to ``stop`` of ``clip`` into the video file ``target``.
+
+    Frames keep their times, counted from ``start``. Returns the number of
+    frames written.
+    """
+    effect.reset(SEED + index)
+    first = warmup_start(effect, start, warmup)
+    # Timestamps go through untouched, in microseconds as they were written
+    encoder = subprocess.Popen([
+        FFMPEG, "-v", "error", "-nostdin", "-y", "-f", "matroska", "-i", "-",
+        "-fps_mode", "passthrough", "-enc_time_base", "-1",
+        *ENCODE_OPTIONS, "-crf", str(crf), "-preset", preset, "-an", target,
+    ], stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    written = 0
+    try:
+        writer = MatroskaWriter(encoder.stdin, clip.width, clip.height)
+        origin = clip.times[start] - clip.start_time
+        for number, (frame, t) in enumerate(read_frames(clip, first, stop - first), first):
+            effect(frame, t)
+            if number >= start:
+                writer.write(frame, t - origin)
+                written += 1
+    finally:
+        encoder.stdin.close()
+        error = encoder.stderr.read().decode(errors="replace").strip()
+        if encoder.wait() != 0:
+            raise RuntimeError(f"Encoding {target} failed: {error}")
+    return written
+
+
+def _start_worker(filters, options, detector, assets):
+    global _effect
+    share_assets(assets)
+    _effect = make_effect(filters, options, detector)
+
+
+def _render_job(clip, index, start, stop, target, warmup, crf, preset):
+    started = time.perf_counter()
+    frames = render_segment(_effect, clip, start, stop, target, index, warmup, crf, preset)
+    return index, frames, time.perf_counter() - started
+
+
+def concatenate(clip, segments, targets, output, workdir):
+    """Join the files ``targets`` rendered for ``segments`` into ``output`` with
+    the audio of ``clip``, copying the streams."""
+    listing = os.path.join(workdir, "segments.txt")
+    with open(listing, "w") as f:
+        for (start, stop), path in zip(segments, targets):
+            f.write("file '{}'\n".format(path.replace("'", "'\\''")))
+            if stop < clip.frames:
+                # Where the next segment starts; the length of a segment's
+                # last frame is otherwise only a guess
+                f.write(f"duration {clip.times[stop] - clip.times[start]:.6f}\n")
+    _run([
+        FFMPEG, "-v", "error", "-nostdin", "-y", "-f", "concat", "-safe", "0", "-i", listing, "-i", clip.path,
+        "-map", "0:v:0", "-map", "1:a?", "-c", "copy", output,
+    ])
+
+
+def render_video(source, output, filters, options=None, detector=None, workers=None, segment_seconds=SEGMENT_SECONDS,
+                 warmup=WARMUP, crf=18, preset="veryfast", on_progress=None):
+    """Filter the video file ``source`` into ``output``; returns a summary of the run."""
+    started = time.perf_counter()
+    clip = probe(source)
+    segments = plan_segments(clip, segment_seconds)
+    workers = min(workers or os.cpu_count() or 1, len(segments))
+
+    with tempfile.TemporaryDirectory(prefix="picflick-", dir=os.path.dirname(os.path.abspath(output))) as workdir:
+        assets = os.path.join(workdir, "assets")
+        # Build the shared assets once, before any worker needs them
+        share_assets(assets)
+        try:
+            make_effect(filters, options, detector)(np.zeros((clip.height, clip.width, 3), dtype=np.uint8))
+        finally:
+            share_assets(None)
+
+        targets = [os.path.join(workdir, f"segment-{index:05d}.mp4") for index in range(len(segments))]
+        frames = 0
+        with ProcessPoolExecutor(
+            workers, initializer=_start_worker, initargs=(filters, options, detector, assets),
+        ) as pool:
+            futures = [
+                pool.submit(_render_job, clip, index, start, stop, target, warmup, crf, preset)
+                for index, ((start, stop), target) in enumerate(zip(segments, targets))
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                frames += future.result()[1]
+                if on_progress is not None:
+                    on_progress(done, len(segments))
+        concatenate(clip, segments, targets, output, workdir)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "frames": frames,
+        "segments": len(segments),
+        "workers": workers,
+        "seconds": round(elapsed, 2),
+        "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply catalog filters to a video file.")
+    parser.add_argument("input", help="video file to filter")
+    parser.add_argument("output", help="video file to write, e.g. out.mp4")
+    parser.add_argument("--filter", dest="filters", action="append", required=True,
+                        help="catalog filter id or name; repeat to chain several")
+    parser.add_argument("--workers", type=int, default=None, help="processes, one per core by default")
+    parser.add_argument("--segment-seconds", type=float, default=SEGMENT_SECONDS,
+                        help="length of the segments rendered in parallel")
+    parser.add_argument("--warmup", type=int, default=WARMUP, help="frames stateful effects run before each segment")
+    parser.add_argument("--detector", default=None, help="face detector for face filters")
+    parser.add_argument("--option", type=parse_option, action="append", default=[],
+                        help="effect option as name=value (single filter only)")
+    parser.add_argument("--crf", type=int, default=18, help="x264 quality, lower is better")
+    parser.add_argument("--preset", default="veryfast", help="x264 preset")
+    args = parser.parse_args(argv)
+    if args.option and len(args.filters) > 1:
+        parser.error("--option only applies to a single filter")
+
+    try:
+        effect = make_effect(args.filters, dict(args.option), args.detector)
+    except KeyError as error:
+        parser.error(error.args[0])
+    reason = effect.unavailable() if args.detector is None else None
+    if reason:
+        parser.error(reason)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} segments", end="", flush=True)
+
+    summary = render_video(
+        args.input, args.output, args.filters, dict(args.option), args.detector, args.workers,
+        args.segment_seconds, args.warmup, args.crf, args.preset, progress,
+    )
+    print()
+    print(
+        f"{effect.name}: {summary['frames']} frames in {summary['segments']} segments, "
+        f"{summary['seconds']} s ({summary['fps']} fps)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import functools
+import http.server
+import threading
+
+import pytest
+from PIL import Image
+
+
+class CountingHandler(http.server.SimpleHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        super().do_GET()
+
+    def log_request(self, code="-", size="-"):
+        self.server.responses.append((self.path, int(code)))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def image_server(tmp_path):
+    """A local stand-in for the remote image hosts, serving ``tmp_path / "remote"``.
+
+    Like most static hosts it sends Last-Modified and answers If-Modified-Since
+    with 304.
+    """
+    directory = tmp_path / "remote"
+    directory.mkdir()
+    Image.new("RGB", (1600, 1200), "red").save(directory / "big.png")
+    Image.new("RGB", (200, 100), "blue").save(directory / "small.jpg")
+
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(CountingHandler, directory=str(directory))
+    )
+    server.requests = []
+    server.responses = []
+    server.directory = directory
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
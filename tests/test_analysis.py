@@ -0,0 +1,160 @@
+import json
+import re
+import uuid
+from types import SimpleNamespace
+
+from picflick.sentiment.analysis import (
+    LRUCache, iter_analysis, score_turns, split_windows, stream_turn_scores, summarize, turn_windows,
+)
+from picflick.sentiment.results import ResultStore
+
+
+class FakeModel:
+    """Scores the turns a prompt asks about, remembering which ones it was asked."""
+
+    def __init__(self, skip=()):
+        self.skip = set(skip)
+        self.asked = []
+
+    def _answer(self, prompt):
+        numbers = []
+        lines = []
+        for number, text in re.findall(r"^\[(\d+)\] User: (.*)$", prompt.split("Turns to score:", 1)[1], re.M):
+            numbers.append(int(number))
+            if int(number) in self.skip:
+                self.skip.discard(int(number))
+                continue
+            score = 0.5 if "thanks" in text else -0.5
+            emotion = "satisfied" if score > 0 else "frustrated"
+            lines.append(json.dumps({"turn": int(number), "score": score, "emotion": emotion}))
+        self.asked.append(numbers)
+        return "\n".join(lines)
+
+    def invoke(self, prompt, **kwargs):
+        return SimpleNamespace(content=self._answer(prompt))
+
+    def stream(self, prompt, **kwargs):
+        # Chunks that end mid-object, like a model writing a token at a time
+        text = self._answer(prompt)
+        for start in range(0, len(text), 7):
+            yield SimpleNamespace(content=text[start:start + 7])
+
+
+def conversation(turns, start=0, padding=0):
+    return [
+        {"user": f"message {number} {'x' * padding} {'thanks' if number % 2 else 'broken'}", "chatbot": "ok"}
+        for number in range(start, start + turns)
+    ]
+
+
+def test_only_new_turns_are_sent_to_the_model():
+    fake = FakeModel()
+    cache = LRUCache(100)
+    history = conversation(3)
+    first = score_turns(history, fake, cache)
+    assert fake.asked == [[1, 2, 3]]
+
+    history += conversation(2, start=3)
+    scores = score_turns(history, fake, cache)
+    assert fake.asked[1:] == [[4, 5]]
+    assert scores[:3] == first
+    assert [score["emotion"] for score in scores] == ["frustrated", "satisfied"] * 2 + ["frustrated"]
+
+    score_turns(history, fake, cache)
+    assert len(fake.asked) == 2
+
+
+def test_turns_are_cached_by_content_not_position():
+    fake = FakeModel()
+    cache = LRUCache(100)
+    history = conversation(2)
+    score_turns(history, fake, cache)
+    # The same turns in another conversation are not asked for again
+    score_turns(conversation(1, start=5) + history, fake, cache)
+    assert fake.asked == [[1, 2], [1]]
+
+
+def test_skipped_turns_are_asked_for_again_on_their_own():
+    fake = FakeModel(skip={2})
+    scores = score_turns(conversation(3), fake, LRUCache(100))
+    assert fake.asked == [[1, 2, 3], [2]]
+    assert all(score is not None for score in scores)
+
+
+def test_windows_of_a_growing_conversation_stay_put():
+    history = conversation(40, padding=2000)
+    windows = turn_windows(history, range(40))
+    assert len(windows) > 2
+    assert [index for window in windows for index in window] == list(range(40))
+
+    grown = turn_windows(history + conversation(10, start=40, padding=2000), range(50))
+    assert grown[:len(windows) - 1] == windows[:-1]
+
+
+def test_long_conversations_reuse_cached_windows():
+    fake = FakeModel()
+    cache = LRUCache(1000)
+    # About 500 tokens a turn, several windows' worth
+    history = conversation(30, padding=2000)
+    score_turns(history, fake, cache)
+    assert len(fake.asked) > 1
+    assert sorted(number for numbers in fake.asked for number in numbers) == list(range(1, 31))
+
+    fake.asked.clear()
+    score_turns(history + conversation(1, start=30), fake, cache)
+    assert fake.asked == [[31]]
+
+
+def test_split_windows_gives_oversized_items_a_window_of_their_own():
+    assert split_windows(range(5), lambda index: [1, 1, 9, 1, 1][index], budget=3) == [[0, 1], [2], [3, 4]]
+
+
+def test_summary_comes_from_the_turn_scores():
+    history = conversation(4)
+    scores = [
+        {"score": -0.5, "emotion": "angry"},
+        {"score": 0.8, "emotion": "satisfied"},
+        None,
+        {"score": -0.2, "emotion": "frustrated"},
+    ]
+    report = summarize(history, scores)
+    assert abs(report["overall_score"] - (0.1 / 3)) < 1e-9
+    assert report["top_positive_turn"] == 1 and report["top_negative_turn"] == 0
+    assert report["top_positive"] == history[1]["user"]
+    # Ties go to the emotion seen last
+    assert report["dominant_emotion"] == "frustrated"
+    assert report["sentiment_trend"].isna().tolist() == [False, False, True, False]
+
+
+def test_streaming_yields_cached_turns_first_then_each_new_one():
+    fake = FakeModel()
+    cache = LRUCache(100)
+    history = conversation(2)
+    score_turns(history, fake, cache)
+
+    batches = list(stream_turn_scores(history + conversation(3, start=2), fake, cache))
+    assert list(batches[0]) == [0, 1]
+    assert [index for batch in batches[1:] for index in batch] == [2, 3, 4]
+    assert len(batches) > 2
+    assert fake.asked[1:] == [[3, 4, 5]]
+
+
+def test_streaming_asks_again_for_skipped_turns():
+    fake = FakeModel(skip={2})
+    batches = list(stream_turn_scores(conversation(3), fake, LRUCache(100)))
+    assert fake.asked == [[1, 2, 3], [2]]
+    assert sorted(index for batch in batches for index in batch) == [0, 1, 2]
+
+
+def test_iter_analysis_ends_with_the_stored_full_analysis(tmp_path):
+    # Unique text, so no turn is already in the shared score cache
+    history = [dict(turn, user=f"{uuid.uuid4().hex} {turn['user']}") for turn in conversation(4)]
+    results = ResultStore(str(tmp_path / "results.sqlite3"))
+    fake = FakeModel()
+
+    reports = list(iter_analysis(history, fake, mode="llm", results=results))
+    assert reports[-1]["sentiment_trend"].tolist() == [-0.5, 0.5, -0.5, 0.5]
+
+    again = list(iter_analysis(history, fake, mode="llm", results=results))
+    assert len(again) == 1 and len(fake.asked) == 1
+    assert again[0]["sentiment_trend"].tolist() == [-0.5, 0.5, -0.5, 0.5]
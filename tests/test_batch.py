@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from picflick import batch
+
+
+def make_image(path, color=(40, 90, 160), size=(64, 48)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color).save(path)
+    return path
+
+
+def outputs(directory):
+    return sorted(
+        os.path.relpath(os.path.join(current, name), directory)
+        for current, _, names in os.walk(directory)
+        for name in names
+    )
+
+
+def run(*argv):
+    return batch.main([*map(str, argv), "--filter", "Snow Effect", "--workers", "1"])
+
+
+@pytest.fixture
+def photos(tmp_path):
+    make_image(tmp_path / "photos" / "a.png")
+    make_image(tmp_path / "photos" / "trip" / "b.jpg")
+    (tmp_path / "photos" / "notes.txt").write_text("not an image")
+    return tmp_path / "photos"
+
+
+def test_directory_input_keeps_relative_paths(photos, tmp_path):
+    out = tmp_path / "out"
+    assert run(photos, "--output", out) == 0
+    assert outputs(out) == ["a.png", os.path.join("trip", "b.jpg")]
+    with Image.open(out / "a.png") as image:
+        frame = np.array(image)
+    assert frame.shape == (48, 64, 3)
+    # Snow was drawn on it
+    assert (frame != (40, 90, 160)).any()
+
+
+def test_glob_input(photos, tmp_path):
+    out = tmp_path / "out"
+    assert run(photos / "**" / "*.jpg", "--output", out) == 0
+    assert outputs(out) == [os.path.join("trip", "b.jpg")]
+
+
+def test_single_file_input(photos, tmp_path, capsys):
+    out = tmp_path / "out"
+    assert run(photos / "a.png", "--output", out) == 0
+    assert outputs(out) == ["a.png"]
+    # Run again: the output is there, so it is skipped
+    assert run(photos / "a.png", "--output", out) == 0
+    assert "1 skipped, 0 failed" in capsys.readouterr().out.splitlines()[-1]
+
+
+def test_inputs_with_the_same_name_get_folders_of_their_own(tmp_path):
+    make_image(tmp_path / "day1" / "photos" / "a.png", color=(255, 0, 0))
+    make_image(tmp_path / "day2" / "photos" / "a.png", color=(0, 0, 255))
+    make_image(tmp_path / "extra" / "a.png")
+    out = tmp_path / "out"
+
+    assert run(tmp_path / "day1" / "photos", tmp_path / "day2" / "photos", tmp_path / "extra", "--output", out) == 0
+    assert outputs(out) == [
+        os.path.join("extra", "a.png"), os.path.join("photos-1", "a.png"), os.path.join("photos-2", "a.png"),
+    ]
+    with Image.open(out / "photos-1" / "a.png") as first, Image.open(out / "photos-2" / "a.png") as second:
+        assert np.array(first)[..., 0].mean() > np.array(second)[..., 0].mean()
+
+
+def test_interrupted_run_carries_on(photos, tmp_path):
+    out = tmp_path / "out"
+    make_image(out / "a.png", color=(1, 2, 3))
+    # Left behind by a worker that was killed mid-write
+    (out / "trip").mkdir()
+    (out / "trip" / "b.jpg.123.part").write_bytes(b"half an image")
+
+    report = batch.run_batch([str(photos)], ["Snow Effect"], str(out), workers=1)
+    assert (report.done, report.skipped, report.failed) == (1, 1, [])
+    with Image.open(out / "a.png") as image:
+        assert image.getpixel((0, 0)) == (1, 2, 3)
+    assert os.path.isfile(out / "trip" / "b.jpg")
+
+    report = batch.run_batch([str(photos)], ["Snow Effect"], str(out), workers=1, overwrite=True)
+    assert (report.done, report.skipped) == (2, 0)
+
+
+def test_unreadable_images_are_reported(photos, tmp_path, capsys):
+    (photos / "broken.png").write_bytes(b"not a png")
+    assert run(photos, "--output", tmp_path / "out") == 1
+    assert "broken.png" in capsys.readouterr().err
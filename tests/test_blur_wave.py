@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from picflick.effects.blur import DOWNSCALE, BlurredEdge, gaussian_kernel, linear_taps, vignette_mask
+from picflick.effects.synthetic import synthetic_frame, synthetic_frames
+from picflick.effects.wave import DistortedWave
+
+WIDTH, HEIGHT = 161, 122
+
+
+def blurred_edge_reference(frame, strength):
+    """Blurred Edge worked out directly, in float64."""
+    height, width = frame.shape[:2]
+    sh, sw = height // DOWNSCALE, width // DOWNSCALE
+    small = frame[:sh * DOWNSCALE, :sw * DOWNSCALE].reshape(sh, DOWNSCALE, sw, DOWNSCALE, 3).mean((1, 3))
+
+    kernel = gaussian_kernel(0.8 + 2.2 * strength).astype(np.float64)
+    radius = len(kernel) // 2
+    for axis in (0, 1):
+        padding = [(0, 0)] * 3
+        padding[axis] = (radius, radius)
+        padded = np.pad(small, padding, mode="edge")
+        small = sum(
+            weight * np.take(padded, np.arange(offset, offset + small.shape[axis]), axis=axis)
+            for offset, weight in enumerate(kernel)
+        )
+
+    lower, upper, weight = linear_taps(sw, width)
+    wide = small[:, lower] * (1 - weight[None, :, None]) + small[:, upper] * weight[None, :, None]
+    lower, upper, weight = linear_taps(sh, height)
+    full = wide[lower] * (1 - weight[:, None, None]) + wide[upper] * weight[:, None, None]
+
+    mask = vignette_mask(height, width, strength)
+    return np.floor(frame + (full - frame) * mask + 0.5)
+
+
+@pytest.mark.parametrize("strength", [0.0, 0.6, 1.0])
+def test_blurred_edge_matches_a_direct_reference(strength):
+    frame = synthetic_frame(WIDTH, HEIGHT, 0.7)
+    expected = blurred_edge_reference(frame.astype(np.float64), strength)
+    BlurredEdge(strength)(frame)
+    assert np.abs(frame - expected).max() <= 1
+
+
+def test_blurred_edge_keeps_the_centre_sharp():
+    frame = synthetic_frame(WIDTH, HEIGHT, 0.0)
+    before = frame.copy()
+    BlurredEdge(0.6)(frame)
+    untouched = vignette_mask(HEIGHT, WIDTH, 0.6)[..., 0] == 0
+    assert untouched[HEIGHT // 2, WIDTH // 2]
+    assert np.array_equal(frame[untouched], before[untouched])
+    assert (frame[~untouched] != before[~untouched]).any()
+
+
+def test_blurred_edge_reuses_its_buffers():
+    effect = BlurredEdge()
+    frame = synthetic_frame(WIDTH, HEIGHT)
+    address = frame.ctypes.data
+    assert effect(frame) is frame and frame.ctypes.data == address
+    buffers = effect._buffers
+    full = buffers.full.ctypes.data
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 3):
+        effect(frame, t)
+    assert effect._buffers is buffers and buffers.full.ctypes.data == full
+    # The mask is shared by every effect of the same size and strength
+    other = BlurredEdge()
+    other(synthetic_frame(WIDTH, HEIGHT))
+    assert other._buffers.mask is buffers.mask
+
+    effect(synthetic_frame(80, 60))
+    assert effect._buffers.full.shape == (60, 80, 3)
+
+
+def wave_reference(effect, source, t):
+    """Distorted Wave worked out directly: ``out[y, x] = source[y + dy(x), x + dx(y)]``, clamped."""
+    height, width = source.shape[:2]
+    tables = effect._tables_for(height, width)
+    period = tables.wavelength
+    offset = int(t * effect.speed * period) % period
+    dx = tables.row_shift[offset:offset + height]
+    dy = tables.column_shift[offset:offset + width]
+    ys = np.clip(np.arange(height)[:, None] + dy[None, :], 0, height - 1)
+    xs = np.clip(np.arange(width)[None, :] + dx[:, None], 0, width - 1)
+    return source[ys, xs]
+
+
+@pytest.mark.parametrize("amplitude", [0.012, 0.2, 0.6])
+def test_wave_matches_a_direct_reference(amplitude):
+    effect = DistortedWave(amplitude=amplitude)
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 8, fps=5):
+        expected = wave_reference(effect, frame.copy(), t)
+        assert effect(frame, t) is frame
+        assert np.array_equal(frame, expected)
+
+
+def test_wave_render_reads_one_buffer_and_writes_another():
+    effect = DistortedWave()
+    source = synthetic_frame(WIDTH, HEIGHT, 0.3)
+    kept = source.copy()
+    out = np.zeros_like(source)
+    effect.render(source, out, 0.3)
+    assert np.array_equal(source, kept)
+    assert np.array_equal(out, effect(kept, 0.3))
+
+
+def test_wave_allocates_nothing_per_frame():
+    effect = DistortedWave()
+    effect(synthetic_frame(WIDTH, HEIGHT))
+    tables = effect._tables
+    index = tables.index.ctypes.data
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 4):
+        effect(frame, t)
+    assert effect._tables is tables and tables.index.ctypes.data == index
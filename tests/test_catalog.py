@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from picflick.catalog import CATALOG_PATH, CATEGORIES, FilterCatalog, load_catalog, read_catalog
+
+FIELDS = ["id", "category", "name", "short_desc"]
+
+
+def write_catalog(path, rows, fields=FIELDS):
+    path.write_text(json.dumps({"fields": fields, "rows": rows}), encoding="utf-8")
+    return str(path)
+
+
+def test_rows_become_filters(tmp_path):
+    path = write_catalog(tmp_path / "filters.json", [
+        [1, "Overlays", "Snow Effect", "Falling snow"],
+        [2, "Face Filters", "Green Eye", "Green eyes"],
+    ])
+    catalog = read_catalog(path)
+    assert len(catalog) == 2
+    snow = catalog.get(1)
+    assert {field: snow[field] for field in FIELDS} == {
+        "id": 1, "category": "Overlays", "name": "Snow Effect", "short_desc": "Falling snow",
+    }
+    assert [filter["id"] for filter in catalog] == [1, 2]
+
+
+def test_bundled_catalog_round_trips(tmp_path):
+    with open(CATALOG_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    catalog = load_catalog()
+    assert len(catalog) == len(data["rows"])
+    rows = [[filter[field] for field in data["fields"]] for filter in catalog]
+    assert rows == data["rows"]
+    copy = read_catalog(write_catalog(tmp_path / "copy.json", rows, data["fields"]))
+    assert [filter["version"] for filter in copy] == [filter["version"] for filter in catalog]
+
+
+def test_versions_change_with_the_entry(tmp_path):
+    rows = [[1, "Overlays", "Snow Effect", "Falling snow"], [2, "Overlays", "Rain", "Rain"]]
+    before = read_catalog(write_catalog(tmp_path / "before.json", rows))
+    rows[0][3] = "Heavy snow"
+    after = read_catalog(write_catalog(tmp_path / "after.json", rows))
+    assert before.get(1)["version"] != after.get(1)["version"]
+    assert before.get(2)["version"] == after.get(2)["version"]
+
+
+def test_lookups():
+    catalog = FilterCatalog([
+        {"id": 1, "category": "Overlays", "name": "Snow Effect"},
+        {"id": 2, "category": "Face Filters", "name": "Green Eye"},
+        {"id": 3, "category": "Overlays", "name": "Rain"},
+        {"id": 4, "category": "Stickers", "name": "Star"},
+    ])
+    assert [filter["id"] for filter in catalog.category("Overlays")] == [1, 3]
+    assert catalog.category("Face Deform") == ()
+    assert catalog.category("Unknown") == ()
+    assert catalog.categories == CATEGORIES + ("Stickers",)
+    assert catalog.find("  snow EFFECT ")["id"] == 1
+    assert catalog.find("Hail") is None
+    assert catalog.get(2)["name"] == "Green Eye" and catalog.get(99) is None
+
+
+def test_duplicate_ids_are_refused():
+    with pytest.raises(ValueError, match="Duplicate filter id: 1"):
+        FilterCatalog([{"id": 1, "category": "Overlays", "name": "A"}, {"id": 1, "category": "Overlays", "name": "B"}])
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from picflick.effects import BigEye, Snow, create_effect
+from picflick.effects.chain import FilterChain, filter_name, make_effect
+from picflick.effects.synthetic import synthetic_frames
+
+WIDTH, HEIGHT = 320, 240
+FILTERS = ["Snow Effect", "Distorted Wave Effect", "Blurred Edge", "Big Eye", "Baseball Cap", "Green Eye"]
+
+
+def one_by_one(names, frames):
+    effects = [
+        create_effect(name, detector="synthetic", keyframe_interval=1) if name in ("Big Eye", "Baseball Cap", "Green Eye")
+        else create_effect(name)
+        for name in names
+    ]
+    outputs = []
+    for frame, t in frames:
+        for effect in effects:
+            effect(frame, t)
+        outputs.append(frame.copy())
+    return outputs
+
+
+@pytest.mark.parametrize("names", [FILTERS, FILTERS[1:2], ["Distorted Wave Effect"] * 2, FILTERS[::-1]])
+def test_chain_matches_the_filters_run_one_by_one(names):
+    # Detecting on every frame, the shared tracker sees exactly what each stage would
+    chain = FilterChain(names, detector="synthetic", keyframe_interval=1)
+    outputs = [chain(frame, t).copy() for frame, t in synthetic_frames(WIDTH, HEIGHT, 6)]
+    expected = one_by_one(names, synthetic_frames(WIDTH, HEIGHT, 6))
+    assert all(np.array_equal(a, b) for a, b in zip(outputs, expected))
+
+
+def test_chain_works_in_place_with_one_spare_buffer():
+    chain = FilterChain(FILTERS, detector="synthetic")
+    spare = None
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 5):
+        address = frame.ctypes.data
+        assert chain(frame, t) is frame and frame.ctypes.data == address
+        spare = spare or chain._spare.ctypes.data
+        assert chain._spare.ctypes.data == spare
+    # One landmark tracker for all the face stages, not one each
+    assert chain.stats()["keyframes"] == 1
+    assert all(stage._tracker is None for stage in chain.face_stages)
+
+
+def test_chain_is_repeatable_after_reset():
+    chain = FilterChain(["Snow Effect", "Face Warp"], detector="synthetic")
+    first = [chain(frame, t).copy() for frame, t in synthetic_frames(WIDTH, HEIGHT, 5)]
+    chain.reset()
+    again = [chain(frame, t).copy() for frame, t in synthetic_frames(WIDTH, HEIGHT, 5)]
+    assert all(np.array_equal(a, b) for a, b in zip(first, again))
+
+
+def test_plan():
+    chain = FilterChain(["snow effect", 4, "2", "Big Eye"])
+    assert chain.plan() == [
+        ("Snow Effect", "in place"), ("Distorted Wave Effect", "ping-pong"),
+        ("Blurred Edge", "in place"), ("Big Eye", "face"),
+    ]
+    assert chain.name == "Snow Effect + Distorted Wave Effect + Blurred Edge + Big Eye"
+    assert chain.stateful
+
+
+def test_filter_names():
+    assert filter_name(1) == filter_name("1") == filter_name(" SNOW effect ") == "Snow Effect"
+    with pytest.raises(KeyError):
+        filter_name("No Such Filter")
+    with pytest.raises(KeyError):
+        filter_name(999)
+    with pytest.raises(ValueError):
+        FilterChain([])
+
+
+def test_make_effect():
+    assert isinstance(make_effect("Snow Effect"), Snow)
+    effect = make_effect(6, detector="synthetic")
+    assert isinstance(effect, BigEye) and effect.detector == "synthetic"
+    assert isinstance(make_effect(["Snow Effect", 6]), FilterChain)
@@ -0,0 +1,63 @@
+from picflick.sentiment import conversation
+from picflick.sentiment.conversation import ConversationStore, turn_key, turn_keys, user_messages
+
+
+def turns(count, start=0):
+    return [{"user": f"question {number}", "chatbot": f"answer {number}"} for number in range(start, start + count)]
+
+
+def test_behaves_like_the_list_it_mirrors():
+    history = turns(100)
+    store = ConversationStore.from_turns(history)
+
+    assert len(store) == 100
+    assert list(store) == history
+    assert store[-1] == history[-1]
+    assert list(store[10:20]) == history[10:20]
+    assert list(user_messages(store)) == user_messages(history)
+    assert list(turn_keys(store)) == turn_keys(history)
+    assert store.to_frame()["chatbot"].tolist() == [turn["chatbot"] for turn in history]
+
+
+def test_slices_share_the_columns():
+    store = ConversationStore.from_turns(turns(10))
+    view = store[2:5]
+    assert view.users.base is store.users.base
+    # Appending to a slice copies it rather than writing into the store
+    view.append({"user": "new", "chatbot": "reply"})
+    assert len(view) == 4 and len(store) == 10 and store[5]["user"] == "question 5"
+
+
+def test_sync_hashes_only_new_turns(monkeypatch):
+    hashed = []
+    monkeypatch.setattr(conversation, "turn_key", lambda turn: hashed.append(turn["user"]) or turn_key(turn))
+    history = turns(50)
+    store = ConversationStore().sync(history)
+    assert len(hashed) == 50
+
+    hashed.clear()
+    history += turns(3, start=50)
+    assert store.sync(history) is store
+    assert hashed == ["question 50", "question 51", "question 52"]
+    assert list(store) == history
+
+    hashed.clear()
+    store.sync(history)
+    assert hashed == []
+
+
+def test_sync_follows_edits_and_removals():
+    history = turns(10)
+    store = ConversationStore().sync(history)
+    view = store[:]
+
+    history[7]["chatbot"] = "edited"
+    store.sync(history)
+    assert store[7]["chatbot"] == "edited"
+    assert store.keys[7] == turn_key(history[7])
+    # A slice taken earlier keeps what it had
+    assert view[7]["chatbot"] == "answer 7"
+
+    del history[4:]
+    assert list(store.sync(history)) == history
+    assert list(store.sync([])) == []
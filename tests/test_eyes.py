@@ -0,0 +1,81 @@
+import colorsys
+
+import numpy as np
+import pytest
+
+from picflick.effects.eyes import LUT_BITS, SHADES, GreenEye, hsv_to_rgb, iris_alpha, recolor_lut, rgb_to_hsv
+from picflick.effects.face import clip_rect
+from picflick.effects.synthetic import synthetic_frames, synthetic_landmarks
+
+WIDTH, HEIGHT = 320, 240
+
+
+def test_hsv_conversions_match_colorsys():
+    colours = np.random.default_rng(0).random((500, 3), dtype=np.float32)
+    hue, saturation, value = rgb_to_hsv(colours)
+    expected = np.array([colorsys.rgb_to_hsv(*colour) for colour in colours])
+    # Hue wraps around, so compare it on the circle
+    assert np.abs((hue - expected[:, 0] + 0.5) % 1 - 0.5).max() < 1e-4
+    np.testing.assert_allclose(saturation, expected[:, 1], atol=1e-4)
+    np.testing.assert_allclose(value, expected[:, 2], atol=1e-6)
+    np.testing.assert_allclose(hsv_to_rgb(hue, saturation, value), colours, atol=1e-4)
+
+
+@pytest.mark.parametrize("shade", list(SHADES.values()))
+def test_lut_matches_a_colorsys_reference(shade):
+    lut = recolor_lut(shade)
+    levels = 1 << LUT_BITS
+    assert lut.shape == (levels ** 3, 3) and lut.dtype == np.uint8
+    assert not lut.flags.writeable and recolor_lut(shade) is lut
+
+    target_hue, target_saturation, _ = colorsys.rgb_to_hsv(*(np.array(shade) / 255))
+    for index in np.random.default_rng(1).integers(0, levels ** 3, 300):
+        r, g, b = (index >> (2 * LUT_BITS)) & (levels - 1), (index >> LUT_BITS) & (levels - 1), index & (levels - 1)
+        _, saturation, value = colorsys.rgb_to_hsv(*((np.array([r, g, b]) + 0.5) / levels))
+        saturation = min(1.0, 0.35 * saturation + 0.75 * target_saturation)
+        expected = np.round(np.array(colorsys.hsv_to_rgb(target_hue, saturation, value)) * 255)
+        assert np.abs(lut[index] - expected).max() <= 1
+
+
+def test_green_eye_matches_the_lut_blend_computed_directly():
+    effect = GreenEye(detector="synthetic", keyframe_interval=1)
+    shift = 8 - LUT_BITS
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 4):
+        before = frame.copy()
+        effect(frame, t)
+        face = synthetic_landmarks(WIDTH, HEIGHT, t)
+
+        expected = before.astype(np.float64)
+        for side in ("right", "left"):
+            centre, radius = face.iris(side)
+            rect = clip_rect((centre[0] - radius - 1, centre[1] - radius - 1,
+                              centre[0] + radius + 2, centre[1] + radius + 2), HEIGHT, WIDTH)
+            x0, y0, x1, y1 = rect
+            alpha = iris_alpha(rect, centre, radius, *face.eye(side), face.angle) * effect.strength
+            region = before[y0:y1, x0:x1].astype(np.intp) >> shift
+            index = region[..., 0] * (1 << 2 * LUT_BITS) + region[..., 1] * (1 << LUT_BITS) + region[..., 2]
+            source = expected[y0:y1, x0:x1]
+            expected[y0:y1, x0:x1] = np.floor(source + (effect.lut[index] - source) * alpha + 0.5)
+
+        assert (frame != before).any()
+        assert np.abs(frame - expected).max() <= 1
+
+
+def test_green_eye_leaves_the_rest_of_the_face_alone():
+    effect = GreenEye(detector="synthetic")
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 12):
+        before = frame.copy()
+        effect(frame, t)
+        face = synthetic_landmarks(WIDTH, HEIGHT, t)
+        ys, xs = np.nonzero((frame != before).any(-1))
+        near = np.zeros(len(xs), dtype=bool)
+        for side in ("right", "left"):
+            centre, radius = face.iris(side)
+            # Tracked landmarks may be a little off the drawn ones
+            near |= np.hypot(xs - centre[0], ys - centre[1]) <= radius + 3
+        assert near.all()
+
+
+def test_unknown_shade():
+    with pytest.raises(ValueError, match="Unknown shade"):
+        GreenEye(shade="purple")
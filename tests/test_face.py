@@ -0,0 +1,151 @@
+import numpy as np
+import pytest
+
+from picflick.effects.deform import BigEye, FaceWarp, Warp, disc_rect, radial_field
+from picflick.effects.face import KEYFRAME_INTERVAL, FaceTracker, clip_rect
+from picflick.effects.synthetic import SyntheticFaceDetector, synthetic_face, synthetic_frames, synthetic_landmarks
+from picflick.effects.tracking import LucasKanade
+
+WIDTH, HEIGHT = 320, 240
+FPS = 30.0
+
+
+class CountingDetector(SyntheticFaceDetector):
+    """The synthetic face, noting the frame numbers it was asked on."""
+
+    def __init__(self, face=True):
+        self.face = face
+        self.frames = []
+
+    def __call__(self, frame, t):
+        self.frames.append(round(t * FPS))
+        return super().__call__(frame, t) if self.face else None
+
+
+@pytest.mark.parametrize("interval", [1, 5, KEYFRAME_INTERVAL])
+def test_tracker_detects_on_every_keyframe_interval(interval):
+    detector = CountingDetector()
+    tracker = FaceTracker(detector, keyframe_interval=interval)
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 50, FPS):
+        face = tracker.update(frame, t)
+        # Tracked landmarks stay on the face in between
+        _, radius = synthetic_face(WIDTH, HEIGHT, t)
+        assert face.distance(synthetic_landmarks(WIDTH, HEIGHT, t)) < 0.25 * radius
+
+    assert detector.frames == list(range(0, 50, interval))
+    assert tracker.keyframes == len(detector.frames) and tracker.lost == 0
+
+    tracker.reset()
+    frame, t = next(synthetic_frames(WIDTH, HEIGHT, 1, FPS))
+    tracker.update(frame, t)
+    assert detector.frames[-1] == 0 and tracker.keyframes == 1
+
+
+def test_tracker_without_a_face_waits_for_the_next_keyframe():
+    detector = CountingDetector(face=False)
+    tracker = FaceTracker(detector)
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 30, FPS):
+        assert tracker.update(frame, t) is None
+    assert detector.frames == [0, 12, 24]
+
+
+def test_tracker_detects_again_when_tracking_is_lost():
+    detector = CountingDetector()
+    tracker = FaceTracker(detector)
+    frames = synthetic_frames(WIDTH, HEIGHT, 3, FPS)
+    frame, t = next(frames)
+    tracker.update(frame, t)
+    # A blank frame has nothing to track
+    blank = np.full_like(frame, 128)
+    tracker.update(blank, 1 / FPS)
+    assert tracker.lost == 1 and detector.frames == [0, 1]
+
+
+def test_lucas_kanade_follows_a_known_shift():
+    ys, xs = np.mgrid[0:96, 0:96].astype(np.float32)
+    image = 128 + 60 * np.sin(xs / 5) * np.cos(ys / 7) + 40 * np.sin((xs + ys) / 11)
+    shifted = np.roll(image, (2, 3), axis=(0, 1))
+    points = np.array([[30, 30], [48, 40], [60, 66], [40, 55]], dtype=np.float32)
+    tracked, ok = LucasKanade().track(image, shifted, points)
+    assert ok.all()
+    np.testing.assert_allclose(tracked, points + [3, 2], atol=0.2)
+
+
+def bilinear_reference(frame, xs, ys):
+    height, width = frame.shape[:2]
+    xs = np.clip(xs, 0, width - 1.001)
+    ys = np.clip(ys, 0, height - 1.001)
+    left, top = xs.astype(int), ys.astype(int)
+    fx, fy = (xs - left)[:, None], (ys - top)[:, None]
+    frame = frame.astype(np.float64)
+    return (
+        frame[top, left] * (1 - fx) * (1 - fy) + frame[top, left + 1] * fx * (1 - fy)
+        + frame[top + 1, left] * (1 - fx) * fy + frame[top + 1, left + 1] * fx * fy
+    )
+
+
+def test_warp_matches_a_direct_bilinear_reference():
+    frame = next(synthetic_frames(WIDTH, HEIGHT, 1))[0].copy()
+    rect = clip_rect((100, 60, 220, 180), HEIGHT, WIDTH)
+    dx, dy = radial_field(rect, (160, 120), 60, 0.5)
+    before = frame.copy()
+    Warp(rect, dx, dy, HEIGHT, WIDTH).apply(frame)
+
+    x0, y0, x1, y1 = rect
+    ys, xs = np.mgrid[y0:y1, x0:x1]
+    moving = (np.abs(dx) > 0.05) | (np.abs(dy) > 0.05)
+    expected = bilinear_reference(before, (xs + dx)[moving], (ys + dy)[moving])
+    assert np.abs(frame[y0:y1, x0:x1][moving] - np.floor(expected + 0.5)).max() <= 1
+    # Nothing outside the moving pixels changes
+    changed = (frame != before).any(-1)
+    inside = np.zeros_like(changed)
+    inside[y0:y1, x0:x1] = moving
+    assert not changed[~inside].any()
+
+
+def test_radial_field_fades_out_at_its_radius():
+    dx, dy = radial_field((0, 0, 101, 101), (50, 50), 30, 0.4)
+    ys, xs = np.mgrid[0:101, 0:101]
+    outside = np.hypot(xs - 50, ys - 50) >= 30
+    assert not dx[outside].any() and not dy[outside].any()
+    # Magnifying reads from nearer the centre
+    assert dx[50, 60] < 0 and dy[60, 50] < 0
+
+
+def render(effect, count=15):
+    return [effect(frame, t).copy() for frame, t in synthetic_frames(WIDTH, HEIGHT, count, FPS)]
+
+
+@pytest.mark.parametrize("effect_class", [FaceWarp, BigEye])
+def test_deform_effects_are_repeatable_and_in_place(effect_class):
+    first = render(effect_class(detector="synthetic"))
+    assert all(np.array_equal(a, b) for a, b in zip(first, render(effect_class(detector="synthetic"))))
+
+    effect = effect_class(detector="synthetic")
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 3, FPS):
+        address = frame.ctypes.data
+        assert effect(frame, t) is frame
+        assert frame.ctypes.data == address and frame.dtype == np.uint8 and frame.shape == (HEIGHT, WIDTH, 3)
+
+
+def test_big_eye_changes_only_the_eyes():
+    effect = BigEye(detector="synthetic", keyframe_interval=1)
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 5, FPS):
+        before = frame.copy()
+        effect(frame, t)
+        face = synthetic_landmarks(WIDTH, HEIGHT, t)
+        allowed = np.zeros((HEIGHT, WIDTH), dtype=bool)
+        for side in ("right", "left"):
+            centre, eye_width, _ = face.eye(side)
+            x0, y0, x1, y1 = clip_rect(disc_rect(centre, 1.1 * eye_width), HEIGHT, WIDTH)
+            allowed[y0:y1, x0:x1] = True
+        changed = (frame != before).any(-1)
+        assert changed.any() and not changed[~allowed].any()
+
+
+def test_fields_are_reused_while_the_face_stays_put():
+    effect = FaceWarp(detector="synthetic", keyframe_interval=1)
+    frame = next(synthetic_frames(WIDTH, HEIGHT, 1))[0]
+    outputs = [effect(frame.copy(), 0.0) for _ in range(4)]
+    assert effect.reused == 3
+    assert all(np.array_equal(outputs[0], output) for output in outputs)
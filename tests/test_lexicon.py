@@ -0,0 +1,45 @@
+import numpy as np
+
+from picflick.sentiment.lexicon import EMOTION_WORDS, LEXICON, score_messages, score_turns
+
+MESSAGES = [
+    "Thanks, that fixed it, amazing!!!",
+    "This is the worst, most useless garbage I have ever paid for!!!",
+    "",
+    "hello there",
+    "not bad",
+    "very very extremely absolutely perfect awesome excellent fantastic wonderful love love love!!!!!!",
+    " ".join(LEXICON) * 3,
+]
+
+
+def test_scores_stay_between_minus_one_and_one():
+    scores = score_messages(MESSAGES)
+    assert len(scores) == len(MESSAGES)
+    assert np.all((scores >= -1) & (scores <= 1))
+    # Every word on its own too, negated and intensified
+    for template in ("{}", "not {}", "really {}!!!", "not very {}"):
+        scores = score_messages([template.format(word) for word in LEXICON])
+        assert np.all((scores >= -1) & (scores <= 1))
+
+
+def test_signs_follow_the_words():
+    positive, negative, empty, neutral = score_messages(MESSAGES[:4])
+    assert positive > 0.5 and negative < -0.5
+    assert empty == 0 and neutral == 0
+
+
+def test_negation_flips_and_intensifiers_strengthen():
+    good, not_good, not_very_good, very_good = score_messages(["good", "not good", "not very good", "very good"])
+    assert not_good < 0 < good < very_good
+    assert not_very_good < 0
+    # Negation does not reach into the next message
+    assert score_messages(["not", "good"])[1] == good
+
+
+def test_turns_get_an_emotion():
+    history = [{"user": message, "chatbot": "ok"} for message in MESSAGES[:4]]
+    turns = score_turns(history)
+    assert [turn["emotion"] for turn in turns] == ["satisfied", "angry", "neutral", "neutral"]
+    assert all(isinstance(turn["score"], float) for turn in turns)
+    assert score_turns([{"user": "why is it still stuck?", "chatbot": ""}])[0]["emotion"] in EMOTION_WORDS
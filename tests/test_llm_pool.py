@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from picflick.sentiment import llm
+from picflick.sentiment.llm import PooledModel, get_model, metrics
+
+
+class FakeModel:
+    """Answers after ``delay`` seconds, or when ``gate`` is set, and counts calls in flight."""
+
+    def __init__(self, delay=0.01, gate=None, fail=False):
+        self.delay = delay
+        self.gate = gate
+        self.fail = fail
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _count(self, change):
+        with self._lock:
+            self.calls += change > 0
+            self.in_flight += change
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def invoke(self, prompt, **kwargs):
+        self._count(1)
+        try:
+            time.sleep(self.delay)
+            return prompt
+        finally:
+            self._count(-1)
+
+    async def ainvoke(self, prompt, **kwargs):
+        self._count(1)
+        try:
+            if self.gate is not None:
+                await self.gate.wait()
+            else:
+                await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("model failed")
+            return prompt
+        finally:
+            self._count(-1)
+
+
+def test_calls_in_flight_are_capped():
+    fake = FakeModel()
+    pooled = PooledModel(fake, max_concurrency=3)
+
+    async def run():
+        return await asyncio.gather(*(pooled.ainvoke(number) for number in range(12)))
+
+    assert asyncio.run(run()) == list(range(12))
+    assert fake.max_in_flight == 3
+
+
+def test_slot_is_released_after_an_error():
+    pooled = PooledModel(FakeModel(fail=True), max_concurrency=1)
+    in_flight = metrics.in_flight
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(pooled.ainvoke("prompt"), 2)
+
+    asyncio.run(run())
+    assert metrics.in_flight == in_flight
+
+
+def test_cancelled_waiter_gives_its_slot_back():
+    in_flight = metrics.in_flight
+
+    async def run():
+        gate = asyncio.Event()
+        pooled = PooledModel(FakeModel(gate=gate), max_concurrency=1)
+        holder = asyncio.create_task(pooled.ainvoke("first"))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.create_task(pooled.ainvoke("second"))
+        await asyncio.sleep(0.05)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        gate.set()
+        assert await holder == "first"
+        # Hangs if the cancelled waiter kept the only slot
+        assert await asyncio.wait_for(pooled.ainvoke("third"), 2) == "third"
+
+    asyncio.run(run())
+    assert metrics.in_flight == in_flight
+
+
+def test_many_waiters_do_not_tie_up_the_event_loop_executor():
+    fake = FakeModel()
+    pooled = PooledModel(fake, max_concurrency=4)
+
+    async def run():
+        calls = asyncio.gather(*(pooled.ainvoke(number) for number in range(80)))
+        # The default executor is what opens connections (getaddrinfo)
+        await asyncio.wait_for(asyncio.get_running_loop().getaddrinfo("localhost", 80), 2)
+        return await asyncio.wait_for(calls, 10)
+
+    assert asyncio.run(run()) == list(range(80))
+    assert fake.max_in_flight == 4
+
+
+def test_threads_and_coroutines_share_the_slots():
+    fake = FakeModel()
+    pooled = PooledModel(fake, max_concurrency=2)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        threads = [loop.run_in_executor(None, pooled.invoke, "sync") for _ in range(3)]
+        coroutines = [pooled.ainvoke("async") for _ in range(10)]
+        return await asyncio.wait_for(asyncio.gather(*threads, *coroutines), 10)
+
+    assert asyncio.run(run()) == ["sync"] * 3 + ["async"] * 10
+    assert fake.max_in_flight == 2
+
+
+def test_cancelled_callers_never_lose_a_slot():
+    in_flight = metrics.in_flight
+    fake = FakeModel(delay=0.005)
+    pooled = PooledModel(fake, max_concurrency=3)
+
+    async def run():
+        for _ in range(5):
+            tasks = [asyncio.create_task(pooled.ainvoke(number)) for number in range(30)]
+            await asyncio.sleep(0.012)
+            for task in tasks[::2]:
+                task.cancel()
+            await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 10)
+        # Every slot is free again
+        return await asyncio.wait_for(asyncio.gather(*(pooled.ainvoke(n) for n in range(3))), 2)
+
+    assert asyncio.run(run()) == [0, 1, 2]
+    assert pooled._free == 3 and not pooled._waiters
+    assert metrics.in_flight == in_flight
+
+
+def test_models_are_built_once_per_configuration(monkeypatch):
+    built = []
+    monkeypatch.setattr(llm, "_models", {})
+    monkeypatch.setattr(llm, "build_model", lambda *args, **kwargs: built.append(args) or FakeModel())
+
+    first = get_model("model-a")
+    assert get_model("model-a") is first
+    assert get_model("model-b") is not first
+    assert get_model("model-a", max_concurrency=2) is not first
+    assert len(built) == 3
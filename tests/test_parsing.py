@@ -0,0 +1,54 @@
+from picflick.sentiment.analysis import parse_highlights, parse_turn_scores
+from picflick.sentiment.parsing import extract_object, iter_objects, loads, repair_json
+
+
+def test_valid_json_is_left_alone():
+    assert loads('{"a": [1, 2.5, null]}') == {"a": [1, 2.5, None]}
+    assert repair_json('{"a": 1}') == '{"a": 1}'
+
+
+def test_fenced_json():
+    text = 'Here you go:\n```json\n{"dominant_emotion": "angry", "top_positive": null}\n```\nAnything else?'
+    assert extract_object(text) == {"dominant_emotion": "angry", "top_positive": None}
+    assert list(iter_objects('```\n{"turn": 1}\n{"turn": 2}\n```')) == [{"turn": 1}, {"turn": 2}]
+
+
+def test_common_mistakes_are_repaired():
+    assert loads("{'score': 0.5, 'emotion': 'happy',}") == {"score": 0.5, "emotion": "happy"}
+    assert loads("{turn: 3, done: True, note: None}") == {"turn": 3, "done": True, "note": None}
+    # A response cut off before its closing brace
+    assert extract_object('{"dominant_emotion": "confused", "top_positive": 2,') == {
+        "dominant_emotion": "confused", "top_positive": 2,
+    }
+
+
+def test_malformed_json_gives_nothing():
+    assert loads("not json at all") is None
+    assert loads("{]") is None
+    assert extract_object("no object here") is None
+    assert extract_object("[1, 2, 3]") is None
+    assert list(iter_objects("{broken: [}")) == []
+
+
+def test_partly_valid_responses_keep_the_good_parts():
+    text = "\n".join([
+        '{"turn": 1, "score": 0.4, "emotion": "satisfied"}',
+        '{"turn": 2, "score": oops}',
+        "{'turn': 3, 'score': -1.2, 'emotion': 'Annoyed'}",
+        '{"turn": 4, "score": "NaN", "emotion": "angry"}',
+        '{"turn": 5, "score": true, "emotion": "angry"}',
+        '{"turn": 6, "score": 0.1, "emotion": "bored"}',
+        '{"turn": 9, "score": 0.1, "emotion": "neutral"}',
+    ])
+    assert parse_turn_scores(text, range(6)) == {
+        0: {"score": 0.4, "emotion": "satisfied"},
+        # Overshooting scores are clamped, near-miss emotions mapped
+        2: {"score": -1.0, "emotion": "frustrated"},
+    }
+
+
+def test_highlights_drop_invalid_fields():
+    text = 'Sure! {"dominant_emotion": "furious", "top_positive": 7, "top_negative": "2"} Hope that helps.'
+    assert parse_highlights(text, 5) == {"dominant_emotion": "angry", "top_negative": 1}
+    assert parse_highlights('{"dominant_emotion": "meh", "top_positive": null}', 5) == {"top_positive": None}
+    assert parse_highlights("I cannot help with that.", 5) == {}
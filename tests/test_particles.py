@@ -0,0 +1,68 @@
+import copy
+
+import numpy as np
+import pytest
+
+from picflick.effects.particles import Rain, Snow
+from picflick.effects.synthetic import synthetic_frames
+
+WIDTH, HEIGHT = 160, 120
+
+
+def render(effect, count=10):
+    return [effect(frame, t).copy() for frame, t in synthetic_frames(WIDTH, HEIGHT, count)]
+
+
+@pytest.mark.parametrize("effect_class", [Snow, Rain])
+def test_same_seed_same_frames(effect_class):
+    first = render(effect_class(count=300, seed=3))
+    assert all(np.array_equal(a, b) for a, b in zip(first, render(effect_class(count=300, seed=3))))
+    assert not np.array_equal(first[-1], render(effect_class(count=300, seed=4))[-1])
+
+    effect = effect_class(count=300, seed=9)
+    render(effect)
+    effect.reset(3)
+    assert all(np.array_equal(a, b) for a, b in zip(first, render(effect)))
+
+
+@pytest.mark.parametrize("effect_class", [Snow, Rain])
+def test_frames_are_drawn_in_place(effect_class):
+    effect = effect_class(count=300)
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 5):
+        address = frame.ctypes.data
+        out = effect(frame, t)
+        assert out is frame and frame.ctypes.data == address
+        assert frame.shape == (HEIGHT, WIDTH, 3) and frame.dtype == np.uint8
+
+
+@pytest.mark.parametrize("effect_class", [Snow, Rain])
+def test_only_pixels_under_particles_change(effect_class):
+    effect = effect_class(count=200, seed=1)
+    frames = synthetic_frames(WIDTH, HEIGHT, 6)
+    for frame, t in frames:
+        before = frame.copy()
+        # Where this frame's particles land, worked out on a copy of the state
+        ahead = copy.deepcopy(effect)
+        if ahead.particles is not None:
+            ahead.step(min(max(t - ahead.last_t, 0.0), 0.1), t, HEIGHT, WIDTH)
+            indices, weights = ahead.rasterize(HEIGHT, WIDTH)
+        effect(frame, t)
+        if ahead.particles is None:
+            continue
+        changed = np.flatnonzero((frame != before).any(-1))
+        assert len(changed) > 0
+        assert np.isin(changed, indices).all()
+
+        # The blend, worked out directly: coverage summed per pixel, capped at 1
+        coverage = np.minimum(np.bincount(indices, weights=weights, minlength=HEIGHT * WIDTH), 1.0)
+        expected = before.reshape(-1, 3).astype(np.float64)
+        expected += (np.array(effect.color) - expected) * coverage[:, None]
+        assert np.abs(frame.reshape(-1, 3) - np.round(expected)).max() <= 1
+
+
+def test_no_particles_draw_nothing():
+    frame, t = next(synthetic_frames(WIDTH, HEIGHT, 1))
+    before = frame.copy()
+    Snow(count=0)(frame, t)
+    assert np.array_equal(frame, before)
+
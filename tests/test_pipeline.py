@@ -0,0 +1,122 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from picflick.effects.base import StageTimings
+from picflick.video.pipeline import FramePool, LatestQueue, Pipeline, paced
+
+SHAPE = (16, 24, 3)
+
+
+class SlowEffect:
+    """Takes ``delay`` seconds per frame and brightens it by one."""
+
+    def __init__(self, delay=0.0, stateful=True, fail_at=None):
+        self.delay = delay
+        self.stateful = stateful
+        self.fail_at = fail_at
+
+    def __call__(self, frame, t):
+        if self.fail_at is not None and t >= self.fail_at:
+            raise RuntimeError("effect failed")
+        time.sleep(self.delay)
+        frame += 1
+
+
+class Recorder:
+    def __init__(self):
+        self.frames = []
+
+    def __call__(self, frame, t):
+        self.frames.append((t, int(frame[0, 0, 0])))
+
+
+def frames(count, fps=30.0):
+    # One reused frame, the way a camera hands them out
+    frame = np.empty(SHAPE, dtype=np.uint8)
+    for number in range(count):
+        frame.fill(number % 200)
+        yield frame, number / fps
+
+
+def test_full_queue_drops_the_oldest_item():
+    dropped = []
+    items = LatestQueue(2, on_drop=dropped.append)
+    for item in range(5):
+        items.put(item)
+
+    assert dropped == [0, 1, 2]
+    assert items.stats() == {"depth": 2, "max_depth": 2, "dropped": 3}
+    items.close()
+    assert [items.get(), items.get(), items.get()] == [3, 4, None]
+
+
+def test_get_waits_for_an_item():
+    items = LatestQueue(2)
+    threading.Timer(0.05, items.put, args=("late",)).start()
+    assert items.get() == "late"
+
+
+def test_frame_pool_hands_out_each_frame_once():
+    pool = FramePool(SHAPE, 2)
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second and first.shape == SHAPE
+    assert pool.acquire() is None
+    pool.release(first)
+    assert pool.acquire() is first
+
+
+def test_every_frame_goes_through_when_the_effect_keeps_up():
+    sink = Recorder()
+    pipeline = Pipeline(paced(frames(30, fps=200), 200), SlowEffect, sink, SHAPE)
+    stats = pipeline.run()
+
+    assert stats["captured"] == stats["delivered"] == 30
+    assert stats["drop_rate"] == 0.0
+    assert sink.frames == [(number / 200, number % 200 + 1) for number in range(30)]
+    assert stats["free_buffers"] == pipeline.pool.count
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_slow_effect_drops_frames_instead_of_falling_behind(workers):
+    sink = Recorder()
+    pipeline = Pipeline(
+        paced(frames(120, fps=200), 200), lambda: SlowEffect(0.02, stateful=False), sink, SHAPE, workers=workers,
+    )
+    stats = pipeline.run()
+
+    assert stats["captured"] == 120
+    assert 0 < stats["delivered"] < 120
+    assert stats["drop_rate"] > 0
+    assert stats["delivered"] + sum(stats["dropped"].values()) == stats["captured"]
+    # Newest frames win, so times only go forwards
+    times = [t for t, _ in sink.frames]
+    assert times == sorted(times) and len(set(times)) == len(times)
+    # The backlog is bounded by the queue sizes, not by how long the stream has run
+    assert stats["queues"]["process"]["max_depth"] <= 2
+    assert stats["free_buffers"] == pipeline.pool.count
+
+
+def test_effect_errors_are_raised_and_buffers_returned():
+    pipeline = Pipeline(frames(50), lambda: SlowEffect(fail_at=0.5), Recorder(), SHAPE)
+    with pytest.raises(RuntimeError, match="effect failed"):
+        pipeline.run()
+    assert pipeline.pool.available() == pipeline.pool.count
+
+
+def test_stage_timings_count_every_record_across_threads():
+    timings = StageTimings()
+
+    def record():
+        for _ in range(2000):
+            timings.record("process", 1.0)
+            timings.snapshot()
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert timings.snapshot() == {"process": {"last_ms": 1.0, "avg_ms": 1.0, "count": 16000}}
@@ -0,0 +1,93 @@
+import json
+import os
+
+from PIL import Image
+
+from picflick.pyramid import LEVELS, PyramidManifest, build_manifest, read_manifest
+
+
+def remote(server, name):
+    return f"http://127.0.0.1:{server.server_port}/{name}"
+
+
+def catalog(server, *names):
+    return [{"image_url": remote(server, name)} for name in names]
+
+
+def test_build_writes_every_level_and_the_manifest(image_server, tmp_path):
+    output = tmp_path / "pyramid"
+    stats = build_manifest(catalog(image_server, "big.png", "small.jpg"), str(output), workers=1)
+    assert stats == {"built": 2, "skipped": 0, "failed": 0}
+
+    manifest = read_manifest(str(output / "manifest.json"))
+    big = manifest["images"][remote(image_server, "big.png")]
+    assert list(big["levels"]) == [str(width) for width in LEVELS]
+    for width, name in big["levels"].items():
+        with Image.open(output / name) as image:
+            assert image.width == int(width)
+    assert big["placeholder"].startswith("data:image/")
+    # The small source is not upscaled, so its levels share one file
+    small = manifest["images"][remote(image_server, "small.jpg")]
+    assert len(set(small["levels"].values())) == 2
+
+
+def test_unchanged_sources_are_not_downloaded_again(image_server, tmp_path):
+    output = str(tmp_path / "pyramid")
+    images = catalog(image_server, "big.png", "small.jpg")
+    build_manifest(images, output, workers=1)
+    image_server.responses.clear()
+
+    assert build_manifest(images, output, workers=1) == {"built": 0, "skipped": 2, "failed": 0}
+    assert sorted(code for _, code in image_server.responses) == [304, 304]
+
+
+def test_changed_sources_are_rebuilt(image_server, tmp_path):
+    output = str(tmp_path / "pyramid")
+    images = catalog(image_server, "big.png")
+    build_manifest(images, output, workers=1)
+    before = read_manifest(os.path.join(output, "manifest.json"))["images"][images[0]["image_url"]]
+
+    path = image_server.directory / "big.png"
+    Image.new("RGB", (800, 600), "green").save(path)
+    os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+    assert build_manifest(images, output, workers=1)["built"] == 1
+    after = read_manifest(os.path.join(output, "manifest.json"))["images"][images[0]["image_url"]]
+    assert after["source_hash"] != before["source_hash"] and after["width"] == 800
+
+
+def test_missing_level_files_are_rebuilt_without_asking_the_cache(image_server, tmp_path):
+    output = tmp_path / "pyramid"
+    images = catalog(image_server, "big.png")
+    build_manifest(images, str(output), workers=1)
+    entry = read_manifest(str(output / "manifest.json"))["images"][images[0]["image_url"]]
+    os.remove(output / entry["levels"]["160"])
+    image_server.responses.clear()
+
+    assert build_manifest(images, str(output), workers=1)["built"] == 1
+    assert image_server.responses == [("/big.png", 200)]
+    assert (output / entry["levels"]["160"]).exists()
+
+
+def test_failed_sources_keep_their_last_build(image_server, tmp_path):
+    output = tmp_path / "pyramid"
+    images = catalog(image_server, "big.png")
+    build_manifest(images, str(output), workers=1)
+    (image_server.directory / "big.png").unlink()
+
+    stats = build_manifest(images + catalog(image_server, "missing.png"), str(output), workers=1, force=True)
+    assert stats == {"built": 0, "skipped": 0, "failed": 2}
+    assert list(json.loads((output / "manifest.json").read_text())["images"]) == [images[0]["image_url"]]
+
+
+def test_pages_pick_the_smallest_level_that_is_wide_enough(image_server, tmp_path):
+    output = tmp_path / "pyramid"
+    build_manifest(catalog(image_server, "big.png", "small.jpg"), str(output), workers=1)
+    manifest = PyramidManifest(str(output / "manifest.json"), url_prefix="app/static/pyramid")
+    big, small = remote(image_server, "big.png"), remote(image_server, "small.jpg")
+    entry = manifest.get(big)
+
+    assert manifest.src(big, 300) == f"app/static/pyramid/{entry['levels']['320']}"
+    assert manifest.src(big, 5000) == f"app/static/pyramid/{entry['levels']['640']}"
+    assert manifest.src("http://elsewhere/none.png", 300) is None
+    # Levels past the small source's own width share a file, listed once
+    assert manifest.srcset(small).count(",") == 1
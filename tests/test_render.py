@@ -0,0 +1,210 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from picflick.effects.face import KEYFRAME_INTERVAL
+from picflick.video import render
+from picflick.video.render import Clip, MatroskaWriter, concatenate, plan_segments, read_frames, warmup_start
+
+needs_ffmpeg = pytest.mark.skipif(
+    not (shutil.which(render.FFMPEG) and shutil.which(render.FFPROBE)), reason="needs ffmpeg and ffprobe",
+)
+
+
+def make_clip(durations, keyframe_every=30, start_time=0.0, size=(8, 6)):
+    # To the microsecond, as ffprobe reports them
+    times = np.round(start_time + np.concatenate([[0.0], np.cumsum(durations)[:-1]]), 6)
+    return Clip("clip.mp4", *size, times, list(range(0, len(times), keyframe_every)), start_time)
+
+
+class Effect:
+    def __init__(self, stateful, keyframe_interval=None):
+        self.stateful = stateful
+        if keyframe_interval is not None:
+            self.keyframe_interval = keyframe_interval
+
+
+def test_segments_start_on_keyframes_and_cover_the_clip():
+    clip = make_clip(np.full(900, 1 / 30), keyframe_every=45)
+    segments = plan_segments(clip, seconds=4.0)
+
+    assert segments[0][0] == 0 and segments[-1][1] == clip.frames
+    assert all(stop == next_start for (_, stop), (next_start, _) in zip(segments, segments[1:]))
+    assert all(start in clip.keyframes for start, _ in segments)
+    assert all(clip.times[stop] - clip.times[start] >= 4.0 for start, stop in segments[:-1])
+    # 4 s is 120 frames, so every third keyframe
+    assert [start for start, _ in segments] == list(range(0, 900, 135))
+
+
+def test_segments_follow_time_not_frame_count():
+    # 2 s at 60 fps then 2 s at 10 fps, a keyframe every 10 frames
+    clip = make_clip(np.concatenate([np.full(120, 1 / 60), np.full(20, 1 / 10)]), keyframe_every=10)
+    assert plan_segments(clip, seconds=1.0) == [(0, 60), (60, 120), (120, 130), (130, 140)]
+
+
+def test_a_clip_without_later_keyframes_is_one_segment():
+    clip = make_clip(np.full(100, 0.04), keyframe_every=1000)
+    assert plan_segments(clip, seconds=1.0) == [(0, 100)]
+
+
+def test_warmup_starts_on_a_keyframe_interval():
+    stateful = Effect(stateful=True)
+    for start in (0, 1, KEYFRAME_INTERVAL, 95, 300):
+        first = warmup_start(stateful, start, warmup=20)
+        assert first % KEYFRAME_INTERVAL == 0
+        assert first == 0 or start - first >= 20
+        assert start - first < 20 + KEYFRAME_INTERVAL
+
+    assert warmup_start(Effect(stateful=True, keyframe_interval=7), 100, warmup=20) == 77
+    assert warmup_start(Effect(stateful=False), 100, warmup=20) == 100
+    assert warmup_start(stateful, 100, warmup=0) == 100
+
+
+def test_segments_do_not_depend_on_the_number_of_workers(monkeypatch, tmp_path):
+    clip = make_clip(np.full(600, 1 / 30), keyframe_every=30)
+    monkeypatch.setattr(render, "probe", lambda path: clip)
+    monkeypatch.setattr(render, "concatenate", lambda *args: None)
+
+    class Executor:
+        """Records the jobs instead of running them."""
+
+        def __init__(self, workers, initializer, initargs):
+            self.jobs = jobs
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, function, clip, index, start, stop, target, *options):
+            self.jobs.append((index, start, stop, os.path.basename(target), options))
+            future = Future()
+            future.set_result((index, stop - start, 0.0))
+            return future
+
+    monkeypatch.setattr(render, "ProcessPoolExecutor", Executor)
+    plans = []
+    for workers in (1, 2, 8):
+        jobs = []
+        summary = render.render_video("clip.mp4", str(tmp_path / "out.mp4"), ["Snow Effect"], workers=workers,
+                                      segment_seconds=3.0)
+        assert summary["frames"] == 600
+        plans.append(jobs)
+    assert plans[0] == plans[1] == plans[2]
+    assert [start for _, start, _, _, _ in plans[0]] == [0, 90, 180, 270, 360, 450, 540]
+
+
+def ebml_elements(data):
+    """``(id, payload)`` of every element in ``data``, an unknown size running to the end."""
+    position = 0
+    while position < len(data):
+        length = 8 - data[position].bit_length() + 1
+        element = data[position:position + length]
+        position += length
+        width = 8 - data[position].bit_length() + 1
+        size = int.from_bytes(data[position:position + width], "big") & ((1 << (7 * width)) - 1)
+        position += width
+        if size == (1 << (7 * width)) - 1:
+            size = len(data) - position
+        yield element, data[position:position + size]
+        position += size
+
+
+def children(data):
+    return dict(ebml_elements(data))
+
+
+def test_matroska_writer_round_trip():
+    class Output(list):
+        def write(self, data):
+            self.append(bytes(data))
+
+    frames = [np.full((6, 8, 3), value, dtype=np.uint8) for value in (10, 20, 30)]
+    times = [0.0, 0.033367, 1.5]
+    output = Output()
+    writer = MatroskaWriter(output, 8, 6)
+    for frame, t in zip(frames, times):
+        writer.write(frame, t)
+
+    (header_id, header), (segment_id, segment) = ebml_elements(b"".join(output))
+    assert header_id == b"\x1a\x45\xdf\xa3"
+    assert children(header)[b"\x42\x82"] == b"matroska"
+    assert segment_id == b"\x18\x53\x80\x67"
+
+    elements = list(ebml_elements(segment))
+    info = children(elements[0][1])
+    assert int.from_bytes(info[b"\x2a\xd7\xb1"], "big") == 1000
+    track = children(children(elements[1][1])[b"\xae"])
+    assert track[b"\x86"] == b"V_UNCOMPRESSED"
+    video = children(track[b"\xe0"])
+    assert (int.from_bytes(video[b"\xb0"], "big"), int.from_bytes(video[b"\xba"], "big")) == (8, 6)
+    assert video[b"\x2e\xb5\x24"] == b"RGB\x18"
+
+    clusters = [children(payload) for element, payload in elements[2:]]
+    assert [element for element, _ in elements[2:]] == [b"\x1f\x43\xb6\x75"] * 3
+    assert [int.from_bytes(cluster[b"\xe7"], "big") for cluster in clusters] == [0, 33367, 1500000]
+    for cluster, frame in zip(clusters, frames):
+        block = cluster[b"\xa3"]
+        # Track 1, relative time 0, keyframe
+        assert block[:4] == b"\x81\x00\x00\x80"
+        assert block[4:] == frame.tobytes()
+
+
+def test_concatenate_lists_every_segment_with_its_length(monkeypatch, tmp_path):
+    clip = make_clip(np.full(90, 0.04), keyframe_every=30, start_time=1.2)
+    segments = [(0, 30), (30, 60), (60, 90)]
+    targets = [str(tmp_path / name) for name in ("a.mp4", "it's.mp4", "c.mp4")]
+    commands = []
+    monkeypatch.setattr(render, "_run", commands.append)
+
+    concatenate(clip, segments, targets, "out.mp4", str(tmp_path))
+
+    assert (tmp_path / "segments.txt").read_text().splitlines() == [
+        f"file '{targets[0]}'", "duration 1.200000",
+        "file '{}'".format(targets[1].replace("'", "'\\''")), "duration 1.200000",
+        f"file '{targets[2]}'",
+    ]
+    assert commands[0][-1] == "out.mp4"
+
+
+def test_short_decodes_are_an_error(monkeypatch, tmp_path):
+    # A decoder that exits cleanly after two 8x6 frames
+    decoder = tmp_path / "decoder"
+    decoder.write_text("#!/bin/sh\nhead -c 288 /dev/zero\n")
+    decoder.chmod(0o755)
+    monkeypatch.setattr(render, "FFMPEG", str(decoder))
+    clip = make_clip(np.full(10, 0.04))
+
+    assert len(list(read_frames(clip, 0, 2))) == 2
+    with pytest.raises(RuntimeError, match="gave 2 of 3 frames"):
+        list(read_frames(clip, 0, 3))
+
+
+@needs_ffmpeg
+def test_render_keeps_every_frame_and_its_time(tmp_path):
+    # Variable frame rate, a keyframe every 12 frames
+    durations = np.tile([0.03, 0.05, 0.02, 0.07], 12)
+    times = np.concatenate([[0.0], np.cumsum(durations)[:-1]])
+    source = str(tmp_path / "vfr.mp4")
+    encoder = subprocess.Popen([
+        render.FFMPEG, "-v", "error", "-f", "matroska", "-i", "-", "-fps_mode", "passthrough",
+        "-enc_time_base", "-1", *render.ENCODE_OPTIONS, "-g", "12", source,
+    ], stdin=subprocess.PIPE)
+    writer = MatroskaWriter(encoder.stdin, 64, 48)
+    for number, t in enumerate(times):
+        writer.write(np.full((48, 64, 3), number * 5, dtype=np.uint8), t)
+    encoder.stdin.close()
+    assert encoder.wait() == 0
+
+    output = str(tmp_path / "out.mp4")
+    summary = render.render_video(source, output, ["Snow Effect"], workers=2, segment_seconds=0.5)
+    assert summary["segments"] > 1
+
+    rendered = render.probe(output)
+    assert rendered.frames == len(times) == summary["frames"]
+    np.testing.assert_allclose(rendered.times - rendered.start_time, times, atol=1e-3)
@@ -0,0 +1,75 @@
+import time
+
+import pandas as pd
+
+from picflick.sentiment.results import ResultStore, encode_analysis, result_key
+
+
+def make_analysis(trend=(0.5, -0.25)):
+    return {
+        "overall_score": 0.125,
+        "dominant_emotion": "satisfied",
+        "top_positive_turn": 0,
+        "top_negative_turn": 1,
+        "top_positive": "thanks",
+        "top_negative": "broken",
+        "sentiment_trend": pd.Series(trend),
+    }
+
+
+def test_round_trip(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    key = result_key("conversation", "llm", "gemini", "v1")
+    assert store.get(key) is None
+
+    store.put(key, "v1", make_analysis())
+    analysis = store.get(key)
+    assert {name: value for name, value in analysis.items() if name != "sentiment_trend"} == {
+        name: value for name, value in make_analysis().items() if name != "sentiment_trend"
+    }
+    assert analysis["sentiment_trend"].tolist() == [0.5, -0.25]
+    assert analysis["sentiment_trend"].dtype == float
+    # Another store on the same file, as another process would open it
+    assert ResultStore(store.path).get(key)["overall_score"] == 0.125
+
+
+def test_keys_change_with_every_part():
+    key = result_key("conversation", "llm", "gemini", "v1")
+    assert key == result_key("conversation", "llm", "gemini", "v1")
+    assert len({
+        key,
+        result_key("other", "llm", "gemini", "v1"),
+        result_key("conversation", "hybrid", "gemini", "v1"),
+        result_key("conversation", "llm", "other-model", "v1"),
+        result_key("conversation", "llm", "gemini", "v2"),
+    }) == 5
+
+
+def test_a_new_prompt_version_drops_older_results(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    store = ResultStore(path, prompt_version="v1")
+    old = result_key("conversation", "llm", "gemini", "v1")
+    store.put(old, "v1", make_analysis())
+
+    assert len(ResultStore(path, prompt_version="v1")) == 1
+    assert len(ResultStore(path, prompt_version="v2")) == 0
+
+
+def test_results_expire(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"), ttl=-1)
+    store.put("key", "v1", make_analysis())
+    assert store.get("key") is None
+    store.evict()
+    assert len(store) == 0
+
+
+def test_least_recently_used_go_first(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    for key in ("a", "b", "c"):
+        store.put(key, "v1", make_analysis())
+        time.sleep(0.01)
+    store.get("a")
+
+    store.max_bytes = 2 * len(encode_analysis(make_analysis()))
+    store.evict()
+    assert [store.get(key) is not None for key in ("a", "b", "c")] == [True, False, True]
@@ -0,0 +1,72 @@
+from picflick.search import SearchIndex, edit_distance, load_search_index, tokenize, trigrams
+
+FILTERS = [
+    {"id": 1, "name": "Snow Effect", "short_desc": "Falling snow", "long_desc": "Snowflakes drift down."},
+    {"id": 2, "name": "Rain Effect", "short_desc": "A rainy day", "long_desc": "Drops, and sometimes snow."},
+    {"id": 3, "name": "Snowboard Goggles", "short_desc": "Goggles for the slopes", "long_desc": ""},
+    {"id": 4, "name": "Warrior Mask", "short_desc": "A fierce mask", "long_desc": "Paint for a warrior."},
+    {"id": 5, "name": "Tribal Mask", "short_desc": "A colourful mask", "long_desc": None},
+]
+
+
+def ids(hits):
+    return [hit.filter["id"] for hit in hits]
+
+
+def test_exact_matches_rank_before_prefix_and_fuzzy_ones():
+    index = SearchIndex(FILTERS)
+    # "Snow" in a name, then "Snowboard" in a name, then snow in a description
+    assert ids(index.search("snow")) == [1, 3, 2]
+    scores = [hit.score for hit in index.search("snow")]
+    assert scores == sorted(scores, reverse=True)
+    assert ids(index.search("snowb")) == [3]
+
+
+def test_names_count_for_more_than_descriptions():
+    index = SearchIndex(FILTERS)
+    assert ids(index.search("warrior")) == [4]
+    assert ids(index.search("mask"))[:2] in ([4, 5], [5, 4])
+    assert ids(index.search("mask tribal")) == [5, 4]
+
+
+def test_typos_still_find_the_closest_terms():
+    index = SearchIndex(FILTERS)
+    assert ids(index.search("wariror")) == [4]
+    assert ids(index.search("tribl mask"))[0] == 5
+    assert ids(index.search("goggels")) == [3]
+    # Exact hits are never outranked by fuzzy ones
+    exact = index.search("rain")[0].score
+    assert ids(index.search("rain"))[0] == 2 and exact > index.search("rian")[0].score
+
+
+def test_filters_matching_more_words_rank_first():
+    index = SearchIndex(FILTERS)
+    assert ids(index.search("effect drops"))[0] == 2
+
+
+def test_empty_and_unmatched_queries():
+    index = SearchIndex(FILTERS)
+    assert index.search("") == []
+    assert index.search("   ") == []
+    assert index.search("the and of") == []
+    assert index.search("xylophone") == []
+    assert len(index.search("a", limit=2)) <= 2
+
+
+def test_limit_keeps_the_best():
+    index = SearchIndex(FILTERS)
+    assert ids(index.search("snow", limit=2)) == [1, 3]
+
+
+def test_helpers():
+    assert tokenize("The Snow, and RAIN!") == ["snow", "rain"]
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+    assert edit_distance("mask", "mask", 2) == 0
+    assert edit_distance("mask", "msak", 2) == 1
+    assert edit_distance("mask", "goggles", 2) == 3
+
+
+def test_bundled_catalog_is_searchable():
+    index = load_search_index()
+    assert index.search("green eye")[0].filter["name"] == "Green Eye"
+    assert index.search("baseball cpa")[0].filter["name"] == "Baseball Cap"
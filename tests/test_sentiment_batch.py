@@ -0,0 +1,144 @@
+import asyncio
+import json
+import re
+import time
+import uuid
+from types import SimpleNamespace
+
+import pandas as pd
+
+from picflick.sentiment import batch
+from picflick.sentiment.batch import run_batch
+
+
+class FakeSentimentModel:
+    """Scores every turn it is asked about: positive when the user says "thanks"."""
+
+    def __init__(self, fail_first=0):
+        self.fail_first = fail_first
+        self.calls = 0
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        if self.calls <= self.fail_first:
+            raise RuntimeError("quota exceeded")
+        await asyncio.sleep(0)
+        asked = prompt.split("Turns to score:", 1)[1]
+        lines = []
+        for number, text in re.findall(r"^\[(\d+)\] User: (.*)$", asked, re.M):
+            score = 0.5 if "thanks" in text else -0.5
+            emotion = "satisfied" if score > 0 else "frustrated"
+            lines.append(json.dumps({"turn": int(number), "score": score, "emotion": emotion}))
+        return SimpleNamespace(content="\n".join(lines))
+
+
+def conversation(turns=2, padding=0):
+    # Unique text, so no turn is already in the shared score cache
+    tag = uuid.uuid4().hex
+    return [
+        {"user": f"{tag} {number} {'x' * padding} thanks" if number % 2 else f"{tag} {number} broken", "chatbot": "ok"}
+        for number in range(turns)
+    ]
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_results_are_written_and_failures_recorded(tmp_path):
+    source = tmp_path / "conversations.jsonl"
+    output = tmp_path / "results.jsonl"
+    write_jsonl(source, [
+        {"conversation_id": "a", "chat_history": conversation()},
+        {"conversation_id": "b", "chat_history": conversation(3)},
+        {"conversation_id": "empty", "chat_history": []},
+        {"conversation_id": "missing"},
+    ])
+
+    stats = asyncio.run(run_batch(str(source), str(output), llm=FakeSentimentModel(), rate=100))
+
+    assert stats == {"analysed": 2, "failed": 2, "skipped": 0}
+    results = {record["conversation_id"]: record for record in read_jsonl(output)}
+    assert set(results) == {"a", "b"}
+    assert results["b"]["sentiment_trend"] == [-0.5, 0.5, -0.5]
+    assert results["b"]["dominant_emotion"] == "frustrated"
+    failures = {record["conversation_id"]: record["error"] for record in read_jsonl(tmp_path / "results.jsonl.failed.jsonl")}
+    assert failures == {"empty": "Conversation has no turns", "missing": "Record has no 'chat_history' field"}
+
+
+def test_finished_conversations_are_skipped_on_resume(tmp_path):
+    source = tmp_path / "conversations.jsonl"
+    output = tmp_path / "results.jsonl"
+    records = [{"conversation_id": str(number), "chat_history": conversation()} for number in range(4)]
+    write_jsonl(source, records)
+    write_jsonl(output, [{"conversation_id": "0", "overall_score": 0.0}])
+    # A run killed mid-write leaves half a line behind
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"conversation_id": "1", "overa')
+
+    model = FakeSentimentModel()
+    stats = asyncio.run(run_batch(str(source), str(output), llm=model, rate=100))
+    assert stats == {"analysed": 3, "failed": 0, "skipped": 1}
+    assert model.calls == 3
+    assert not (tmp_path / "results.jsonl.failed.jsonl").exists()
+
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert lines[1] == '{"conversation_id": "1", "overa'
+    assert sorted(json.loads(line)["conversation_id"] for line in lines[2:]) == ["1", "2", "3"]
+
+    model = FakeSentimentModel()
+    stats = asyncio.run(run_batch(str(source), str(output), llm=model, rate=100))
+    assert stats == {"analysed": 0, "failed": 0, "skipped": 4}
+    assert model.calls == 0
+
+
+def test_every_request_is_rate_limited(tmp_path):
+    source = tmp_path / "conversations.jsonl"
+    # Turns too long to share a window, so every turn is a request of its own
+    write_jsonl(source, [
+        {"conversation_id": str(number), "chat_history": conversation(4, padding=20_000)} for number in range(3)
+    ])
+
+    model = FakeSentimentModel()
+    started = time.monotonic()
+    stats = asyncio.run(run_batch(str(source), str(tmp_path / "results.jsonl"), llm=model, concurrency=3, rate=6))
+    elapsed = time.monotonic() - started
+
+    assert stats["analysed"] == 3
+    assert model.calls == 12
+    # A burst of 6, then 6 more at 6 a second
+    assert elapsed >= 0.9
+
+
+def test_failed_analyses_are_retried(tmp_path):
+    source = tmp_path / "conversations.jsonl"
+    write_jsonl(source, [{"conversation_id": str(number), "chat_history": conversation()} for number in range(3)])
+
+    model = FakeSentimentModel(fail_first=2)
+    stats = asyncio.run(run_batch(
+        str(source), str(tmp_path / "results.jsonl"), llm=model, rate=100, retries=2, base_delay=0.01,
+    ))
+    assert stats == {"analysed": 3, "failed": 0, "skipped": 0}
+    assert model.calls == 5
+
+
+def test_parquet_keeps_the_conversations_that_succeeded(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "conversations.jsonl"
+    write_jsonl(source, [
+        {"conversation_id": 1, "chat_history": conversation()},
+        {"conversation_id": 2},
+        {"conversation_id": 3, "chat_history": conversation(3)},
+    ])
+    monkeypatch.setattr(batch, "get_sentiment_model", FakeSentimentModel)
+    output = tmp_path / "results.parquet"
+
+    assert batch.main([str(source), str(output), "--rate", "100"]) == 1
+    results = pd.read_parquet(output)
+    assert sorted(results["conversation_id"]) == ["1", "3"]
+    assert list(results.set_index("conversation_id").loc["3", "sentiment_trend"]) == [-0.5, 0.5, -0.5]
+    assert read_jsonl(tmp_path / "results.jsonl.failed.jsonl")[0]["conversation_id"] == "2"
+    assert "results.jsonl.failed.jsonl" in capsys.readouterr().err
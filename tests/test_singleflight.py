@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from picflick.sentiment.singleflight import SingleFlight
+
+
+def follow_all(flights, key, produce, callers):
+    """Start ``callers`` threads on ``key``; return their results or errors, by thread."""
+    outcomes = [None] * callers
+
+    def call(number):
+        try:
+            outcomes[number] = list(flights.run(key, produce))
+        except Exception as e:
+            outcomes[number] = e
+
+    threads = [threading.Thread(target=call, args=(number,)) for number in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_call():
+    joins = []
+    flights = SingleFlight(on_join=lambda: joins.append(1))
+    release = threading.Event()
+    calls = []
+
+    def produce():
+        calls.append(1)
+        yield "partial"
+        release.wait(5)
+        yield "done"
+
+    threads, outcomes = follow_all(flights, "key", produce, 8)
+    wait_until(lambda: len(joins) == 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    # Every caller ends with the final result; a partial one may have been skipped
+    assert all(outcome[-1] == "done" for outcome in outcomes)
+    wait_until(lambda: len(flights) == 0)
+
+
+def test_an_error_reaches_every_caller_then_clears():
+    joins = []
+    flights = SingleFlight(on_join=lambda: joins.append(1))
+    release = threading.Event()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        release.wait(5)
+        raise ValueError("model failed")
+        yield
+
+    threads, outcomes = follow_all(flights, "key", fail, 5)
+    wait_until(lambda: len(joins) == 4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    wait_until(lambda: len(flights) == 0)
+
+    # The next caller starts afresh instead of getting the old error
+    assert list(flights.run("key", lambda: iter(["again"]))) == ["again"]
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight()
+    assert list(flights.run("a", lambda: iter([1]))) == [1]
+    assert list(flights.run("b", lambda: iter([2]))) == [2]
+    with pytest.raises(KeyError):
+        list(flights.run("c", lambda: (_ for _ in ()).throw(KeyError("c"))))
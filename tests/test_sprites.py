@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from picflick.effects.face import clip_rect
+from picflick.effects.sprites import BaseballCap, TribalMask, Variant, WarriorMask, premultiply
+from picflick.effects.synthetic import synthetic_frame, synthetic_frames
+
+WIDTH, HEIGHT = 320, 240
+
+
+def random_sprite(width=40, height=30):
+    rgba = np.random.default_rng(5).integers(0, 256, (height, width, 4), dtype=np.uint8)
+    rgba[:5, :, 3] = 0
+    rgba[-5:, :, 3] = 255
+    colour, transparency = premultiply(Image.fromarray(rgba, "RGBA"))
+    return rgba, np.concatenate([colour, 1 - transparency], axis=2)
+
+
+def composite_reference(frame, rgba, left, top):
+    """Straight-alpha "over", worked out directly."""
+    out = frame.astype(np.float64)
+    height, width = rgba.shape[:2]
+    x0, y0, x1, y1 = clip_rect((left, top, left + width, top + height), *frame.shape[:2])
+    if x1 > x0 and y1 > y0:
+        sprite = rgba[y0 - top:y1 - top, x0 - left:x1 - left].astype(np.float64)
+        alpha = sprite[..., 3:] / 255
+        out[y0:y1, x0:x1] = np.floor(sprite[..., :3] * alpha + out[y0:y1, x0:x1] * (1 - alpha) + 0.5)
+    return out
+
+
+@pytest.mark.parametrize("left, top", [(100, 80), (-12, -9), (300, 225), (-60, 10), (WIDTH, HEIGHT)])
+def test_premultiplied_blend_matches_straight_alpha(left, top):
+    rgba, sprite = random_sprite()
+    # At its own size and upright the sprite is not resampled, and the anchor is its centre
+    variant = Variant(sprite, (0.5, 0.5), 40, 0)
+    frame = synthetic_frame(WIDTH, HEIGHT, 0.4)
+    expected = composite_reference(frame, rgba, left, top)
+    assert variant.blend(frame, left + 20, top + 15) is frame
+    assert np.abs(frame - expected).max() <= 1
+
+
+def test_rotated_variants_keep_the_anchor_on_the_sprite():
+    _, sprite = random_sprite()
+    for degrees in (0, 30, 90, -45):
+        variant = Variant(sprite, (0.5, 0.2), 40, degrees)
+        height, width = variant.colour.shape[:2]
+        assert 0 <= variant.anchor[0] <= width and 0 <= variant.anchor[1] <= height
+        assert variant.transparency.min() >= 0 and variant.transparency.max() <= 1
+
+
+def render(effect, count=8):
+    return [effect(frame, t).copy() for frame, t in synthetic_frames(WIDTH, HEIGHT, count)]
+
+
+@pytest.mark.parametrize("effect_class", [WarriorMask, TribalMask, BaseballCap])
+def test_overlays_change_only_the_sprite_box(effect_class):
+    effect = effect_class(detector="synthetic")
+    for frame, t in synthetic_frames(WIDTH, HEIGHT, 8):
+        before = frame.copy()
+        address = frame.ctypes.data
+        assert effect(frame, t) is frame and frame.ctypes.data == address
+
+        face = effect._tracker.face
+        variant = effect.variant(face)
+        x, y = effect.place(face)
+        height, width = variant.colour.shape[:2]
+        left, top = round(x - variant.anchor[0]), round(y - variant.anchor[1])
+        box = np.zeros((HEIGHT, WIDTH), dtype=bool)
+        x0, y0, x1, y1 = clip_rect((left, top, left + width, top + height), HEIGHT, WIDTH)
+        box[y0:y1, x0:x1] = True
+        changed = (frame != before).any(-1)
+        assert changed.any() and not changed[~box].any()
+
+    # A face moving a little reuses the variants it already made
+    assert len(effect.variants) <= 4
+
+
+@pytest.mark.parametrize("effect_class", [WarriorMask, TribalMask, BaseballCap])
+def test_overlays_are_repeatable(effect_class):
+    first = render(effect_class(detector="synthetic"))
+    assert all(np.array_equal(a, b) for a, b in zip(first, render(effect_class(detector="synthetic"))))
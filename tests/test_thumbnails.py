@@ -0,0 +1,108 @@
+import os
+import time
+
+from PIL import Image
+
+from picflick.thumbnails import IMAGE_EXTENSION, SIZES, ThumbnailCache
+
+
+def remote(server, name):
+    return f"http://127.0.0.1:{server.server_port}/{name}"
+
+
+def wait_for_downloads(cache, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while cache._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_downloads_resizes_and_serves_local_copies(image_server, tmp_path):
+    cache = ThumbnailCache(root=str(tmp_path / "cache"), url_prefix="app/static/thumbnails")
+    url = remote(image_server, "big.png")
+
+    for size, width in SIZES.items():
+        served = cache.url(url, size, wait=True)
+        assert served.startswith("app/static/thumbnails/") and served.endswith(IMAGE_EXTENSION)
+        with Image.open(cache.path(url, size)) as image:
+            assert image.width == width
+            assert image.height == width * 3 // 4
+    # Every size came from a single download
+    assert image_server.requests == ["/big.png"]
+
+
+def test_small_images_are_not_enlarged(image_server, tmp_path):
+    cache = ThumbnailCache(root=str(tmp_path / "cache"))
+    with Image.open(cache.path(remote(image_server, "small.jpg"), "expanded")) as image:
+        assert image.size == (200, 100)
+
+
+def test_cached_images_are_not_downloaded_again(image_server, tmp_path):
+    root = str(tmp_path / "cache")
+    url = remote(image_server, "big.png")
+    first = ThumbnailCache(root=root).path(url)
+
+    assert ThumbnailCache(root=root).path(url) == first
+    assert image_server.requests == ["/big.png"]
+
+
+def test_unchanged_content_is_not_rewritten(image_server, tmp_path):
+    cache = ThumbnailCache(root=str(tmp_path / "cache"))
+    url = remote(image_server, "big.png")
+    path = cache.path(url)
+    os.utime(path, (1, 1))
+
+    data = (image_server.directory / "big.png").read_bytes()
+    # The same image under another url shares the file, which is left as it is
+    names = cache.store(remote(image_server, "copy.png"), data)
+    assert os.path.join(cache.root, names["card"]) == path
+    assert os.path.getmtime(path) == 1
+
+
+def test_missing_images_fall_back_to_the_remote_url(image_server, tmp_path):
+    cache = ThumbnailCache(root=str(tmp_path / "cache"))
+    url = remote(image_server, "missing.png")
+
+    assert cache.path(url) is None
+    assert cache.url(url, wait=True) == url
+    assert cache.url(url) == url
+    wait_for_downloads(cache)
+    # The 404 is remembered instead of being asked for on every render
+    assert image_server.requests == ["/missing.png"]
+
+
+def test_misses_are_fetched_in_the_background(image_server, tmp_path):
+    cache = ThumbnailCache(root=str(tmp_path / "cache"), url_prefix="app/static/thumbnails")
+    url = remote(image_server, "big.png")
+
+    assert cache.url(url) == url
+    wait_for_downloads(cache)
+    assert cache.url(url).startswith("app/static/thumbnails/")
+    assert image_server.requests == ["/big.png"]
+
+
+def test_unreachable_hosts_do_not_block(tmp_path):
+    import socket
+
+    # Accepts connections and never answers
+    with socket.socket() as silent:
+        silent.bind(("127.0.0.1", 0))
+        silent.listen(16)
+        cache = ThumbnailCache(root=str(tmp_path / "cache"))
+        urls = [f"http://127.0.0.1:{silent.getsockname()[1]}/{number}.png" for number in range(9)]
+
+        started = time.perf_counter()
+        assert [cache.url(url) for url in urls] == urls
+        assert time.perf_counter() - started < 0.5
+
+
+def test_least_recently_used_images_are_evicted(image_server, tmp_path):
+    cache = ThumbnailCache(root=str(tmp_path / "cache"))
+    big = cache.path(remote(image_server, "big.png"))
+    limit = cache.total_bytes
+    cache.max_bytes = limit
+    os.utime(big, (1, 1))
+
+    cache.path(remote(image_server, "small.jpg"))
+    assert cache.total_bytes <= limit
+    assert not os.path.exists(big)
+    assert cache.cached_path(remote(image_server, "big.png")) is None